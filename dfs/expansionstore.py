@@ -0,0 +1,99 @@
+'''
+On-disk store of expanded feature rows, in a sqlite database.
+
+Each featurizer's output for a game row is stored under the row's key (for NBA data, the player and date) and the
+version of the featurizer that produced it. Re-expanding data that overlaps an earlier run then only computes the rows
+that are new, or whose featurizer has changed since; the rest come out of the store. Rows the featurizer had no values
+for at all (usually because its source data wasn't scraped yet) aren't stored, so they are computed again next time.
+'''
+import os
+import pickle
+import sqlite3
+import pandas as pd
+
+class ExpansionStore(object):
+  """
+  Expanded rows stored on disk, by featurizer. Look rows up with load and add new ones with append.
+  """
+  def __init__(self, path, key_columns=('bref_id', 'date'), chunk_size=500):
+    """
+    :param str path: sqlite database file (created if it doesn't exist)
+    :param tuple[str] key_columns: the columns of a game row that identify it
+    :param int chunk_size: number of rows to look up in one query
+    """
+    self.path = path
+    self.key_columns = list(key_columns)
+    self.chunk_size = chunk_size
+    self._connection = None
+
+  @property
+  def connection(self):
+    if self._connection is None:
+      directory = os.path.dirname(self.path)
+      if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+      self._connection = sqlite3.connect(self.path)
+      self._connection.execute('CREATE TABLE IF NOT EXISTS expanded (featurizer TEXT, version TEXT, key TEXT, '
+                               'value BLOB, PRIMARY KEY (featurizer, version, key))')
+    return self._connection
+
+  def row_keys(self, data):
+    """
+    :param pandas.DataFrame data: game rows
+    :return list[str]: the key each row is stored under
+    """
+    key_data = data[self.key_columns]
+    return ['|'.join(str(value) for value in values) for values in zip(*[key_data[col] for col in self.key_columns])]
+
+  def load(self, featurizer, version, data, columns):
+    """
+    :param str featurizer: featurizer name
+    :param str version: featurizer version
+    :param pandas.DataFrame data: game rows to look up
+    :param list[str] columns: the featurizer's output columns
+    :return pandas.DataFrame: stored results for the rows of data that have them, indexed like data
+    """
+    keys = self.row_keys(data)
+    found = {}
+    distinct_keys = list(set(keys))
+    for start in range(0, len(distinct_keys), self.chunk_size):
+      chunk = distinct_keys[start:start + self.chunk_size]
+      query = 'SELECT key, value FROM expanded WHERE featurizer = ? AND version = ? AND key IN (%s)' % \
+              ','.join('?' * len(chunk))
+      for key, value in self.connection.execute(query, [featurizer, version] + chunk):
+        found[key] = pickle.loads(bytes(value))
+    stored_index = [index for index, key in zip(data.index, keys) if key in found]
+    stored_values = [found[key] for key in keys if key in found]
+    return pd.DataFrame(stored_values, index=stored_index, columns=columns)
+
+  def append(self, featurizer, version, data, results):
+    """
+    Store new results (other than rows whose values are all missing), and drop any stored by other versions of the
+    featurizer.
+    :param str featurizer: featurizer name
+    :param str version: featurizer version
+    :param pandas.DataFrame data: the game rows expanded
+    :param pandas.DataFrame results: the featurizer's output for those rows, indexed like data
+    """
+    results = results.reindex(data.index)
+    has_values = results.notnull().any(axis=1).values
+    rows = [(featurizer, version, key, sqlite3.Binary(pickle.dumps(list(values), 2)))
+            for key, values, keep in zip(self.row_keys(data), results.values, has_values) if keep]
+    with self.connection:
+      self.connection.execute('DELETE FROM expanded WHERE featurizer = ? AND version != ?', (featurizer, version))
+      self.connection.executemany('INSERT OR REPLACE INTO expanded VALUES (?, ?, ?, ?)', rows)
+
+  def clear(self, featurizer=None):
+    """
+    Drop every stored row (or just the rows for one featurizer).
+    """
+    with self.connection:
+      if featurizer is None:
+        self.connection.execute('DELETE FROM expanded')
+      else:
+        self.connection.execute('DELETE FROM expanded WHERE featurizer = ?', (featurizer,))
+
+  def close(self):
+    if self._connection is not None:
+      self._connection.close()
+      self._connection = None
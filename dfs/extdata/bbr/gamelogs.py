@@ -2,13 +2,21 @@
 Cleaned up way to load the gamelog data from BBR scraping.
 """
 
+import numpy as np
 import pandas
 from pandas import DataFrame
-from .io import load_full_gamelogs
+from .io import load_full_gamelogs, get_gamelog_store
 
 prepared_bbr_data = None
 prepared_unindexed_data = None
 
+def xform_mins(minstr):
+  """ Turn a minutes:seconds string into a float """
+  if not isinstance(minstr, basestring):
+      return minstr
+  mins, secs = minstr.split(':')
+  return int(mins) + int(secs) / 60.0
+
 def load_gamelogs():
   """
   Get the gamelogs we scraped from BBR in a more usable format
@@ -25,18 +33,12 @@ def load_gamelogs():
     :param dict[str, DataFrame] players: gamelog data
     :return:
     """
-    def xform_mins(minstr):
-      """ Turn a minutes:seconds string into a float """
-      if not isinstance(minstr, basestring):
-          return minstr
-      mins, secs = minstr.split(':')
-      return int(mins) + int(secs) / 60.0
     for player in players:
       if players[player] is not None:
         # Map minutes-seconds transformation to update all dataframe gamelogs
         players[player]['MP'] = players[player]['MP'].map(xform_mins)
-        # Sort all gamelogs by date of game played
-        players[player] = players[player].sort_index()
+        # Sort all gamelogs by date of game played (stably, as the gamelog store does)
+        players[player] = players[player].sort_index(kind='mergesort')
     return players
 
   # Cache a single copy of the assembled dataframe dict so we never have to reload while the program runs
@@ -60,13 +62,23 @@ def load_gamelogs():
 def load_all_game_data():
   """
   Return a gigantic dataframe containing every single game we have information for.
-  :return pandas.DataFrame: all game rows
+  :return pandas.DataFrame: all game rows, by season, then player, then date (the same whether they come from the
+    gamelog store or the per-player pickles)
   """
   global prepared_unindexed_data
   if prepared_unindexed_data is not None:
     return prepared_unindexed_data
+  store = get_gamelog_store()
+  if store.exists():
+    # Open every game straight from the gamelog store; only MP needs converting
+    all_games = store.load(columns=[column for column in store.columns() if column != 'Date'],
+                           player_column='bref_id', date_column='date')
+    if 'MP' in all_games.columns:
+      all_games['MP'] = all_games['MP'].map(xform_mins)
+    prepared_unindexed_data = all_games
+    return prepared_unindexed_data
   unindexed_dfs = []
-  for bref_id, dataframe in load_gamelogs().iteritems():
+  for bref_id, dataframe in sorted(load_gamelogs().iteritems()):
     # Dataframe is indexed by date -- delete existing date column and use this one
     dataframe.index.name = 'date'
     if 'Date' in dataframe.columns:
@@ -75,7 +87,10 @@ def load_all_game_data():
     # Add player ID as a column to the dataframe for future joining purposes!
     unindexed_df['bref_id'] = pandas.Series(data=bref_id, index=unindexed_df.index)
     unindexed_dfs.append(unindexed_df)
-  prepared_unindexed_data = pandas.concat(unindexed_dfs, ignore_index=True)
+  all_games = pandas.concat(unindexed_dfs, ignore_index=True)
+  # Put the rows in the gamelog store's order
+  seasons = store.seasons(pandas.DatetimeIndex(all_games['date']))
+  prepared_unindexed_data = all_games.iloc[np.argsort(seasons, kind='mergesort')].reset_index(drop=True)
   return prepared_unindexed_data
 
 def all_loaded_players():
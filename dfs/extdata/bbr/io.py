@@ -3,11 +3,12 @@ Consolidate save / load functions here to keep the other files readable
 """
 import os
 import sys
+from argparse import ArgumentParser
 import simplejson as json
 import cPickle as pickle
 import logging
 
-from dfs.extdata.common.io import combine_dataframe_into_pickle_file
+from dfs.gamelogstore import GamelogStore
 
 from .common import bbr_id_regex, datadir
 
@@ -42,23 +43,31 @@ def get_player_filename(bref_id):
   fn = os.path.join(datadir, 'player_data', bref_id)
   return fn
 
+def get_gamelog_store():
+  """
+  Every player's gamelog, by season (NBA seasons start in October, so this counts from August)
+  :return GamelogStore:
+  """
+  return GamelogStore(os.path.join(datadir, 'gamelogs'), season_start_month=8)
+
 def save_dataframes(players, overwrite=False):
   """
-  Save the pandas dataframes (the gamelog_data) from each player in players to a file
+  Save the pandas dataframes (the gamelog_data) from each player in players to the gamelog store
   :param dict[str, dict] players: the player dict
   :return:
   """
-  saved_dataframes = 0
-  for bref_id, attrs in players.iteritems():
-    if 'gamelog_data' in attrs:
-      target_file = get_player_filename(bref_id)
-      combine_dataframe_into_pickle_file(attrs['gamelog_data'], target_file, overwrite=overwrite)
-      saved_dataframes += 1
-  logging.debug('Saved %d dataframes to %s', saved_dataframes, datadir)
+  store = get_gamelog_store()
+  if not store.exists():
+    # Bring in the gamelogs saved before the store, or they'd be lost
+    migrate_gamelogs()
+  gamelogs = {bref_id: attrs['gamelog_data'] for bref_id, attrs in players.iteritems()
+              if attrs.get('gamelog_data') is not None}
+  store.update(gamelogs, overwrite=overwrite)
+  logging.debug('Saved %d dataframes to %s', len(gamelogs), store.root)
 
-def load_dataframes(players):
+def load_pickled_dataframes(players):
   """
-  Load previously saved dataframes of gamelog data
+  Load gamelog data saved the old way, as one pickle per player
   :param dict[str, dict] players: the player dict (bref id -> dict)
   :return dict[str, dict]: the player dict, loaded from pickled data
   """
@@ -72,6 +81,40 @@ def load_dataframes(players):
   logging.debug('loaded %d dataframes from %s', loaded, datadir)
   return players
 
+def load_dataframes(players):
+  """
+  Load previously saved dataframes of gamelog data
+  :param dict[str, dict] players: the player dict (bref id -> dict)
+  :return dict[str, dict]: the player dict, loaded from the gamelog store (or the per-player pickles, if the store
+    hasn't been made yet)
+  """
+  store = get_gamelog_store()
+  if not store.exists():
+    return load_pickled_dataframes(players)
+  gamelogs = store.gamelogs(players=players.keys())
+  for bref_id, gamelog in gamelogs.iteritems():
+    players[bref_id]['gamelog_data'] = gamelog
+  logging.debug('loaded %d dataframes from %s', len(gamelogs), store.root)
+  return players
+
+def migrate_gamelogs():
+  """
+  Move every player's pickled gamelog into the gamelog store. The pickles are left where they are.
+  :return int: number of gamelogs moved
+  """
+  player_dir = os.path.join(datadir, 'player_data')
+  bref_ids = os.listdir(player_dir) if os.path.exists(player_dir) else []
+  players = load_pickled_dataframes({bref_id: {} for bref_id in bref_ids})
+  gamelogs = {bref_id: attrs.get('gamelog_data') for bref_id, attrs in players.iteritems()}
+  get_gamelog_store().write(gamelogs)
+  return len(gamelogs)
+
+def migrate_cli():
+  p = ArgumentParser(description='Move the pickled gamelog of each player into the gamelog store.')
+  p.parse_args()
+  migrated = migrate_gamelogs()
+  print 'Moved %d gamelogs into %s' % (migrated, get_gamelog_store().root)
+
 def create_player_dict(pids_to_load):
   '''
   Initialize the player dictionary.
@@ -8,6 +8,7 @@ import simplejson as json
 from . import team_disambiguations
 
 from dfs import GLOBAL_ROOT
+from dfs.parallel import debug_shell
 from dfs.extdata.common.scraper import getSoupFromURL, soupTableToTable, parsedTableToDF
 
 url = 'http://www.baseball-reference.com/teams/{team}/attend.shtml'
@@ -20,9 +21,7 @@ def _load_parkeffect_from_url(team):
   parsed_table = soupTableToTable(stats_table)
   header = []
   if not stats_table:
-    print 'stats table not loaded for this team'
-    import IPython
-    IPython.embed()
+    debug_shell('stats table not loaded for this team')
     return None
   for th in stats_table[0].find("thead").findAll('th'):
     if not th.getText() in header:
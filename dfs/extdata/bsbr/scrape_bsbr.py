@@ -23,7 +23,8 @@ from dfs import GLOBAL_ROOT
 from dfs.mlb.playerid import name2brefid, brefid_is_pitcher
 
 from dfs.extdata.common.scraper import getSoupFromURL, soupTableToTable, parsedTableToDF
-from dfs.extdata.common.io import combine_dataframe_into_pickle_file
+from dfs.gamelogstore import GamelogStore
+from dfs.extdata.bsbr.starters import save_starting_pitcher_index, update_starting_pitcher_index
 
 # because Pickle -- try to fix this later
 sys.setrecursionlimit(50000)
@@ -91,24 +92,41 @@ def get_attr_filename(bref_id, data_type):
   fn = os.path.join(datadir, 'player_data', bref_id + '_' + data_type)
   return fn
 
+def get_gamelog_store(data_type):
+  """
+  Every player's gamelogs of one type, by season
+  :param str data_type: 'batting' or 'pitching'
+  :return GamelogStore:
+  """
+  return GamelogStore(os.path.join(datadir, 'gamelogs', data_type))
+
 def save_dataframes(players, overwrite=False):
   """
-  Save the pandas dataframes (the gamelog_data) from each player in players to a file
+  Save the pandas dataframes (the gamelog_data) from each player in players to the gamelog stores
   :param dict[str, dict] players: the player dict
   :param bool overwrite: if True, delete old data
   :return:
   """
   saved_dataframes = 0
-  for bref_id, attrs in players.iteritems():
-    for data_type in player_data_types:
-      if data_type in attrs and attrs[data_type] is not None:
-        combine_dataframe_into_pickle_file(attrs[data_type], get_attr_filename(bref_id, data_type), overwrite=overwrite)
-        saved_dataframes += 1
+  for data_type in player_data_types:
+    store = get_gamelog_store(data_type)
+    if not store.exists():
+      # Bring in the gamelogs saved before the stores, or they'd be lost
+      migrate_gamelogs()
+    gamelogs = {bref_id: attrs[data_type] for bref_id, attrs in players.iteritems()
+                if attrs.get(data_type) is not None}
+    store.update(gamelogs, overwrite=overwrite)
+    saved_dataframes += len(gamelogs)
   logging.debug('Saved %d dataframes to %s', saved_dataframes, datadir)
+  # Keep the starting pitcher index in step with the pitching gamelogs. A batch only holds some pitchers (and maybe
+  # only their new games), so redo just their starts, from all of their stored games.
+  pitchers = [bref_id for bref_id, attrs in players.iteritems() if attrs.get('pitching') is not None]
+  if pitchers:
+    update_starting_pitcher_index(get_gamelog_store('pitching').gamelogs(players=pitchers))
 
-def load_dataframes(players):
+def load_pickled_dataframes(players):
   """
-  Load previously saved dataframes of gamelog data
+  Load gamelog data saved the old way, as one pickle per player and data type
   :param dict[str, dict[str, list]] players: the player dict
   :return:
   """
@@ -123,6 +141,48 @@ def load_dataframes(players):
   logging.debug('loaded %d dataframes from %s', loaded, datadir)
   return players
 
+def load_dataframes(players):
+  """
+  Load previously saved dataframes of gamelog data, from the gamelog stores (or the per-player pickles, if the stores
+  haven't been made yet)
+  :param dict[str, dict[str, list]] players: the player dict
+  :return:
+  """
+  if not all(get_gamelog_store(data_type).exists() for data_type in player_data_types):
+    return load_pickled_dataframes(players)
+  loaded = 0
+  for data_type in player_data_types:
+    gamelogs = get_gamelog_store(data_type).gamelogs(players=players.keys())
+    for bref_id, gamelog in gamelogs.iteritems():
+      players[bref_id][data_type] = gamelog
+    loaded += len(gamelogs)
+  logging.debug('loaded %d dataframes from %s', loaded, datadir)
+  return players
+
+def migrate_gamelogs():
+  """
+  Move every player's pickled gamelogs into the gamelog stores. The pickles are left where they are.
+  :return int: number of gamelogs moved
+  """
+  player_dir = os.path.join(datadir, 'player_data')
+  filenames = os.listdir(player_dir) if os.path.exists(player_dir) else []
+  bref_ids = set(fn.rsplit('_', 1)[0] for fn in filenames if fn.rsplit('_', 1)[-1] in player_data_types)
+  players = load_pickled_dataframes({bref_id: {} for bref_id in bref_ids})
+  migrated = 0
+  for data_type in player_data_types:
+    gamelogs = {bref_id: attrs.get(data_type) for bref_id, attrs in players.iteritems()}
+    get_gamelog_store(data_type).write(gamelogs)
+    migrated += sum(gamelog is not None for gamelog in gamelogs.values())
+  # The pitching store now holds exactly these gamelogs, so the starters index is rebuilt from them in full
+  save_starting_pitcher_index({bref_id: attrs.get('pitching') for bref_id, attrs in players.iteritems()})
+  return migrated
+
+def migrate_cli():
+  ap = argparse.ArgumentParser(description='Move the pickled gamelogs of each player into the gamelog stores.')
+  ap.parse_args()
+  migrated = migrate_gamelogs()
+  print 'Moved %d gamelogs into %s' % (migrated, os.path.join(datadir, 'gamelogs'))
+
 def _parse_bsbr_prefix_section(prefix_section):
   # sample contents:
   '''
@@ -0,0 +1,93 @@
+"""
+Index of who started each game, built from the pitching gamelogs we scraped from baseball-reference.
+
+Games are identified by team, day and game number. Gamelog dates for doubleheaders carry the game number as their
+hour (see scrape_bsbr.dfFromGameLogURL), and other games are at midnight, i.e. game number 0.
+The index is saved next to the gamelogs whenever they are saved, so it doesn't have to be rebuilt from every
+pitcher's gamelog each time we load it.
+"""
+import os
+import pandas as pd
+
+from dfs import GLOBAL_ROOT
+from dfs.lazy import memoized
+from . import team_disambiguations
+
+starters_file = os.path.join(GLOBAL_ROOT, 'db/mlb/starting_pitchers.pickle')
+
+def build_starting_pitcher_index(pitching_gamelogs):
+  """
+  :param dict[str, pandas.DataFrame] pitching_gamelogs: pitching gamelog of each pitcher, indexed by date
+  :return pandas.Series: bref_id of the starting pitcher, indexed by (Tm, day, game number)
+  """
+  starts = []
+  for pitcher, df in pitching_gamelogs.iteritems():
+    if df is None or 'Entered' not in df.columns:
+      continue
+    # A pitcher who entered in the first inning started the game
+    started = df[df['Entered'].astype(str).str.strip().str.startswith('1') & pd.notnull(df.index)]
+    if len(started):
+      dates = pd.DatetimeIndex(started.index)
+      starts.append(pd.DataFrame({'Tm': started['Tm'].values,
+                                  'day': dates.normalize(),
+                                  'game': dates.hour,
+                                  'pitcher': pitcher}))
+  if not starts:
+    return pd.Series([], index=pd.MultiIndex.from_arrays([[], [], []], names=['Tm', 'day', 'game']), name='pitcher')
+  starts = pd.concat(starts, ignore_index=True)
+  # If the gamelogs disagree, just take one of the pitchers
+  return starts.groupby(['Tm', 'day', 'game'])['pitcher'].first()
+
+def save_starting_pitcher_index(pitching_gamelogs):
+  """
+  Rebuild the index from the given gamelogs and save it.
+  """
+  index = build_starting_pitcher_index(pitching_gamelogs)
+  index.to_pickle(starters_file)
+  load_starting_pitcher_index.reset()
+  return index
+
+def update_starting_pitcher_index(pitching_gamelogs):
+  """
+  Replace the given pitchers' starts in the saved index with the starts in their gamelogs, and save it. Everyone
+  else's starts are kept.
+  :param dict[str, pandas.DataFrame] pitching_gamelogs: complete pitching gamelogs of some pitchers
+  """
+  index = load_starting_pitcher_index()
+  index = index[~index.isin(list(pitching_gamelogs))]
+  # The new starts come first, so they win any game both have
+  index = pd.concat([build_starting_pitcher_index(pitching_gamelogs), index])
+  index = index.groupby(level=['Tm', 'day', 'game']).first()
+  index.name = 'pitcher'
+  index.to_pickle(starters_file)
+  load_starting_pitcher_index.reset()
+  return index
+
+@memoized
+def load_starting_pitcher_index():
+  """
+  :return pandas.Series: the saved index (built from the loaded gamelogs if it hasn't been saved yet)
+  """
+  if os.path.exists(starters_file):
+    return pd.read_pickle(starters_file)
+  from .gamelogs import load_gamelogs
+  index = build_starting_pitcher_index(load_gamelogs('pitching'))
+  index.to_pickle(starters_file)
+  return index
+
+def starting_pitcher(team, date):
+  """
+  :param str team: team TLA (baseball-reference's, or one of the synonyms in team_disambiguations)
+  :param datetime.datetime date: game date; for doubleheaders, the game number is the hour. A midnight date on a
+    doubleheader day means the first game.
+  :return str: bref_id of the team's starting pitcher, or None if we don't know who started
+  """
+  index = load_starting_pitcher_index()
+  date = pd.Timestamp(date)
+  games = [date.hour, 1] if date.hour == 0 else [date.hour]
+  for tla in [team, team_disambiguations.get(team)]:
+    for game in games:
+      pitcher = index.get((tla, date.normalize(), game))
+      if pitcher is not None:
+        return pitcher
+  return None
@@ -1,4 +1,6 @@
 import os
+import warnings
+import numpy as np
 import pandas
 import datetime
 
@@ -89,6 +91,53 @@ def load_nf_salaryinfo(sport, players):
       loaded += 1
   return player_dict
 
+def load_nf_table(sport, identifiers, salary=False, required_columns=()):
+  """
+  Load previously saved Numberfire data for many players at once, as one table.
+  :param str sport: which sport!
+  :param list[str] identifiers: ids of players to load (repeats are fine)
+  :param bool salary: load salary data rather than prediction data
+  :param list[str] required_columns: skip players whose data lacks any of these columns
+  :return DataFrame: data for all the players, indexed by (identifier, date). If a player has more than one row for a
+    date, the last one is kept.
+  """
+  loader = load_nf_salaryinfo if salary else load_nf_histplayerinfo
+  frames, loaded_identifiers = [], []
+  for identifier, player_data in sorted(loader(sport, set(identifiers)).items()):
+    if player_data is None:
+      continue
+    missing = [column for column in required_columns if column not in player_data]
+    if missing:
+      warnings.warn("Numberfire data for %s is missing %s; skipping it" % (identifier, ', '.join(missing)))
+      continue
+    frames.append(player_data)
+    loaded_identifiers.append(identifier)
+  if not frames:
+    return pandas.DataFrame(columns=list(required_columns),
+                            index=pandas.MultiIndex.from_arrays([[], []], names=['identifier', 'date']))
+  table = pandas.concat(frames, keys=loaded_identifiers, names=['identifier', 'date'])
+  # Index.duplicated keeps the first of each, so look from the end to keep the last
+  table = table.iloc[::-1]
+  return table[~table.index.duplicated()].iloc[::-1]
+
+def lookup_nf_table(data, table, identifier_column, date_column, columns):
+  """
+  Look up each row of data in a table from load_nf_table, with a single merge.
+  :param DataFrame data: rows to look up
+  :param DataFrame table: from load_nf_table
+  :param str identifier_column: column of data containing the player ID
+  :param str date_column: column of data containing the game date
+  :param list[str] columns: columns of table to return
+  :return DataFrame: columns from table, indexed like data; NaN where the table has no row for the player and date
+  """
+  keys = pandas.DataFrame({'identifier': data[identifier_column].values, 'date': data[date_column].values})
+  found = table.reindex(columns=columns).reset_index()
+  if not len(found):
+    return pandas.DataFrame(np.nan, index=data.index, columns=columns)
+  merged = keys.merge(found, how='left', on=['identifier', 'date'])
+  merged.index = data.index
+  return merged[columns]
+
 _cached_salary_dicts = None
 
 def get_day_salary_df(sport, gamedate, game="FanDuel"):
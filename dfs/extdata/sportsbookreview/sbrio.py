@@ -1,8 +1,14 @@
 import os
+import datetime
+import logging
+import numpy as np
 import pandas
 import dateutil
+from dfs import GLOBAL_ROOT
 from dfs.extdata.common.io import combine_dataframe_into_pickle_file
 
+logger = logging.getLogger(__name__)
+
 sbr_data_dir = os.path.join(GLOBAL_ROOT, 'db/{sport}/odds/sportsbookreview/')
 
 # Find the odds file for a specific day
@@ -29,3 +35,67 @@ def load_sbr_odds_info(sport, game_day):
   game_date = dateutil.parser.parse(game_day)
   df = pandas.read_pickle(get_gameday_filename(sport, game_date))
   return df
+
+def load_sbr_odds_table(sport, game_days):
+  """
+  Load previously saved odds for many days at once, as one table.
+  :param str sport: sport odds are from
+  :param list[datetime.date] game_days: days to load odds for (repeats are fine)
+  :return (pandas.DataFrame, list[datetime.date]): the odds of every day, with 'day', 'Tm' and 'game' columns (game
+    is the team's position in the day's listings, from 0 -- more than one for doubleheaders); and the days with no
+    odds saved
+  """
+  frames, missing_days = [], []
+  for day in sorted(set(pandas.Timestamp(day).date() for day in game_days)):
+    filename = get_gameday_filename(sport, datetime.datetime(day.year, day.month, day.day))
+    if not os.path.exists(filename):
+      missing_days.append(day)
+      continue
+    day_odds = pandas.read_pickle(filename)
+    frame = day_odds.reset_index(drop=True)
+    frame['day'] = pandas.Timestamp(day)
+    frame['Tm'] = day_odds.index.values
+    frame['game'] = frame.groupby('Tm').cumcount().values
+    frames.append(frame)
+  if not frames:
+    return pandas.DataFrame(columns=['day', 'Tm', 'game']), missing_days
+  return pandas.concat(frames, ignore_index=True), missing_days
+
+def lookup_sbr_odds(data, table, team_column, date_column, columns, game_by_hour=False):
+  """
+  Look up each row of data in a table from load_sbr_odds_table, with a single merge.
+  :param pandas.DataFrame data: rows to look up
+  :param pandas.DataFrame table: from load_sbr_odds_table
+  :param str team_column: column of data containing the team
+  :param str date_column: column of data containing the game date
+  :param list[str] columns: columns of table to return
+  :param bool game_by_hour: when the team is listed more than once on the day, take the listing whose position is
+    the hour of the row's date (how the MLB gamelogs number doubleheaders), rather than the first
+  :return (pandas.DataFrame, numpy.ndarray): columns from table, indexed like data (NaN where the table has no such
+    listing); and whether the row's team is listed on the row's day at all
+  """
+  dates = pandas.DatetimeIndex(data[date_column].values)
+  keys = pandas.DataFrame({'day': dates.normalize(), 'Tm': data[team_column].values})
+  if not len(table):
+    return pandas.DataFrame(np.nan, index=data.index, columns=columns), np.zeros(len(data), dtype=bool)
+  listings = table.groupby(['day', 'Tm']).size()
+  listed = listings.reindex(pandas.MultiIndex.from_arrays([keys['day'], keys['Tm']])).fillna(0).values
+  keys['game'] = np.where(listed > 1, dates.hour if game_by_hour else 0, 0)
+  merged = keys.merge(table.reindex(columns=['day', 'Tm', 'game'] + list(columns)), how='left',
+                      on=['day', 'Tm', 'game'])
+  merged.index = data.index
+  return merged[columns], listed > 0
+
+def report_odds_coverage(sport, data, date_column, missing_days, listed):
+  """
+  Log how many of the rows' days have no odds saved, and how many rows' teams aren't listed on their day.
+  """
+  days = pandas.DatetimeIndex(data[date_column].values).normalize()
+  if missing_days:
+    logger.warning('No %s odds saved for %d of %d days: %s', sport, len(missing_days), len(set(days)),
+                   ', '.join(day.isoformat() for day in missing_days))
+  unlisted = ~listed
+  if unlisted.any():
+    on_saved_days = ~days.isin([pandas.Timestamp(day) for day in missing_days])
+    logger.warning('No %s odds found for %d of %d rows (%d of them on days with odds saved)', sport, unlisted.sum(),
+                   len(listed), (unlisted & on_saved_days).sum())
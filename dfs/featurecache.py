@@ -0,0 +1,217 @@
+'''
+On-disk cache of featurizer results, in a sqlite database.
+
+Results are stored by featurizer, by version and by the values of the featurizer's input columns. The version is a
+hash of the source code of the featurizer and of the helpers it calls, plus anything else the featurizer declares it
+depends on (bump a data version when re-scraping changes its source data), so editing a featurizer or a helper leaves
+the old results behind rather than serving them. Writes are batched, and the oldest entries are evicted once the cache outgrows its size or age limits.
+'''
+import atexit
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import time
+from collections import defaultdict
+
+def _source(obj):
+  try:
+    return inspect.getsource(obj)
+  except (IOError, TypeError):
+    code = getattr(obj, '__code__', None)
+    return repr(code.co_code) if code is not None else repr(obj)
+
+def _code_objects(code):
+  yield code
+  for const in code.co_consts:
+    if inspect.iscode(const):
+      for inner in _code_objects(const):
+        yield inner
+
+def _plain(value):
+  """
+  :return bool: whether repr(value) is the same from one run to the next
+  """
+  if isinstance(value, (list, tuple)):
+    return all(_plain(item) for item in value)
+  return value is None or isinstance(value, (bool, int, long, float, basestring))
+
+def _references(obj):
+  """
+  :return list: what a function (or the methods of a class) refers to: the globals its code names, and the values in
+    its closure
+  """
+  if inspect.isclass(obj):
+    methods = [getattr(member, '__func__', member) for _, member in sorted(vars(obj).items())]
+    return [ref for method in methods if inspect.isfunction(method) for ref in _references(method)]
+  if not inspect.isfunction(obj):
+    return []
+  names = sorted(set(name for code in _code_objects(obj.__code__) for name in code.co_names))
+  references = [obj.__globals__[name] for name in names if name in obj.__globals__]
+  return references + [cell.cell_contents for cell in obj.__closure__ or ()]
+
+def code_version(func, data_version=None):
+  """
+  :param function func: featurizer function
+  :param data_version: anything else the results depend on (e.g. a version number for the source data)
+  :return str: a version string that changes whenever the source code of func or of the functions and classes it
+    uses from its own package (followed all the way down) changes, or data_version does
+  """
+  package = (getattr(func, '__module__', None) or '').split('.')[0]
+  parts, seen, pending = [], set(), [func]
+  while pending:
+    obj = pending.pop(0)
+    if id(obj) in seen:
+      continue
+    seen.add(id(obj))
+    parts.append(_source(obj))
+    for ref in _references(obj):
+      if (inspect.isfunction(ref) or inspect.isclass(ref)) and \
+         (getattr(ref, '__module__', None) or '').split('.')[0] == package:
+        pending.append(ref)
+      elif _plain(ref):
+        # Constants, and settings a featurizer factory closed over (e.g. the window of a rolling mean)
+        parts.append(repr(ref))
+  return hashlib.md5(('|'.join(parts) + '|' + repr(data_version)).encode('utf-8')).hexdigest()
+
+class FeatureCache(object):
+  """
+  Featurizer results stored on disk. Look results up with get and store them with put; stored results are written
+  out every batch_size puts, on flush, and when the program exits.
+  """
+  def __init__(self, path, max_entries=None, max_age_days=None, batch_size=1000):
+    """
+    :param str path: sqlite database file (created if it doesn't exist)
+    :param int max_entries: keep at most this many results, dropping the oldest first
+    :param float max_age_days: drop results stored longer ago than this
+    :param int batch_size: number of new results to hold before writing them out
+    """
+    self.path = path
+    self.max_entries = max_entries
+    self.max_age_days = max_age_days
+    self.batch_size = batch_size
+    self.pending = {}
+    self.hits = defaultdict(int)
+    self.misses = defaultdict(int)
+    self._connection = None
+    atexit.register(self.close)
+
+  @property
+  def connection(self):
+    # Connect on first use, so that just importing a featurizer module doesn't touch the disk
+    if self._connection is None:
+      directory = os.path.dirname(self.path)
+      if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+      self._connection = sqlite3.connect(self.path)
+      self._connection.execute('CREATE TABLE IF NOT EXISTS results (featurizer TEXT, version TEXT, key TEXT, '
+                               'value BLOB, stored REAL, PRIMARY KEY (featurizer, version, key))')
+      self._connection.execute('CREATE INDEX IF NOT EXISTS results_by_age ON results (stored)')
+      self.evict()
+    return self._connection
+
+  def get(self, featurizer, version, key):
+    """
+    :param str featurizer: featurizer name
+    :param str version: featurizer version (see code_version)
+    :param str key: the featurizer's input values
+    :return (bool, object): whether the result was found, and the result
+    """
+    if (featurizer, version, key) in self.pending:
+      self.hits[featurizer] += 1
+      return True, self.pending[(featurizer, version, key)]
+    row = self.connection.execute('SELECT value FROM results WHERE featurizer = ? AND version = ? AND key = ?',
+                                  (featurizer, version, key)).fetchone()
+    if row is None:
+      self.misses[featurizer] += 1
+      return False, None
+    self.hits[featurizer] += 1
+    return True, pickle.loads(bytes(row[0]))
+
+  def contains(self, featurizer, version, key):
+    """
+    Like get, but only says whether the result is stored (and doesn't count towards the hit rates).
+    :return bool: whether the result was found
+    """
+    if (featurizer, version, key) in self.pending:
+      return True
+    return self.connection.execute('SELECT 1 FROM results WHERE featurizer = ? AND version = ? AND key = ?',
+                                   (featurizer, version, key)).fetchone() is not None
+
+  def put(self, featurizer, version, key, value):
+    self.pending[(featurizer, version, key)] = value
+    if len(self.pending) >= self.batch_size:
+      self.flush()
+
+  def flush(self):
+    """
+    Write out the results stored since the last flush.
+    """
+    if not self.pending:
+      return
+    now = time.time()
+    rows = [(featurizer, version, key, sqlite3.Binary(pickle.dumps(value, 2)), now)
+            for (featurizer, version, key), value in self.pending.items()]
+    with self.connection:
+      self.connection.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)', rows)
+    self.pending = {}
+    self.evict()
+
+  def close(self):
+    """
+    Write out any unsaved results and disconnect.
+    """
+    self.flush()
+    if self._connection is not None:
+      self._connection.close()
+      self._connection = None
+
+  def forked(self):
+    """
+    Start afresh in a forked worker process, which mustn't share its parent's connection. The parent keeps its own
+    unsaved results and counts.
+    """
+    self._connection = None
+    self.pending = {}
+    self.hits = defaultdict(int)
+    self.misses = defaultdict(int)
+
+  def evict(self):
+    """
+    Drop results that are too old, then the oldest results until there are no more than max_entries.
+    """
+    with self._connection:
+      if self.max_age_days is not None:
+        self._connection.execute('DELETE FROM results WHERE stored < ?',
+                                 (time.time() - self.max_age_days * 24 * 60 * 60,))
+      if self.max_entries is not None:
+        self._connection.execute('DELETE FROM results WHERE rowid IN '
+                                 '(SELECT rowid FROM results ORDER BY stored DESC LIMIT -1 OFFSET ?)',
+                                 (self.max_entries,))
+
+  def clear(self, featurizer=None):
+    """
+    Drop every stored result (or just the results for one featurizer).
+    """
+    self.pending = {key: value for key, value in self.pending.items() if featurizer not in (None, key[0])}
+    with self.connection:
+      if featurizer is None:
+        self.connection.execute('DELETE FROM results')
+      else:
+        self.connection.execute('DELETE FROM results WHERE featurizer = ?', (featurizer,))
+
+  def hit_rates(self):
+    """
+    :return dict[str, (int, int, float)]: for each featurizer looked up so far: hits, misses and hit rate
+    """
+    return {featurizer: (self.hits[featurizer], self.misses[featurizer],
+                         float(self.hits[featurizer]) / (self.hits[featurizer] + self.misses[featurizer]))
+            for featurizer in set(self.hits) | set(self.misses)}
+
+  def report(self):
+    """
+    :return str: hit rates, one featurizer per line
+    """
+    return '\n'.join('  %s: %d hits, %d misses (%.1f%% hit rate)' % (featurizer, hits, misses, 100 * rate)
+                     for featurizer, (hits, misses, rate) in sorted(self.hit_rates().items()))
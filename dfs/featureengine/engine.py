@@ -0,0 +1,201 @@
+'''
+Runs the featurizers of a registry over game rows, and joins their output onto the rows.
+
+Columnar (frame) featurizers expand every row in one call. Row featurizers run row by row, optionally spread over
+forked worker processes. Results can come from an expansion store (rows expanded before by the same featurizer
+versions) or a feature source such as the NBA point-in-time feature store, and only the rest are computed.
+'''
+from functools import partial
+import logging
+import pandas as pd, numpy as np
+from contexttimer import Timer
+
+from dfs.parallel import map_shards
+from .registry import registries, feature_cache_key
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.FileHandler('./pipeline.log'))
+logger.setLevel(logging.DEBUG)
+
+def expand_rows(registry, data, feature_name, func, columns):
+  """
+  Run a row featurizer over every row of data.
+  :return pd.DataFrame: the featurizer's output columns, indexed like data
+  """
+  results = []
+  for index, row in data.iterrows():
+    try:
+      results.append(func(row))
+    except Exception:
+      logger.error('Exception raised while expanding %s on %s', feature_name, row)
+      raise
+  if registry.row_results == 'series':
+    # Generate DataFrame by combining Series results of featurizer
+    return pd.DataFrame(results, index=data.index)
+  # No data for a row comes back as an empty list; fill it in, or a shard with no data at all has no columns
+  results = [[np.nan] * len(columns) if result is None or len(result) == 0 else result for result in results]
+  return pd.DataFrame(results, index=data.index, columns=columns)
+
+def _expand_shard(shard, registry_name, live, featurizers):
+  """
+  Worker process body: run the row featurizers over one shard of the input.
+  :return (dict[str, pd.DataFrame], set, dict, dict): new feature data by featurizer, players expanded, and feature
+    cache hits and misses, for the parent to collect
+  """
+  registry = registries[registry_name]
+  new_feature_data = {feature_name: expand_rows(registry, shard, feature_name, func, columns)
+                      for feature_name, (func, columns) in registry.targets(live=live, featurizers=featurizers)
+                      if feature_name not in registry.frame_generators}
+  hits, misses = {}, {}
+  if registry.cache is not None:
+    registry.cache.flush()
+    hits, misses = dict(registry.cache.hits), dict(registry.cache.misses)
+  return new_feature_data, registry.expanded_players, hits, misses
+
+def expand_rows_in_parallel(registry, data, live, workers, featurizers=None):
+  """
+  Run the row featurizers over shards of the input in forked worker processes. Each player's rows stay in one shard,
+  so the per-player data caches still do their job.
+  :return dict[str, pd.DataFrame]: new feature data for each row featurizer, indexed like data
+  """
+  positional_data = data.reset_index(drop=True)
+  if registry.preload is not None:
+    registry.preload()  # before forking, so the workers share it
+  initializer = registry.cache.forked if registry.cache is not None else None
+  results, shards = map_shards(partial(_expand_shard, registry_name=registry.name, live=live, featurizers=featurizers),
+                               positional_data, positional_data[registry.player_column], workers,
+                               initializer=initializer)
+  for _, players, hits, misses in results:
+    registry.expanded_players.update(players)
+    for feature_name, count in hits.items():
+      registry.cache.hits[feature_name] += count
+    for feature_name, count in misses.items():
+      registry.cache.misses[feature_name] += count
+  row_feature_data = {}
+  for feature_name in (results[0][0] if results else {}):
+    # Put the shards back in the original row order
+    new_feature_data = pd.concat([new_feature_data[feature_name] for new_feature_data, _, _, _ in results])
+    new_feature_data = new_feature_data.reindex(positional_data.index)
+    new_feature_data.index = data.index
+    row_feature_data[feature_name] = new_feature_data
+  return row_feature_data
+
+def _rows_to_expand(registry, data, targets, store=None, feature_source=None):
+  """
+  :return (dict[str, pd.DataFrame], dict[str, pd.DataFrame]): for each featurizer, its results already in the
+    feature source or expansion store, and the rows of data it still has to expand
+  """
+  stored_feature_data = {}
+  rows_to_expand = {}
+  from_feature_source = set()
+  if feature_source is not None:
+    from_feature_source = feature_source.provides(set(feature_name for feature_name, _ in targets))
+    feature_source.prepare(data, from_feature_source)
+  for feature_name, (func, columns) in targets:
+    if feature_name in from_feature_source:
+      stored_feature_data[feature_name] = feature_source.features(data, feature_name)
+      rows_to_expand[feature_name] = data.iloc[:0]
+    elif store is not None:
+      stored = store.load(feature_name, registry.versions[feature_name], data, columns)
+      logger.info('%s: %d of %d rows in the expansion store', feature_name, len(stored), len(data))
+      stored_feature_data[feature_name] = stored
+      rows_to_expand[feature_name] = data[~data.index.isin(stored.index)]
+    else:
+      rows_to_expand[feature_name] = data
+  return stored_feature_data, rows_to_expand
+
+def expansion_plan(registry, data, live=False, featurizers=None, store=None, feature_source=None):
+  """
+  Work out what expand would run, without running it.
+  :return pd.DataFrame: one row for each featurizer that would run: whether it expands every row at once ('frame'),
+    row by row ('row') or is read from the feature source ('store'), and how many rows it would compute (for cached
+    featurizers, the rows not cached yet; for the feature source, the rows it doesn't have yet)
+  """
+  targets = list(registry.targets(live=live, featurizers=featurizers))
+  _, rows_to_expand = _rows_to_expand(registry, data, targets, store)
+  plan = {}
+  from_feature_source = feature_source.provides(set(feature_name for feature_name, _ in targets)) \
+    if feature_source is not None else set()
+  for feature_name, (func, columns) in targets:
+    rows = rows_to_expand[feature_name]
+    if feature_name in from_feature_source:
+      kind, computed = 'store', feature_source.missing(data, feature_name)
+    elif feature_name in registry.frame_generators:
+      kind, computed = 'frame', len(rows)
+    elif feature_name in registry.cached_inputs and registry.cache is not None:
+      input_columns, version = registry.cached_inputs[feature_name]
+      keys = set(feature_cache_key(row, input_columns) for index, row in rows.iterrows())
+      kind, computed = 'row', sum(not registry.cache.contains(feature_name, version, key) for key in keys)
+    else:
+      kind, computed = 'row', len(rows)
+    plan[feature_name] = {'kind': kind, 'columns': len(columns), 'rows': len(data), 'computed': computed}
+  return pd.DataFrame.from_dict(plan, orient='index').reindex(columns=['kind', 'columns', 'rows', 'computed'])
+
+def expand(registry, data, live=False, workers=1, featurizers=None, store=None, feature_source=None):
+  """
+  Run the registry's featurizers over the input rows, and join on the new columns.
+  :param FeaturizerRegistry registry: featurizers for this kind of row
+  :param pd.DataFrame data: dumped player stats
+  :param bool live: only run the featurizers used for live data
+  :param int workers: run the row featurizers in this many processes (the output is the same however many)
+  :param set[str] featurizers: only run these featurizers (by default, run every featurizer)
+  :param dfs.expansionstore.ExpansionStore store: take rows expanded before by the same featurizer versions from this
+    store, and store the newly expanded ones
+  :param feature_source: reads features it holds instead of expanding them (see dfs.featurestore.StoredFeatures)
+  :return pd.DataFrame: data with the expanded columns added, with a fresh index
+  """
+  targets = list(registry.targets(live=live, featurizers=featurizers))
+  stored_feature_data, rows_to_expand = _rows_to_expand(registry, data, targets, store, feature_source)
+  row_feature_data = {}
+  row_featurizers = set(feature_name for feature_name, rows in rows_to_expand.iteritems()
+                        if len(rows) and feature_name not in registry.frame_generators)
+  if workers > 1 and row_featurizers:
+    logger.info('Expanding row featurizers in %d processes...', workers)
+    with Timer() as t:
+      needed = np.zeros(len(data), dtype=bool)
+      for feature_name in row_featurizers:
+        needed |= data.index.isin(rows_to_expand[feature_name].index)
+      row_feature_data = expand_rows_in_parallel(registry, data[needed], live, workers, row_featurizers)
+    logger.info('  took %d seconds', t.elapsed)
+  new_feature_dataframes = [data]
+  for feature_name, (func, columns) in targets:
+    rows = rows_to_expand[feature_name]
+    with Timer() as t:
+      logger.info('Expanding %s (provides: %s)...', feature_name, ','.join(columns))
+      if len(rows) == 0:
+        # Typed, so that joining it onto stored results doesn't turn them into objects
+        new_feature_data = pd.DataFrame(index=rows.index, columns=columns, dtype=float)
+      elif feature_name in registry.frame_generators:
+        # Columnar featurizer: expand every row in one call
+        new_feature_data = registry.frame_generators[feature_name](rows)
+      elif feature_name in row_feature_data:
+        new_feature_data = row_feature_data[feature_name].reindex(rows.index)
+      else:
+        new_feature_data = expand_rows(registry, rows, feature_name, func, columns)
+      if store is not None and len(rows):
+        store.append(feature_name, registry.versions[feature_name], rows, new_feature_data)
+      if feature_name in stored_feature_data:
+        # Only join on parts with rows: an empty part has no types, and would turn every column into objects
+        parts = [part for part in [stored_feature_data[feature_name], new_feature_data] if len(part)]
+        new_feature_data = pd.concat(parts or [new_feature_data]).reindex(data.index)
+      # Rename columns of new DataFrame to have full name of featurizer+data
+      new_feature_data.rename(columns=dict(zip(columns, registry.encode_names(feature_name, columns))), inplace=True)
+      new_feature_dataframes.append(new_feature_data)
+    logger.info('  took %d seconds', t.elapsed)
+  if registry.cache is not None:
+    registry.cache.flush()
+  # Stitch the expanded data together onto the input (dataframe of games played)
+  expanded_data = pd.concat(new_feature_dataframes, axis=1)
+  # After doing all that concatenation the index is super weird so just reset / nuke it
+  expanded_data.reset_index(drop=True, inplace=True)
+  return expanded_data
+
+def discretize(expanded_data, columns):
+  """
+  Transform categorical variables to indicator variables, e.g. 'Team:Stadium' into 'Team:Stadium=Lambeau', ...
+  :param pd.DataFrame expanded_data: expanded data
+  :param list[str] columns: the columns that may be discretized (those holding strings are)
+  :return pd.DataFrame: discretized data
+  """
+  categorical_cols = [c for c in columns if expanded_data[c].dtype.name == 'object']
+  return pd.get_dummies(expanded_data, prefix_sep='=', columns=categorical_cols)
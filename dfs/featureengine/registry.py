@@ -0,0 +1,177 @@
+'''
+Registries of featurizers: the functions that expand game rows with new feature columns.
+
+Each kind of game row (NBA players, MLB batters, MLB pitchers) has its own registry. Sport modules declare their
+featurizers with a registry's decorators, and dfs.featureengine.engine runs them.
+'''
+import warnings
+import pandas as pd, numpy as np
+from dfs.featurecache import code_version
+
+# Every registry by name, so that worker processes can find theirs
+registries = {}
+
+def feature_cache_key(row, input_columns):
+  """
+  :return str: the key a cached featurizer stores its result for row under
+  """
+  return str(list(row.loc[input_columns].values))
+
+class FeaturizerRegistry(object):
+  """
+  The featurizers for one kind of game row, with their output columns, versions and requirements.
+  """
+  def __init__(self, name, player_column='bref_id', name_separator=':', row_results='series', cache=None,
+               preload=None, expanded_players=None):
+    """
+    :param str name: name of the registry, unique among registries
+    :param str player_column: column of a game row holding the player; each player's rows are expanded together
+    :param str name_separator: goes between the featurizer name and the column name in expanded column names
+    :param str row_results: how row featurizers hand back their values: 'series' turns each result (a list, or None
+      for no data) into a pandas.Series indexed by the output columns, and 'list' leaves results as they are, to be
+      padded with NaN if short
+    :param dfs.featurecache.FeatureCache cache: where cached featurizers keep their results
+    :param function preload: loads the data the featurizers read; called before forking worker processes, so that
+      they all share it
+    :param set expanded_players: players some featurizer found outside data for (e.g. Numberfire projections); the
+      featurizers add to it, and the engine merges in what worker processes add
+    """
+    assert name not in registries
+    self.name = name
+    self.player_column = player_column
+    self.name_separator = name_separator
+    self.row_results = row_results
+    self.cache = cache
+    self.preload = preload
+    self.expanded_players = expanded_players if expanded_players is not None else set()
+    self.generators = {}
+    self.frame_generators = {}
+    self.requirements = {}
+    self.versions = {}
+    self.cached_inputs = {}
+    registries[name] = self
+
+  def featurizer(self, name=None, output_columns=None, live=True, requires=()):
+    """
+    Decorator for functions that expand data by creating new feature columns.
+    The decorated expansion function should take as input a game row and return one value for each of
+      output_columns, in order. It may return None (or nothing at all) if it can't load data, which turns into NaNs.
+    :param name: name of featurizer, prepended to each column name
+    :param output_columns: list of features generated
+    :param bool live: whether to use this featurizer when expanding live data
+    :param list[str] requires: names of other featurizers to expand whenever this one is
+    :return: the featurizer as registered
+    """
+    def decorated(func):
+      func_name = name or func.__name__
+      assert func_name not in self.generators
+      self.requirements[func_name] = list(requires)
+      # A cached featurizer carries the version of the function it wraps
+      self.versions[func_name] = getattr(func, 'version', None) or code_version(func)
+      if self.row_results == 'series':
+        def wrapper(*args, **kwargs):
+          result = func(*args, **kwargs)
+          if result is None or (isinstance(result, list) and not result):
+            return pd.Series(data=np.nan, index=output_columns)
+          else:
+            return pd.Series(data=result, index=output_columns)
+      else:
+        wrapper = func
+      self.generators[func_name] = (wrapper, output_columns, live)
+      return wrapper
+    return decorated
+
+  def frame_featurizer(self, name, output_columns=None, live=True):
+    """
+    Decorator for functions that expand a whole DataFrame of game rows at once, which is much faster than calling a
+    row featurizer on every row. The decorated function should take the DataFrame and return a DataFrame of the new
+    columns (named as in output_columns), indexed like the input; rows or columns it leaves out become NaN.
+    If a row featurizer with this name is already registered, this is its columnar version and expansion uses it
+    instead. Otherwise it is registered as a featurizer in its own right, with a row version built on top of it.
+    :param name: name of featurizer, prepended to each column name
+    :param output_columns: list of features generated (only needed if there is no row featurizer with this name)
+    :param bool live: whether to use this featurizer when expanding live data (likewise)
+    :return: the columnar featurizer as registered
+    """
+    def decorated(func):
+      assert name not in self.frame_generators
+      if name not in self.generators:
+        def row_wrapper(row):
+          result = wrapper(pd.DataFrame([row])).iloc[0]
+          return result if self.row_results == 'series' else list(result.values)
+        self.generators[name] = (row_wrapper, output_columns, live)
+        self.requirements[name] = []
+      # Either version changing means earlier results may be wrong
+      self.versions[name] = code_version(func, data_version=self.versions.get(name))
+      columns = self.generators[name][1]
+      def wrapper(data):
+        return func(data).reindex(index=data.index, columns=columns)
+      self.frame_generators[name] = wrapper
+      return wrapper
+    return decorated
+
+  def cached_featurizer(self, name=None, input_columns=None, data_version=None):
+    """
+    Decorator caching a row featurizer's results in the registry's cache, keyed by the row's values for
+    input_columns. Results are kept separately for each version of the featurizer's code, so editing it starts it
+    afresh. Apply it underneath the featurizer decorator.
+    :param name: name of featurizer
+    :param input_columns: the columns of the row the featurizer's result depends on
+    :param data_version: bump this when the featurizer's source data changes, to stop using old results
+    :return:
+    """
+    def decorated(func):
+      version = code_version(func, data_version)
+      self.cached_inputs[name] = (input_columns, version)
+      def wrapper(*args, **kwargs):
+        cache_key = feature_cache_key(args[0], input_columns)
+        found, result = self.cache.get(name, version, cache_key)
+        if not found:
+          result = func(*args, **kwargs)
+          self.cache.put(name, version, cache_key, result)
+        return result
+      wrapper.version = version
+      return wrapper
+    return decorated
+
+  def encode_names(self, feature_name, columns):
+    """
+    :return list[str]: the expanded column names of a featurizer's output columns
+    """
+    return [feature_name + self.name_separator + col for col in columns]
+
+  def targets(self, live=False, featurizers=None):
+    """
+    :param bool live: only the featurizers used for live data
+    :param set[str] featurizers: only these featurizers
+    :return: (name, (row featurizer, output columns)) for each featurizer to expand
+    """
+    for feature_name, (func, columns, is_live) in self.generators.iteritems():
+      if featurizers is not None and feature_name not in featurizers:
+        continue
+      if (live and is_live) or not live:
+        yield feature_name, (func, columns)
+
+  def featurizers_for_attrs(self, attrs):
+    """
+    Work out which featurizers we need to expand to get the given attributes.
+    :param list[str] attrs: attribute names, 'Featurizer<separator>column' (or 'Featurizer<separator>column=value'
+      for discretized columns). Attributes without a featurizer name are dumped columns and need no featurizer.
+    :return set[str]: names of the featurizers producing those attributes, plus the featurizers they require
+    """
+    pending = []
+    for attr in attrs:
+      if self.name_separator not in attr:
+        continue
+      feature_name = attr.split(self.name_separator, 1)[0]
+      if feature_name not in self.generators:
+        warnings.warn("No featurizer produces attribute %s" % attr)
+        continue
+      pending.append(feature_name)
+    featurizers = set()
+    while pending:
+      feature_name = pending.pop()
+      if feature_name not in featurizers:
+        featurizers.add(feature_name)
+        pending.extend(self.requirements[feature_name])
+    return featurizers
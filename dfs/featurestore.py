@@ -0,0 +1,254 @@
+'''
+Point-in-time feature tables on disk.
+
+A featurizer whose result only depends on a few of a row's columns -- an entity (a player, a team) and a date -- can
+be materialized ahead of time into a table of its results for each (entity, date). Each result only uses what was
+known before its date, so looking rows up by entity and date can't leak later information into training data, and
+training and live scoring read the very same values. Each featurizer's table is a pickled DataFrame plus the chunks of
+rows added since it was last compacted, and is dropped when the featurizer's version changes. Rows with no values at all
+(say, a slate materialized before its Numberfire data was scraped) aren't stored, so they are computed afresh next time.
+'''
+import os
+import logging
+import numpy as np
+import pandas as pd
+from contexttimer import Timer
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.FileHandler('./pipeline.log'))
+logger.setLevel(logging.DEBUG)
+
+def _day_numbers(dates):
+  return pd.to_datetime(pd.Series(dates)).values.astype('datetime64[D]').astype(np.int64)
+
+def _entity_codes(table_entities, query_entities):
+  """
+  :param pandas.DataFrame table_entities: entity columns of the stored rows
+  :param pandas.DataFrame query_entities: the same columns of the rows to look up
+  :return (numpy.ndarray, numpy.ndarray): integer codes for the stored and looked up entities (equal if the entities
+    are equal)
+  """
+  def joined(entities):
+    if len(entities.columns) == 1:
+      return list(entities.iloc[:, 0])
+    return ['|'.join(str(value) for value in values) for values in zip(*[entities[col] for col in entities.columns])]
+  codes = pd.factorize(np.array(joined(table_entities) + joined(query_entities), dtype=object))[0]
+  return codes[:len(table_entities)], codes[len(table_entities):]
+
+def _last_per_key(data, key_columns):
+  """
+  :return numpy.ndarray: positions of the last row of data for each key, in order
+  """
+  codes, _ = _entity_codes(data[key_columns[:-1]], data[key_columns[:-1]].iloc[:0])
+  days = _day_numbers(data[key_columns[-1]])
+  keys = codes.astype(np.int64) * (days.max() - days.min() + 1) + (days - days.min())
+  _, last = np.unique(keys[::-1], return_index=True)
+  return np.sort(len(keys) - 1 - last)
+
+class FeatureStore(object):
+  """
+  Point-in-time feature tables, one per featurizer, in a directory. Fill them in with add and read them with as_of.
+  """
+  def __init__(self, root, max_chunks=20):
+    """
+    :param str root: directory holding the tables (created if it doesn't exist)
+    :param int max_chunks: rewrite a table as one file once this many chunks have been added to it
+    """
+    self.root = root
+    self.max_chunks = max_chunks
+    # name -> (version, data, whether every file on disk holds this version)
+    self.tables = {}
+
+  def _path(self, name):
+    return os.path.join(self.root, name + '.pickle')
+
+  def _chunk_paths(self, name):
+    """
+    :return list[str]: the chunks added to a table since it was last compacted, oldest first
+    """
+    if not os.path.exists(self.root):
+      return []
+    chunks = [fn.split('.') for fn in os.listdir(self.root) if fn.startswith(name + '.') and fn.endswith('.chunk')]
+    return [os.path.join(self.root, '%s.%s.chunk' % (name, seq))
+            for seq in sorted(int(parts[1]) for parts in chunks if len(parts) == 3 and parts[1].isdigit())]
+
+  def table(self, name, version, key_columns, columns):
+    """
+    :param str name: featurizer name
+    :param str version: featurizer version; rows stored by any other version are ignored
+    :param list[str] key_columns: entity columns, then the date column
+    :param list[str] columns: the featurizer's output columns
+    :return pandas.DataFrame: the stored rows, key columns then output columns
+    """
+    if name not in self.tables or self.tables[name][0] != version:
+      paths = ([self._path(name)] if os.path.exists(self._path(name)) else []) + self._chunk_paths(name)
+      parts = []
+      for path in paths:
+        stored = pd.read_pickle(path)
+        if stored['version'] == version:
+          parts.append(stored['data'])
+      if not parts:
+        data = pd.DataFrame(columns=list(key_columns) + list(columns))
+      elif len(parts) == 1:
+        data = parts[0]
+      else:
+        # Later chunks replace earlier rows for the same keys
+        data = pd.concat(parts, ignore_index=True)
+        data = data.iloc[_last_per_key(data, list(key_columns))].reset_index(drop=True)
+      self.tables[name] = (version, data, len(parts) == len(paths))
+    return self.tables[name][1]
+
+  def _stored_keys(self, name, version, key_columns):
+    stored = self.table(name, version, key_columns, [])
+    return set(zip(*[stored[col] for col in key_columns[:-1]] + [_day_numbers(stored[key_columns[-1]])]))
+
+  def _is_stored(self, stored_keys, keys):
+    key_columns = list(keys.columns)
+    query_keys = zip(*[keys[col] for col in key_columns[:-1]] + [_day_numbers(keys[key_columns[-1]])])
+    return np.array([key in stored_keys for key in query_keys], dtype=bool)
+
+  def missing(self, name, version, keys):
+    """
+    :param pandas.DataFrame keys: key columns of some rows
+    :return pandas.DataFrame: the distinct rows of keys not stored yet
+    """
+    keys = keys.drop_duplicates()
+    return keys[~self._is_stored(self._stored_keys(name, version, list(keys.columns)), keys)]
+
+  def _write(self, path, version, data):
+    # Write alongside and then swap in, so a reader never sees half a file
+    pd.to_pickle({'version': version, 'data': data}, path + '.tmp')
+    os.rename(path + '.tmp', path)
+
+  def add(self, name, version, keys, values):
+    """
+    Store new rows (replacing any already stored for the same keys), skipping rows whose values are all missing. Only
+    the new rows are written out, as a chunk, until there are max_chunks of them and the table is compacted.
+    :param pandas.DataFrame keys: distinct key columns of the new rows
+    :param pandas.DataFrame values: the featurizer's output for them, indexed like keys
+    """
+    key_columns = list(keys.columns)
+    stored = self.table(name, version, key_columns, list(values.columns))
+    values = values.reindex(keys.index)
+    has_values = values.notnull().any(axis=1).values
+    if not has_values.any():
+      return
+    new_rows = pd.concat([keys[has_values], values[has_values]], axis=1)
+    new_rows[key_columns[-1]] = pd.to_datetime(new_rows[key_columns[-1]])
+    new_rows = new_rows.reset_index(drop=True)
+    replaced = self._is_stored(set(zip(*[new_rows[col] for col in key_columns[:-1]] +
+                                        [_day_numbers(new_rows[key_columns[-1]])])), stored[key_columns])
+    if len(stored):
+      data = pd.concat([stored[~replaced], new_rows], ignore_index=True)
+    else:
+      data = new_rows
+    if not os.path.exists(self.root):
+      os.makedirs(self.root)
+    chunks = self._chunk_paths(name)
+    if not self.tables[name][2] or len(chunks) + 1 >= self.max_chunks:
+      # Compact: one file with every row, and no chunks (or rows of other versions) left over
+      self._write(self._path(name), version, data)
+      for path in chunks:
+        os.remove(path)
+    else:
+      seq = int(os.path.basename(chunks[-1]).split('.')[1]) + 1 if chunks else 0
+      self._write(os.path.join(self.root, '%s.%d.chunk' % (name, seq)), version, new_rows)
+    self.tables[name] = (version, data, True)
+
+  def as_of(self, name, version, data, key_columns, columns, max_staleness_days=0):
+    """
+    Look up each row's features as of its date: the stored row for the same entity with the latest date on or before
+    the row's date, and no more than max_staleness_days before it.
+    :param pandas.DataFrame data: rows to look up, with the key columns
+    :param list[str] key_columns: entity columns, then the date column
+    :param list[str] columns: the featurizer's output columns
+    :param int max_staleness_days: 0 only uses rows stored for the exact date
+    :return pandas.DataFrame: features for each row of data (NaN where there is no stored row), indexed like data
+    """
+    stored = self.table(name, version, key_columns, columns)
+    if len(stored) == 0 or len(data) == 0:
+      return pd.DataFrame(index=data.index, columns=columns, dtype=float)
+    entity_columns, date_column = list(key_columns[:-1]), key_columns[-1]
+    stored_codes, query_codes = _entity_codes(stored[entity_columns], data[entity_columns])
+    stored_days, query_days = _day_numbers(stored[date_column]), _day_numbers(data[date_column])
+    # Order the stored rows by entity and day, and find the last one at or before each row's entity and day
+    order = np.lexsort((stored_days, stored_codes))
+    stored_codes, stored_days = stored_codes[order], stored_days[order]
+    first_day = min(stored_days.min(), query_days.min())
+    span = max(stored_days.max(), query_days.max()) - first_day + 1
+    found = np.searchsorted(stored_codes.astype(np.int64) * span + (stored_days - first_day),
+                            query_codes.astype(np.int64) * span + (query_days - first_day), side='right') - 1
+    valid = found >= 0
+    found[~valid] = 0
+    valid &= stored_codes[found] == query_codes
+    valid &= query_days - stored_days[found] <= max_staleness_days
+    return pd.DataFrame({col: np.where(valid, stored[col].values[order][found], np.nan) for col in columns},
+                        index=data.index, columns=columns)
+
+class StoredFeatures(object):
+  """
+  A feature store as a source of features for the expansion engine (see dfs.featureengine.engine.expand). The
+  registry's cached featurizers -- those whose results only depend on their declared input columns -- are
+  materialized into the store, and read back by each row's input columns.
+  """
+  def __init__(self, store, registry):
+    """
+    :param FeatureStore store: where the features are kept
+    :param dfs.featureengine.registry.FeaturizerRegistry registry: the featurizers
+    """
+    self.store = store
+    self.registry = registry
+
+  def stored_featurizers(self, featurizers=None):
+    """
+    :param set[str] featurizers: only consider these featurizers
+    :return list[str]: names of the featurizers whose results the feature store can hold
+    """
+    return sorted(name for name in self.registry.cached_inputs
+                  if name in self.registry.generators and (featurizers is None or name in featurizers))
+
+  def _compute(self, feature_name, keys):
+    func, columns, live = self.registry.generators[feature_name]
+    if feature_name in self.registry.frame_generators:
+      return self.registry.frame_generators[feature_name](keys)
+    return pd.DataFrame([func(row) for index, row in keys.iterrows()], index=keys.index, columns=columns)
+
+  def materialize(self, data, featurizers=None, replace=False):
+    """
+    Compute and store the features of any rows of data not in the feature store yet.
+    :param pd.DataFrame data: game rows (only the featurizers' input columns are used)
+    :param set[str] featurizers: only materialize these featurizers
+    :param bool replace: recompute rows even if they're stored already (e.g. when a slate's data has been re-scraped)
+    """
+    for feature_name in self.stored_featurizers(featurizers):
+      input_columns, _ = self.registry.cached_inputs[feature_name]
+      version = self.registry.versions[feature_name]
+      keys = data[input_columns].drop_duplicates()
+      if not replace:
+        keys = self.store.missing(feature_name, version, keys)
+      if len(keys) == 0:
+        continue
+      with Timer() as t:
+        self.store.add(feature_name, version, keys, self._compute(feature_name, keys))
+      logger.info('Materialized %d rows of %s in %d seconds', len(keys), feature_name, t.elapsed)
+    if self.registry.cache is not None:
+      self.registry.cache.flush()
+
+  def provides(self, featurizers):
+    return set(self.stored_featurizers(featurizers))
+
+  def prepare(self, data, featurizers):
+    self.materialize(data, featurizers)
+
+  def features(self, data, feature_name):
+    """
+    :param pd.DataFrame data: game rows
+    :return pd.DataFrame: the stored features of each row as of its date, indexed like data
+    """
+    input_columns, _ = self.registry.cached_inputs[feature_name]
+    return self.store.as_of(feature_name, self.registry.versions[feature_name], data, input_columns,
+                            self.registry.generators[feature_name][1])
+
+  def missing(self, data, feature_name):
+    input_columns, _ = self.registry.cached_inputs[feature_name]
+    return len(self.store.missing(feature_name, self.registry.versions[feature_name], data[input_columns]))
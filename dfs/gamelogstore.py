@@ -0,0 +1,290 @@
+'''
+Every player's gamelog in one column-oriented store, instead of one pickle per player.
+
+The store is a directory with a subdirectory for each season. A season holds one .npy file per column, with rows
+sorted by player and date: numbers, dates and booleans are stored as typed arrays (so they can be memory-mapped), and
+anything else (strings, mixed values) as integer codes into a pickled list of the distinct values. An index records
+the columns of each season and the range of rows each player has in it, so loading only some columns, seasons or
+players reads only those parts.
+
+Loading still copies what it reads: pandas copies the columns into its own blocks when it assembles a table of mixed
+types, so memory-mapping saves reading the parts that aren't asked for, not the copy of the parts that are. The tables
+it returns don't depend on the files, which can be rewritten while they're in use.
+'''
+import os
+import shutil
+import cPickle as pickle
+import numpy as np
+import pandas as pd
+
+def _is_typed(values):
+  return values.dtype.kind in 'biufM'
+
+class GamelogStore(object):
+  """
+  Gamelogs of every player, stored by season and column. Fill it with write or update, and read it with load or
+  gamelogs.
+  """
+  def __init__(self, root, season_start_month=1):
+    """
+    :param str root: directory holding the store
+    :param int season_start_month: month each season starts in; a season is named for the year it ends in, so with
+      a season_start_month of 10 the games of October 2014 to September 2015 are season 2015
+    """
+    self.root = root
+    self.season_start_month = season_start_month
+    self._index = None
+
+  def _index_path(self, root=None):
+    return os.path.join(root or self.root, 'index.pickle')
+
+  def exists(self):
+    return os.path.exists(self._index_path())
+
+  @property
+  def index(self):
+    """
+    :return dict: {'date_name': str, 'seasons': {season: {'columns': [(column, kind)], 'rows': int,
+      'players': {player: (start, stop)}}}}
+    """
+    if self._index is None:
+      with open(self._index_path(), 'rb') as inf:
+        self._index = pickle.load(inf)
+    return self._index
+
+  def seasons(self, dates):
+    """
+    :param pandas.DatetimeIndex dates: game dates
+    :return numpy.ndarray: the season of each date (0 for a missing date)
+    """
+    years = np.where(dates.month >= self.season_start_month, dates.year + (self.season_start_month > 1), dates.year)
+    return np.where(pd.isnull(dates), 0, years).astype(np.int64)
+
+  def _by_season(self, gamelogs):
+    """
+    :param dict[str, pandas.DataFrame] gamelogs: each player's gamelog, indexed by date
+    :return dict[int, dict[str, pandas.DataFrame]]: each season's part of the gamelogs
+    """
+    by_season = {}
+    for player, gamelog in gamelogs.items():
+      if gamelog is None or not len(gamelog):
+        continue
+      seasons = self.seasons(pd.DatetimeIndex(gamelog.index))
+      for season in np.unique(seasons):
+        by_season.setdefault(int(season), {})[player] = gamelog[seasons == season]
+    return by_season
+
+  def _date_name(self, gamelogs, date_name=None):
+    names = [gamelog.index.name for gamelog in gamelogs.values() if gamelog is not None]
+    return next((name for name in [date_name] + names if name is not None), None)
+
+  def _write_index(self, index, root=None):
+    path = self._index_path(root)
+    with open(path + '.tmp', 'wb') as outf:
+      pickle.dump(index, outf, 2)
+    os.rename(path + '.tmp', path)
+    self._index = index
+
+  def write(self, gamelogs):
+    """
+    Replace the store's contents with the given gamelogs.
+    :param dict[str, pandas.DataFrame] gamelogs: each player's gamelog, indexed by date
+    """
+    tmp_root = self.root.rstrip('/') + '.tmp'
+    if os.path.exists(tmp_root):
+      shutil.rmtree(tmp_root)
+    os.makedirs(tmp_root)
+    index = {'date_name': self._date_name(gamelogs), 'seasons': {}}
+    for season, season_gamelogs in self._by_season(gamelogs).items():
+      index['seasons'][season] = self._write_season(os.path.join(tmp_root, str(season)), season_gamelogs)
+    self._write_index(index, tmp_root)
+    # Swap the new store in whole, so a reader never sees half of it
+    old_root = self.root.rstrip('/') + '.old'
+    if os.path.exists(self.root):
+      os.rename(self.root, old_root)
+    os.rename(tmp_root, self.root)
+    if os.path.exists(old_root):
+      shutil.rmtree(old_root)
+
+  def _write_season(self, directory, gamelogs):
+    """
+    Write one season's gamelogs, as rows sorted by player and then date.
+    :param str directory: season directory (must not exist yet)
+    :param dict[str, pandas.DataFrame] gamelogs: each player's games in the season, indexed by date
+    :return dict: the season's entry in the index
+    """
+    frames = []
+    for player, gamelog in sorted(gamelogs.items()):
+      dates = pd.DatetimeIndex(gamelog.index)
+      frames.append((player, gamelog.iloc[np.argsort(dates.values, kind='mergesort')]))
+    rows = pd.concat([df.reset_index(drop=True) for _, df in frames], ignore_index=True)
+    players = np.concatenate([np.repeat(player, len(df)).astype(object) for player, df in frames])
+    os.makedirs(directory)
+    columns = []
+    np.save(os.path.join(directory, '_date.npy'),
+            np.concatenate([pd.DatetimeIndex(df.index).values for _, df in frames]))
+    for i, column in enumerate(rows.columns):
+      values = rows.iloc[:, i].values
+      if _is_typed(values):
+        np.save(os.path.join(directory, '%d.npy' % i), values)
+        columns.append((column, 'typed'))
+      else:
+        codes, labels = pd.factorize(np.asarray(values, dtype=object))
+        np.save(os.path.join(directory, '%d.npy' % i), codes.astype(np.int32))
+        with open(os.path.join(directory, '%d.labels' % i), 'wb') as outf:
+          pickle.dump(list(labels), outf, 2)
+        columns.append((column, 'coded'))
+    starts = np.flatnonzero(np.r_[True, players[1:] != players[:-1]])
+    stops = np.r_[starts[1:], len(players)]
+    return {'columns': columns, 'rows': len(players),
+            'players': dict((players[start], (int(start), int(stop))) for start, stop in zip(starts, stops))}
+
+  def _read_column(self, season, position, kind, mmap):
+    directory = os.path.join(self.root, str(season))
+    values = np.load(os.path.join(directory, '%d.npy' % position), mmap_mode='r' if mmap else None)
+    if kind == 'typed':
+      return values
+    with open(os.path.join(directory, '%d.labels' % position), 'rb') as inf:
+      labels = np.array(pickle.load(inf) + [np.nan], dtype=object)
+    # Code -1 (a missing value) picks the NaN on the end
+    return labels[values]
+
+  def columns(self):
+    """
+    :return list[str]: every stored column, in the order stored
+    """
+    columns = []
+    for season in sorted(self.index['seasons']):
+      columns.extend(column for column, _ in self.index['seasons'][season]['columns'] if column not in columns)
+    return columns
+
+  def players(self):
+    """
+    :return list[str]: every player with games in the store
+    """
+    return sorted(set(player for season in self.index['seasons'].values() for player in season['players']))
+
+  def load(self, columns=None, seasons=None, players=None, player_column='player', date_column='date', mmap=True):
+    """
+    Load games as one table: the date column, the stored columns, then the player column. The table is a copy of the
+    stored data, not a view of the files.
+    :param list[str] columns: only load these columns (by default, every column)
+    :param list[int] seasons: only load these seasons
+    :param list[str] players: only load these players' games
+    :param str player_column: name to give the player column
+    :param str date_column: name to give the date column
+    :param bool mmap: memory-map the typed columns rather than reading them in, so only the rows asked for are read
+    :return pandas.DataFrame: games, by season, then player, then date
+    """
+    frames = []
+    for season in sorted(self.index['seasons']):
+      if seasons is not None and season not in seasons:
+        continue
+      info = self.index['seasons'][season]
+      ranges = sorted(info['players'].items(), key=lambda item: item[1][0])
+      if players is not None:
+        wanted = set(players)
+        ranges = [(player, span) for player, span in ranges if player in wanted]
+      if not ranges:
+        continue
+      season_players = np.concatenate([np.repeat(player, stop - start).astype(object)
+                                       for player, (start, stop) in ranges])
+      data = [(date_column, np.load(os.path.join(self.root, str(season), '_date.npy'),
+                                    mmap_mode='r' if mmap else None))]
+      for position, (column, kind) in enumerate(info['columns']):
+        if columns is None or column in columns:
+          data.append((column, self._read_column(season, position, kind, mmap)))
+      # Only take rows when some players are left out, so loading every player slices nothing
+      if len(season_players) < info['rows']:
+        rows = np.concatenate([np.arange(start, stop) for _, (start, stop) in ranges])
+        data = [(column, values[rows]) for column, values in data]
+      data.append((player_column, season_players))
+      frames.append(pd.DataFrame(dict(data), columns=[column for column, _ in data]))
+    if not frames:
+      return pd.DataFrame(columns=[date_column] + list(columns or []) + [player_column])
+    if len(frames) == 1:
+      return frames[0]
+    loaded = pd.concat(frames, ignore_index=True)
+    # Seasons may have different columns; keep them in the order they're stored in
+    order = [date_column]
+    for frame in frames:
+      order.extend(column for column in frame.columns if column not in order and column != player_column)
+    return loaded[order + [player_column]]
+
+  def gamelogs(self, columns=None, players=None, seasons=None, date_name=None):
+    """
+    :param list[str] columns: only load these columns
+    :param list[str] players: only load these players' gamelogs
+    :param list[int] seasons: only load these seasons' games
+    :param str date_name: name to give the date index (by default, the name the gamelogs' index was saved with)
+    :return dict[str, pandas.DataFrame]: each player's gamelog, indexed by date
+    """
+    if date_name is None:
+      date_name = self.index['date_name']
+    games = self.load(columns=columns, seasons=seasons, players=players, player_column='_player', date_column='_date',
+                      mmap=False)
+    if not len(games):
+      return {}
+    # Sort (stably) by player, so each player's games over every season are one run of rows
+    order = np.argsort(pd.factorize(games['_player'].values, sort=True)[0], kind='mergesort')
+    games = games.iloc[order]
+    player_values = games['_player'].values
+    starts = np.flatnonzero(np.r_[True, player_values[1:] != player_values[:-1]])
+    stops = np.r_[starts[1:], len(games)]
+    dates = pd.DatetimeIndex(games['_date'].values, name=date_name)
+    games = games.drop(['_player', '_date'], axis=1)
+    result = {}
+    for start, stop in zip(starts, stops):
+      gamelog = games.iloc[start:stop]
+      gamelog.index = dates[start:stop]
+      result[player_values[start]] = gamelog
+    return result
+
+  def update(self, gamelogs, overwrite=False):
+    """
+    Combine new gamelog data into the store: as combine_dataframe_into_pickle_file did for each player's pickle,
+    new rows take priority, and rows only in the store are kept (unless overwrite). Only the seasons the new data
+    falls in (and, with overwrite, the seasons those players had games in) are rewritten.
+    :param dict[str, pandas.DataFrame] gamelogs: new data for some players
+    :param bool overwrite: replace those players' stored gamelogs rather than combining them
+    """
+    gamelogs = dict((player, gamelog) for player, gamelog in gamelogs.items() if gamelog is not None)
+    if not self.exists():
+      self.write(gamelogs)
+      return
+    new_by_season = self._by_season(gamelogs)
+    seasons = set(new_by_season)
+    if overwrite:
+      seasons.update(season for season, info in self.index['seasons'].items()
+                     if any(player in info['players'] for player in gamelogs))
+    index = {'date_name': self._date_name(gamelogs, self.index['date_name']),
+             'seasons': dict(self.index['seasons'])}
+    replaced = []
+    for season in sorted(seasons):
+      stored = self.gamelogs(seasons=[season]) if season in index['seasons'] else {}
+      for player, gamelog in new_by_season.get(season, {}).items():
+        if player in stored and not overwrite:
+          gamelog = gamelog.combine_first(stored[player])
+        stored[player] = gamelog
+      if overwrite:
+        for player in gamelogs:
+          if player not in new_by_season.get(season, {}):
+            stored.pop(player, None)
+      directory = os.path.join(self.root, str(season))
+      if os.path.exists(directory + '.tmp'):
+        shutil.rmtree(directory + '.tmp')
+      if stored:
+        index['seasons'][season] = self._write_season(directory + '.tmp', stored)
+      else:
+        del index['seasons'][season]
+      replaced.append(directory)
+    # Swap the rewritten seasons in, then the index that describes them
+    for directory in replaced:
+      if os.path.exists(directory):
+        os.rename(directory, directory + '.old')
+      if os.path.exists(directory + '.tmp'):
+        os.rename(directory + '.tmp', directory)
+    self._write_index(index)
+    for directory in replaced:
+      if os.path.exists(directory + '.old'):
+        shutil.rmtree(directory + '.old')
@@ -0,0 +1,192 @@
+'''
+Branch-and-bound solver for the restricted knapsack problem with extra linear roster constraints,
+like "no more than 3 players from the same team".
+
+The bound comes from the exact dynamic program with the extra constraints dropped: completion[i, s, b] is the most value
+players i and later can add by filling slots s and later for at most b (reduced) cost. That bound is tight whenever the
+extra constraints aren't binding, so the search usually walks straight down to the optimum and only has to backtrack
+around the constraints that actually bite.
+'''
+from __future__ import print_function
+import numpy as np
+from .candidates import as_candidate_table
+from .exact import _reduce_problem
+from .knapsack import NotSolvableError
+
+def _completion_bounds(costs, values, starts, ends, n_slots, reduced_cap):
+  """
+  Best value obtainable from players i.. when filling slots s.. with at most b cost, ignoring any extra constraints.
+  :return numpy.ndarray: table indexed by (player, slot, budget), -inf where the slots can't be filled
+  """
+  n = len(costs)
+  completion = np.full((n + 1, n_slots + 1, reduced_cap + 1), -np.inf)
+  completion[n, n_slots, :] = 0
+  for i in range(n - 1, -1, -1):
+    completion[i] = completion[i + 1]
+    cost, value = costs[i], values[i]
+    if cost > reduced_cap:
+      continue
+    for slot in range(starts[i], ends[i]):
+      candidate = completion[i + 1, slot + 1, :reduced_cap + 1 - cost] + value
+      completion[i, slot, cost:] = np.maximum(completion[i, slot, cost:], candidate)
+  return completion
+
+def _constraint_matrix(table, order, max_per_group, constraints):
+  """
+  Collect the extra linear constraints as coefficient rows with lower and upper bounds on the lineup total.
+  :param CandidateTable table: candidate items
+  :param numpy.ndarray order: table positions in solver order
+  :return (numpy.ndarray, numpy.ndarray, numpy.ndarray): coefficients (constraints x players), lower and upper bounds
+  """
+  coefficients, lower, upper = [], [], []
+  if max_per_group is not None:
+    codes = table.group_codes[order]
+    for code in range(len(table.groups)):
+      coefficients.append((codes == code).astype(np.float64))
+      lower.append(-np.inf)
+      upper.append(max_per_group)
+  for column, min_total, max_total in (constraints or []):
+    coefficients.append(table.extras[column][order])
+    lower.append(-np.inf if min_total is None else min_total)
+    upper.append(np.inf if max_total is None else max_total)
+  if not coefficients:
+    return np.zeros((0, len(order))), np.zeros(0), np.zeros(0)
+  return np.array(coefficients), np.array(lower, dtype=np.float64), np.array(upper, dtype=np.float64)
+
+class _Search(object):
+  """
+  Depth-first search over lineups, one slot at a time. Each slot is filled by a player of its type with a higher solver
+  index than the previous player of that type, so every lineup is visited at most once.
+  The search can also prune against an incumbent found elsewhere (e.g. by other workers in dfs.knapsack.portfolio),
+  given as a shared multiprocessing.Value, and report each lineup that improves on its own best through on_improve.
+  """
+  def __init__(self, costs, values, starts, ends, n_slots, completion, coefficients, lower, upper,
+               incumbent=None, on_improve=None):
+    self.costs = costs
+    self.values = values
+    self.n_slots = n_slots
+    self.completion = completion
+    self.coefficients = coefficients
+    self.lower = lower
+    self.upper = upper
+    # Per-slot player ranges: players of the slot's type, and whether the slot is the first of its type
+    self.slot_players = [None] * n_slots
+    self.slot_is_first = [False] * n_slots
+    for i in range(len(costs)):
+      for slot in range(starts[i], ends[i]):
+        lo, hi = self.slot_players[slot] or (i, i)
+        self.slot_players[slot] = (min(lo, i), max(hi, i + 1))
+      self.slot_is_first[starts[i]] = True
+    # Per-constraint extremes, so a partial lineup can be abandoned once it can't end up within bounds
+    if len(coefficients):
+      self.min_coefficient = np.minimum(coefficients.min(axis=1), 0)
+      self.max_coefficient = np.maximum(coefficients.max(axis=1), 0)
+    self.best_value = -np.inf
+    self.best_lineup = None
+    self.nodes = 0
+    self.incumbent = incumbent
+    self.on_improve = on_improve
+
+  def cutoff(self):
+    """
+    Value a lineup has to beat to be worth looking for.
+    """
+    if self.incumbent is None:
+      return self.best_value
+    return max(self.best_value, self.incumbent.value)
+
+  def feasible(self, usage, slots_left):
+    if not len(self.coefficients):
+      return True
+    return np.all(usage + slots_left * self.min_coefficient <= self.upper + 1e-9) and \
+           np.all(usage + slots_left * self.max_coefficient >= self.lower - 1e-9)
+
+  def children(self, slot, first_player, budget, value):
+    """
+    Candidate players for this slot along with the bound on the best lineup that can contain them, best first.
+    """
+    lo, hi = self.slot_players[slot]
+    if not self.slot_is_first[slot]:
+      lo = max(lo, first_player)
+    candidates = np.arange(lo, hi)
+    candidates = candidates[self.costs[candidates] <= budget]
+    bounds = value + self.values[candidates] + \
+             self.completion[candidates + 1, slot + 1, budget - self.costs[candidates]]
+    order = np.argsort(-bounds, kind='mergesort')
+    return candidates[order], bounds[order]
+
+  def run(self, slot, first_player, budget, value, lineup, usage):
+    self.nodes += 1
+    if slot == self.n_slots:
+      if value > self.best_value:
+        self.best_value = value
+        self.best_lineup = list(lineup)
+        if self.on_improve:
+          self.on_improve(value, self.best_lineup)
+      return
+    players, bounds = self.children(slot, first_player, budget, value)
+    for player, bound in zip(players, bounds):
+      if bound <= self.cutoff() + 1e-9:
+        break  # children are sorted by bound, so nothing later can help either
+      new_usage = usage + self.coefficients[:, player] if len(self.coefficients) else usage
+      if not self.feasible(new_usage, self.n_slots - slot - 1):
+        continue
+      lineup.append(player)
+      self.run(slot + 1, player + 1, budget - self.costs[player], value + self.values[player], lineup, new_usage)
+      lineup.pop()
+
+def solve_constrained(data, cost_column, value_column, type_column, required_types, cap,
+                      group_column=None, max_per_group=None, constraints=None, locked=None, debug_print_fn=None):
+  """
+  Find the best solution to the restricted knapsack problem for cost <= cap, subject to extra linear constraints.
+  In this restricted problem, each item has a type, and we are given a certain count of each type of
+  item. We must include exactly that count of the type of item in the solution.
+  :param pandas.DataFrame data: items (indexed by unique ID) and data about them, or a CandidateTable
+  :param str cost_column: column of data containing cost. Costs must be ints!
+  :param str value_column: column of data containing value. Value must be numeric!
+  :param str type_column: column of data containing the type of item (e.g. player position)
+  :param dict[str, int] required_types: which types we must use, and how many of each
+  :param int cap: maximum total cost
+  :param str group_column: column of data containing the item's group (e.g. player team)
+  :param int max_per_group: maximum number of items in the solution from any one group
+  :param list[tuple] constraints: extra constraints as (column, min total, max total) on the sum of that column
+    over the solution. Either bound may be None.
+  :param list locked: indices of items that must be in the solution. They are taken out of the search, which just
+    fills the rest of the slots with what's left of the cap, starting from the locked items' share of each constraint.
+  :param function debug_print_fn: used to print the final solution when debugging
+  :return list: indices of included items (players)
+  """
+  table = as_candidate_table(data, cost_column, value_column, type_column, group_column,
+                             [column for column, _, _ in (constraints or [])])
+  locked = [] if locked is None else list(locked)
+  locked_positions = table.positions_of(locked)
+  locked_value = table.values[locked_positions].sum()
+  locked_usage, _, _ = _constraint_matrix(table, locked_positions, max_per_group, constraints)
+  if locked:
+    required_types = dict(required_types)
+    for position in locked_positions:
+      required_types[table.type_of(position)] = required_types.get(table.type_of(position), 0) - 1
+    if min(required_types.values()) < 0:
+      raise NotSolvableError("More items are locked than there are slots for")
+    cap -= table.costs[locked_positions].sum()
+    if cap < 0:
+      raise NotSolvableError("Locked items already cost more than the cap")
+    is_free = np.ones(len(table), dtype=bool)
+    is_free[locked_positions] = False
+    table = table.take(is_free)
+
+  order, costs, values, starts, ends, n_slots, reduced_cap, gcd_cost = _reduce_problem(table, required_types, cap)
+  completion = _completion_bounds(costs, values, starts, ends, n_slots, reduced_cap)
+  coefficients, lower, upper = _constraint_matrix(table, order, max_per_group, constraints)
+  search = _Search(costs, values, starts, ends, n_slots, completion, coefficients, lower, upper)
+  usage = locked_usage.sum(axis=1)
+  if search.feasible(usage, n_slots):
+    search.run(0, 0, reduced_cap, 0.0, [], usage)
+  if search.best_lineup is None:
+    raise NotSolvableError("No satisfying set costs %d or less and meets the constraints" % cap)
+  solution = locked + table.solution_ids(order[search.best_lineup])
+  if debug_print_fn:
+    print('best constrained solution has value %.2f (%d search nodes)' % (locked_value + search.best_value,
+                                                                           search.nodes))
+    debug_print_fn(solution)
+  return solution
@@ -0,0 +1,119 @@
+'''
+Compact, array-backed candidate table shared by the knapsack solvers and heuristics.
+'''
+import numpy as np
+import pandas as pd
+
+class CandidateTable(object):
+  """
+  The columns of a candidate DataFrame that the solvers actually use, as contiguous numpy arrays.
+  Build it once per slate; solvers and heuristics then refer to items by integer position and only go back to IDs
+  (via ids) when they hand back a solution.
+  :ivar numpy.ndarray ids: item IDs (the DataFrame index), by position
+  :ivar numpy.ndarray costs: int32 item costs
+  :ivar numpy.ndarray values: float64 item values
+  :ivar numpy.ndarray type_codes: int8 codes into types
+  :ivar list types: distinct item types (e.g. positions)
+  :ivar numpy.ndarray group_codes: int8 codes into groups, -1 where there is no group
+  :ivar list groups: distinct item groups (e.g. teams), empty if no group column was given
+  :ivar dict[str, numpy.ndarray] extras: other numeric columns, as float64 arrays (e.g. for linear constraints)
+  """
+  def __init__(self, ids, costs, values, type_codes, types, group_codes, groups, extras):
+    self.ids = ids
+    self.costs = costs
+    self.values = values
+    self.type_codes = type_codes
+    self.types = types
+    self.group_codes = group_codes
+    self.groups = groups
+    self.extras = extras
+
+  @classmethod
+  def from_frame(cls, data, cost_column, value_column, type_column, group_column=None, extra_columns=()):
+    """
+    :param pandas.DataFrame data: items (indexed by unique ID) and data about them
+    :param str cost_column: column of data containing cost. Costs must be ints!
+    :param str value_column: column of data containing value. Value must be numeric!
+    :param str type_column: column of data containing the type of item (e.g. player position)
+    :param str group_column: optional column of data containing the item's group (e.g. player team)
+    :param list[str] extra_columns: other numeric columns to keep
+    :return CandidateTable:
+    """
+    type_codes, types = pd.factorize(data[type_column])
+    if group_column is not None:
+      group_codes, groups = pd.factorize(data[group_column])
+      groups = list(groups)
+    else:
+      group_codes, groups = np.full(len(data), -1), []
+    extras = {column: np.ascontiguousarray(data[column].values, dtype=np.float64) for column in extra_columns}
+    return cls(ids=data.index.values,
+               costs=np.ascontiguousarray(data[cost_column].values, dtype=np.int32),
+               values=np.ascontiguousarray(data[value_column].values, dtype=np.float64),
+               type_codes=type_codes.astype(np.int8),
+               types=list(types),
+               group_codes=group_codes.astype(np.int8),
+               groups=groups,
+               extras=extras)
+
+  def __len__(self):
+    return len(self.ids)
+
+  def take(self, positions):
+    """
+    Table holding only the items at the given positions (type and group codes are unchanged).
+    :param numpy.ndarray positions: integer positions or a boolean mask
+    :return CandidateTable:
+    """
+    return CandidateTable(ids=self.ids[positions],
+                          costs=self.costs[positions],
+                          values=self.values[positions],
+                          type_codes=self.type_codes[positions],
+                          types=self.types,
+                          group_codes=self.group_codes[positions],
+                          groups=self.groups,
+                          extras={column: values[positions] for column, values in self.extras.items()})
+
+  def with_values(self, values):
+    """
+    Same items, different values (e.g. a new set of projections).
+    :param numpy.ndarray values: new value for each item
+    :return CandidateTable:
+    """
+    return CandidateTable(ids=self.ids, costs=self.costs, values=np.ascontiguousarray(values, dtype=np.float64),
+                          type_codes=self.type_codes, types=self.types, group_codes=self.group_codes,
+                          groups=self.groups, extras=self.extras)
+
+  def positions_of_type(self, entry_type):
+    """
+    :return numpy.ndarray: positions of items with this type
+    """
+    if entry_type not in self.types:
+      return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(self.type_codes == self.types.index(entry_type))
+
+  def positions_of(self, items):
+    """
+    :param list items: item IDs
+    :return numpy.ndarray: positions of these items
+    """
+    lookup = {item: position for position, item in enumerate(self.ids)}
+    return np.array([lookup[item] for item in items], dtype=np.int64)
+
+  def type_of(self, position):
+    return self.types[self.type_codes[position]]
+
+  def solution_ids(self, positions):
+    """
+    :return list: IDs of the items at these positions
+    """
+    return list(self.ids[list(positions)])
+
+def as_candidate_table(data, cost_column, value_column, type_column, group_column=None, extra_columns=()):
+  """
+  Let the solvers take either a DataFrame or an already-built CandidateTable (in which case the column names are
+  ignored).
+  :return CandidateTable:
+  """
+  if isinstance(data, CandidateTable):
+    return data
+  return CandidateTable.from_frame(data, cost_column, value_column, type_column, group_column, extra_columns)
@@ -1,4 +1,4 @@
 from fractions import gcd
 
 def get_gcd_cost(costs, cap):
-  return reduce(gcd, costs + [cap])
\ No newline at end of file
+  return int(reduce(gcd, list(costs) + [cap]))
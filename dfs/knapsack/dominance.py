@@ -0,0 +1,77 @@
+'''
+Dominance pruning for the restricted knapsack problem.
+
+An item is dominated by another item of the same type that costs no more and is worth strictly more. If an item is
+dominated by at least as many items as there are slots of its type, some optimal solution never uses it: any solution
+that uses it is missing at least one of its dominators, and swapping that one in costs no more and is worth more.
+The solvers' running times grow with the number of items, so dropping these first is a cheap, safe speedup.
+'''
+import heapq
+import numpy as np
+from .candidates import as_candidate_table, CandidateTable
+
+def _dominated_within(costs, values, members, k):
+  """
+  Sort-and-sweep: walk the items in order of increasing cost, keeping the k best values seen so far in a heap. An item
+  has at least k dominators exactly when the k-th best value among the items costing no more than it beats its own.
+  :param numpy.ndarray members: positions of the items to consider against each other
+  :param int k: how many dominators make an item prunable
+  :return numpy.ndarray: positions of the dominated items
+  """
+  if k <= 0:
+    return members
+  by_cost = members[np.argsort(costs[members], kind='mergesort')]
+  # Items with the same cost dominate each other, so each cost level goes into the heap before any of it is checked
+  levels = np.split(by_cost, np.flatnonzero(np.diff(costs[by_cost])) + 1)
+  best = []
+  dominated = []
+  for level in levels:
+    for value in values[level]:
+      if len(best) < k:
+        heapq.heappush(best, value)
+      elif value > best[0]:
+        heapq.heapreplace(best, value)
+    if len(best) == k:
+      dominated.append(level[values[level] < best[0]])
+  return np.concatenate(dominated) if dominated else np.zeros(0, dtype=np.int64)
+
+def find_dominated(data, cost_column, value_column, type_column, required_types, group_column=None,
+                   max_per_group=None):
+  """
+  Find the items that no optimal solution needs, in O(n log n).
+  With max_per_group, only dominators from the item's own group count, so swapping one in never breaks the group
+  limit; as the solution holds at most max_per_group items of a group, that many same-group dominators are enough.
+  Other linear constraints (see dfs.knapsack.bnb) are not taken into account.
+  :param pandas.DataFrame data: items (indexed by unique ID) and data about them, or a CandidateTable
+  :param str cost_column: column of data containing cost
+  :param str value_column: column of data containing value
+  :param str type_column: column of data containing the type of item (e.g. player position)
+  :param dict[str, int] required_types: which types we must use, and how many of each
+  :param str group_column: column of data containing the item's group (e.g. player team)
+  :param int max_per_group: maximum number of items in the solution from any one group
+  :return numpy.ndarray: boolean mask (by position) of the dominated items
+  """
+  table = as_candidate_table(data, cost_column, value_column, type_column, group_column)
+  mask = np.zeros(len(table), dtype=bool)
+  for code, entry_type in enumerate(table.types):
+    members = np.flatnonzero(table.type_codes == code)
+    k = required_types.get(entry_type, 0)
+    if max_per_group is None:
+      mask[_dominated_within(table.costs, table.values, members, k)] = True
+    else:
+      k = min(k, max_per_group)
+      for group_code in np.unique(table.group_codes[members]):
+        in_group = members[table.group_codes[members] == group_code]
+        mask[_dominated_within(table.costs, table.values, in_group, k)] = True
+  return mask
+
+def prune_dominated(data, cost_column, value_column, type_column, required_types, group_column=None,
+                    max_per_group=None):
+  """
+  Drop the items found by find_dominated.
+  :return pandas.DataFrame: data without its dominated items (or a CandidateTable, if that's what was passed in)
+  """
+  mask = find_dominated(data, cost_column, value_column, type_column, required_types, group_column, max_per_group)
+  if isinstance(data, CandidateTable):
+    return data.take(~mask)
+  return data[~mask]
@@ -0,0 +1,150 @@
+'''
+Exact solver for the restricted knapsack problem.
+
+Runs a dynamic program over (position slot, player, reduced cost). Players are grouped by type and each type owns a
+contiguous range of slots, so best[s, c] holds the most value we can get by filling the first s slots for exactly c
+(reduced) cost. Every player is considered once, and only for the slots of its own type.
+'''
+from __future__ import print_function
+import numpy as np
+from .common import get_gcd_cost
+from .candidates import as_candidate_table
+from .knapsack import NotSolvableError
+
+def _slot_ranges(required_types):
+  """
+  Lay out the slots we need to fill, one contiguous range per required type.
+  :param dict[str, int] required_types: which types we must use, and how many of each
+  :return dict[str, (int, int)]: type -> (first slot, one past the last slot)
+  """
+  ranges = {}
+  next_slot = 0
+  for entry_type in sorted(required_types):
+    count = required_types[entry_type]
+    if count > 0:
+      ranges[entry_type] = (next_slot, next_slot + count)
+      next_slot += count
+  return ranges
+
+def _reduce_problem(table, required_types, cap):
+  """
+  Pull out the items the solver needs, ordered by slot range, with costs divided through by their gcd.
+  :param CandidateTable table: candidate items
+  :return tuple: (table positions in solver order, reduced costs, values, slot starts, slot ends, slot count,
+    reduced cap, gcd)
+  """
+  ranges = _slot_ranges(required_types)
+  starts_by_code = np.full(len(table.types) + 1, -1, dtype=np.int64)
+  ends_by_code = np.full(len(table.types) + 1, -1, dtype=np.int64)
+  for entry_type, (lo, hi) in ranges.items():
+    present = len(table.positions_of_type(entry_type))
+    if present < hi - lo:
+      raise NotSolvableError("Not enough entries of type %s (required: %d, present: %d)" %
+                             (entry_type, hi - lo, present))
+    starts_by_code[table.types.index(entry_type)] = lo
+    ends_by_code[table.types.index(entry_type)] = hi
+  # (type code -1, for a missing type, looks up the spare last entry and so is never required)
+  slot_starts = starts_by_code[table.type_codes]
+  relevant = np.flatnonzero(slot_starts >= 0)
+  # Stable sort so that ties are still broken by the original row order within each type
+  order = relevant[np.argsort(slot_starts[relevant], kind='mergesort')]
+  gcd_cost = get_gcd_cost(table.costs[order], cap)
+  costs = (table.costs[order] // gcd_cost).astype(np.int64)
+  values = table.values[order]
+  starts = slot_starts[order]
+  ends = ends_by_code[table.type_codes[order]]
+  n_slots = sum(hi - lo for lo, hi in ranges.values())
+  return order, costs, values, starts, ends, n_slots, cap // gcd_cost, gcd_cost
+
+def _fill_slots(costs, values, starts, ends, n_slots, reduced_cap):
+  """
+  Run the dynamic program.
+  :return (numpy.ndarray, list): table of best values by (slots filled, exact cost), and for each player a boolean
+    array marking the (slot, cost) cells where taking that player improved the table
+  """
+  best = np.full((n_slots + 1, reduced_cap + 1), -np.inf)
+  best[0, 0] = 0
+  took = []
+  for cost, value, lo, hi in zip(costs, values, starts, ends):
+    if cost > reduced_cap:
+      took.append(None)
+      continue
+    improved_at = np.zeros((hi - lo, reduced_cap + 1), dtype=bool)
+    # Walk slots downwards so that the player can't be counted twice
+    for slot in range(hi, lo, -1):
+      candidate = best[slot - 1, :reduced_cap + 1 - cost] + value
+      improved = candidate > best[slot, cost:]
+      best[slot, cost:] = np.where(improved, candidate, best[slot, cost:])
+      improved_at[slot - lo - 1, cost:] = improved
+    took.append(improved_at)
+  return best, took
+
+def _trace_back(ids, costs, starts, ends, took, n_slots, reduced_cost):
+  """
+  Recover the players behind best[n_slots, reduced_cost].
+  :return list: indices of included items
+  """
+  selected = []
+  slot = n_slots
+  remaining = reduced_cost
+  for i in range(len(ids) - 1, -1, -1):
+    if took[i] is not None and starts[i] < slot <= ends[i] and took[i][slot - starts[i] - 1, remaining]:
+      selected.append(ids[i])
+      slot -= 1
+      remaining -= costs[i]
+  assert slot == 0 and remaining == 0
+  return selected[::-1]
+
+def solve_exact(data, cost_column, value_column, type_column, required_types, cap, debug_print_fn=None):
+  """
+  Find the best solution to restricted knapsack problem for cost <= cap.
+  In this restricted problem, each item has a type, and we are given a certain count of each type of
+  item. We must include exactly that count of the type of item in the solution.
+  :param pandas.DataFrame data: items (indexed by unique ID) and data about them, or a CandidateTable
+  :param str cost_column: column of data containing cost. Costs must be ints!
+  :param str value_column: column of data containing value. Value must be numeric!
+  :param str type_column: column of data containing the type of item (e.g. player position)
+  :param dict[str, int] required_types: which types we must use, and how many of each
+  :param int cap: maximum total cost
+  :param function debug_print_fn: used to print a candidate solution when debugging
+  :return list: indices of included items (players)
+  """
+  return solve_all(data, cost_column, value_column, type_column, required_types, cap, debug_print_fn=debug_print_fn)[cap]
+
+def solve_all(data, cost_column, value_column, type_column, required_types, cap, debug_print_fn=None):
+  """
+  Find the best solution to restricted knapsack problem for every cost level up to cap.
+  Same arguments and return shape as dfs.knapsack.knapsack.solve_all, but every solution is optimal.
+  :param pandas.DataFrame data: items (indexed by unique ID) and data about them, or a CandidateTable
+  :param str cost_column: column of data containing cost. Costs must be ints!
+  :param str value_column: column of data containing value. Value must be numeric!
+  :param str type_column: column of data containing the type of item (e.g. player position)
+  :param dict[str, int] required_types: which types we must use, and how many of each
+  :param int cap: maximum total cost
+  :param function debug_print_fn: used to print a candidate solution when debugging
+  :return dict[int, list]: cost level -> indices of included items (players)
+  """
+  table = as_candidate_table(data, cost_column, value_column, type_column)
+  order, costs, values, starts, ends, n_slots, reduced_cap, gcd_cost = _reduce_problem(table, required_types, cap)
+  ids = table.ids[order]
+  best, took = _fill_slots(costs, values, starts, ends, n_slots, reduced_cap)
+  full_teams = best[n_slots]
+  reachable = np.flatnonzero(full_teams > -np.inf)
+  if len(reachable) == 0:
+    raise NotSolvableError("No satisfying set costs %d or less" % cap)
+
+  # The best team for a cost level is the best exact-cost team at or below that level
+  solutions = {}
+  traced = {}
+  best_cost = reachable[0]
+  for current_cost in range(reachable[0], reduced_cap + 1):
+    if full_teams[current_cost] > full_teams[best_cost]:
+      best_cost = current_cost
+    if best_cost not in traced:
+      traced[best_cost] = _trace_back(ids, costs, starts, ends, took, n_slots, best_cost)
+    solutions[current_cost * gcd_cost] = traced[best_cost]
+    if debug_print_fn:
+      print('best solution for $%d has cost %d, value:' % (current_cost * gcd_cost, best_cost * gcd_cost),
+            full_teams[best_cost])
+      debug_print_fn(traced[best_cost])
+  return solutions
@@ -1,114 +1,283 @@
 '''
 Heuristics for the restricted knapsack problem.
 '''
-
-import pandas as pd
+from __future__ import print_function
+import heapq
 import numpy as np
-from .common import get_gcd_cost
+from .candidates import as_candidate_table
+from .dominance import prune_dominated
+from .knapsack import NotSolvableError
 
 def best_vorp(data, cost_column, value_column, type_column, required_types, cap, debug_print_fn=None):
+  # Dominated players can't help, and the upgrade rules below assume they're gone
+  table = prune_dominated(as_candidate_table(data, cost_column, value_column, type_column),
+                          cost_column, value_column, type_column, required_types)
+  return table.solution_ids(np.flatnonzero(_vorp_team(table, required_types, cap)))
+
+def _vorp_team(table, required_types, cap):
+  """
+  :param CandidateTable table: candidate items, with dominated items already pruned
+  :return numpy.ndarray: boolean mask of the team best_vorp picks
+  """
+  costs, values, type_codes = table.costs, table.values, table.type_codes
+  n_types = len(table.types)
+
   # Mark the lowest-cost n players at each position as in the team
-  grouped = data.groupby(type_column)
-  parts = []
-  for pos, df in grouped:
-    df = df.sort(cost_column)
-    its = pd.Series(False, index=df.index)
-    for i in range(required_types[pos]):
-      its.iloc[i] = True
-    df['inteam'] = its
-    parts.append(df)
-  data = pd.concat(parts)
-  solution = list(data[data['inteam'] == True].index.values)
-  cap_so_far = data[data['inteam'] == True][cost_column].sum()
+  inteam = np.zeros(len(table), dtype=bool)
+  alive = np.zeros(len(table), dtype=bool)
+  for code, pos in enumerate(table.types):
+    members = np.flatnonzero(type_codes == code)
+    cheapest = members[np.argsort(costs[members], kind='mergesort')[:required_types.get(pos, 0)]]
+    inteam[cheapest] = True
+    alive[members] = True
+  cap_so_far = costs[inteam].sum()
 
   # Function to determine how much value over the replacement level -- at this position --
   # is offered by each player? Per unit of additional money spent?
-  # Assumes we have already filtered out dominated players
-  # We also know that the min salary has the min cost at each position b/c of our dominated-player preprocessing
-  # TODO: do that here, or copy it into commmon
-  def calc_valper(possible_players):
-    # There's a shortcut I'm trying here which may be bad later. We are only considering upgrading our cheapest player
-    # at a given position to the next level. It might be best to upgrade the more expensive guy. This is fixable but
-    # makes this function pretty complicated, I think? so lets get this working first.
-    min_costs = possible_players[possible_players['inteam'] == True].groupby(type_column)[cost_column].min()
-    min_values = possible_players[possible_players['inteam'] == True].groupby(type_column)[value_column].min()
-    def reduced_value(row):
-      return row[value_column] - min_values[row[type_column]]
-    def reduced_cost(row):
-      return row[cost_column] - min_costs[row[type_column]]
-    possible_players['vorp'] = possible_players.apply(reduced_value, axis=1)
-    possible_players['corp'] = possible_players.apply(reduced_cost, axis=1)
+  # We know that the min salary has the min cost at each position b/c of our dominated-player preprocessing
+  # There's a shortcut I'm trying here which may be bad later. We are only considering upgrading our cheapest player
+  # at a given position to the next level. It might be best to upgrade the more expensive guy. This is fixable but
+  # makes this function pretty complicated, I think? so lets get this working first.
+  # Only the position we just changed needs its min cost / min value (and so its valper) recalculated.
+  min_costs = np.zeros(n_types)
+  min_values = np.zeros(n_types)
+  valper = np.zeros(len(table))
+  def calc_valper(code):
+    members = np.flatnonzero(type_codes == code)
+    selected = members[inteam[members]]
+    if len(selected) == 0:
+      valper[members] = 0
+      return
+    min_costs[code] = costs[selected].min()
+    min_values[code] = values[selected].min()
+    vorp = values[members] - min_values[code]
+    corp = costs[members] - min_costs[code]
+    with np.errstate(divide='ignore', invalid='ignore'):
+      ratio = vorp / corp
     # set value for replacements
-    possible_players['valper'] = possible_players['vorp'].divide(possible_players['corp']).replace(np.inf, 0).replace(np.nan, 0)
-    return possible_players
+    ratio[np.isposinf(ratio) | np.isnan(ratio)] = 0
+    valper[members] = ratio
 
   # Function to remove all players who are worse options than all players selected at that position
-  def remove_downgrades(possible_players):
-    parts = []
-    for ptype, options in possible_players.groupby(type_column):
-      min_value = options[options['inteam'] == True][value_column].min()
-      parts.append(options[options[value_column] >= min_value])
-    reduced = pd.concat(parts)
-    #print 'stripped out %d dominated options' % (len(possible_players) - len(reduced))
-    return reduced
-
-  #print 'initial valper:'
-  #for ptype, options in data.groupby(type_column):
-  #  print ptype
-  #  print options[[cost_column, value_column, 'vorp', 'corp', 'valper', 'inteam']]
+  def remove_downgrades(code):
+    members = np.flatnonzero((type_codes == code) & alive)
+    alive[members[values[members] < min_values[code]]] = False
 
   # assemble list of our upgrade options
-  remaining_candidates = calc_valper(data)
+  for code in range(n_types):
+    calc_valper(code)
 
   # now upgrade where we get the best remaining value per cost -- until the only candidates remaining are our selected ones
-  while len(remaining_candidates) > len(solution):
-    # Remove strictly dominated options
-    # Copy and sort list of remaining candidates
-    remaining_candidates = remaining_candidates.sort('valper', ascending=False)
+  while alive.sum() > inteam.sum():
     # find the best-looking guy we haven't already selected
-    ix = 0
-    while remaining_candidates.iloc[ix]['inteam']:
-      ix += 1
-      continue
-    new_upgrade = remaining_candidates.iloc[ix]
+    options = np.flatnonzero(alive & ~inteam)
+    new_upgrade = options[np.argmax(valper[options])]
+    code = type_codes[new_upgrade]
     # figure out which of the previous guys to replace
-    try:
-      old_candidates = [pid for pid in solution if remaining_candidates.loc[pid][type_column] == new_upgrade[type_column]]
-    except ValueError as ex:
-      import IPython
-      IPython.embed()
-    old_candidates.sort(key=lambda pid: remaining_candidates.loc[pid][value_column])
-    worst = old_candidates[0]
-    old_cost = remaining_candidates.loc[worst, cost_column]
+    old_candidates = np.flatnonzero(inteam & (type_codes == code))
+    worst = old_candidates[np.argmin(values[old_candidates])]
+    old_cost = costs[worst]
     # can we afford to replace him with new_upgrade?
-    if (new_upgrade[cost_column] - old_cost) > (cap - cap_so_far):
-      #print 'Want to replace %s %s ($%d, %.2f) with %s ($%d, %.2f, %.4f valper) but %d/%d spent' % \
-      #      (new_upgrade[type_column], worst, old_cost, remaining_candidates.loc[worst][value_column],
-      #       new_upgrade.name, new_upgrade[cost_column], new_upgrade[value_column], new_upgrade['valper'],
-      #       cap_so_far, cap)
+    if (costs[new_upgrade] - old_cost) > (cap - cap_so_far):
       # remove this candidate from consideration
-      remaining_candidates.drop(new_upgrade.name, inplace=True)
+      alive[new_upgrade] = False
     else:
       # yes: update solution, cap_so_far.
-      solution.remove(worst)
-      cap_so_far -= old_cost
-      cap_so_far += new_upgrade[cost_column]
-      solution.append(new_upgrade.name)
-      remaining_candidates.loc[new_upgrade.name, 'inteam'] = True
-      #print 'Replaced %s %s ($%d, %.2f) with %s ($%d, %.2f, %.4f valper). Now %d/%d spent' % \
-      #      (new_upgrade[type_column], worst, old_cost, remaining_candidates.loc[worst][value_column],
-      #       new_upgrade.name, new_upgrade[cost_column], new_upgrade[value_column], new_upgrade['valper'],
-      #       cap_so_far, cap)
+      inteam[worst] = False
+      cap_so_far += costs[new_upgrade] - old_cost
+      inteam[new_upgrade] = True
       # remove the old candidate from consideration. technically suboptimal but... this is a heuristic anyway!
-      remaining_candidates.drop(worst, inplace=True)
-    remaining_candidates = remove_downgrades(remaining_candidates)
-    #print remaining_candidates[[type_column, cost_column, value_column, 'vorp', 'corp', 'valper', 'inteam']]
-    remaining_candidates = calc_valper(remaining_candidates)
-    #print 'Recalculating valper:'
-    #for ptype, options in remaining_candidates.groupby(type_column):
-      #print ptype
-      #print options[[cost_column, value_column, 'vorp', 'corp', 'valper', 'inteam']]
-    #assert False
-  #print remaining_candidates[[type_column, cost_column, value_column, 'inteam']]
-  #print 'total value', remaining_candidates[value_column].sum()
-  return list(remaining_candidates.index)
\ No newline at end of file
+      alive[worst] = False
+      calc_valper(code)
+    remove_downgrades(code)
+  return inteam
+
+def _group_limits(table, max_per_group):
+  """
+  :return (numpy.ndarray, numpy.ndarray): each item's group, and how many items of each group a team may hold. Items
+    with no group get a group of their own with no limit.
+  """
+  group_of = np.where(table.group_codes < 0, len(table.groups), table.group_codes)
+  limits = np.full(len(table.groups) + 1, max_per_group, dtype=np.int64)
+  limits[-1] = len(table)
+  return group_of, limits
+
+def _fit_groups(costs, values, members_by_code, type_codes, group_of, limits, inteam, cap):
+  """
+  Swap players out of groups over their limit, each time for the cheapest (then best) player of the same type from a
+  group with room.
+  :param numpy.ndarray inteam: boolean mask of the starting team, updated in place
+  :return bool: whether the team now keeps to the limits and the cap
+  """
+  counts = np.bincount(group_of[inteam], minlength=len(limits))
+  while (counts > limits).any():
+    best = None
+    for player_out in np.flatnonzero(inteam & (counts > limits)[group_of]):
+      members = members_by_code[type_codes[player_out]]
+      ins = members[~inteam[members] & (counts[group_of[members]] < limits[group_of[members]])]
+      if len(ins):
+        player_in = ins[np.lexsort((-values[ins], costs[ins]))[0]]
+        if best is None or costs[player_in] - costs[player_out] < best[0]:
+          best = (costs[player_in] - costs[player_out], player_out, player_in)
+    if best is None:
+      return False
+    _, player_out, player_in = best
+    inteam[player_out] = False
+    inteam[player_in] = True
+    counts[group_of[player_out]] -= 1
+    counts[group_of[player_in]] += 1
+  return costs[inteam].sum() <= cap
+
+def _local_search(costs, values, members_by_code, inteam, cap, group_of=None, limits=None):
+  """
+  Improve a team until neither a single swap nor a pair of swaps adds value. Single swaps (any rostered player out, a
+  better player of the same type in) are taken best value per extra unit of cost first. Each position keeps its swaps
+  in its own priority queue, so a swap only means rebuilding the queue for that one position.
+  :param dict[int, numpy.ndarray] members_by_code: positions of the items of each required type
+  :param numpy.ndarray inteam: boolean mask of the starting team, updated in place
+  :param numpy.ndarray group_of: each item's group (see _group_limits); the starting team must keep to the limits
+  :param numpy.ndarray limits: how many items of each group the team may hold, or None for no limits
+  :return int: money left under the cap
+  """
+  limited = limits is not None
+  if not limited:
+    group_of, limits = np.zeros(len(costs), dtype=np.int64), np.array([len(costs)])
+  counts = np.bincount(group_of[inteam], minlength=len(limits))
+  def fits(outs, ins):
+    # Does swapping each of outs for the matching one of ins keep the in-player's group within its limit?
+    return (group_of[ins] == group_of[outs]) | (counts[group_of[ins]] < limits[group_of[ins]])
+
+  # Each queue entry is (-value per extra cost, -extra value, player out, player in)
+  queues = {}
+  def fill_queue(code):
+    members = members_by_code[code]
+    outs, ins = np.meshgrid(members[inteam[members]], members[~inteam[members]])
+    outs, ins = outs.ravel(), ins.ravel()
+    gains = values[ins] - values[outs]
+    extra_costs = costs[ins] - costs[outs]
+    useful = (gains > 0) & fits(outs, ins)
+    outs, ins, gains, extra_costs = outs[useful], ins[useful], gains[useful], extra_costs[useful]
+    with np.errstate(divide='ignore'):
+      ratios = np.where(extra_costs > 0, gains / np.maximum(extra_costs, 1), np.inf)
+    queue = list(zip(-ratios, -gains, outs, ins))
+    heapq.heapify(queue)
+    queues[code] = queue
+
+  def swap(player_out, player_in):
+    inteam[player_out] = False
+    inteam[player_in] = True
+    counts[group_of[player_out]] -= 1
+    counts[group_of[player_in]] += 1
+    return costs[player_in] - costs[player_out]
+
+  def upgrade(budget):
+    for code in members_by_code:
+      fill_queue(code)
+    while True:
+      best_code = None
+      for code, queue in queues.items():
+        # Swaps we can't afford now: budget only comes back with a swap that saves money, which refills every queue.
+        # Likewise a group only gets room back from a swap out of it.
+        while queue and (costs[queue[0][3]] - costs[queue[0][2]] > budget or
+                         not fits(queue[0][2], queue[0][3])):
+          heapq.heappop(queue)
+        if queue and (best_code is None or queue[0] < queues[best_code][0]):
+          best_code = code
+      if best_code is None:
+        return budget
+      _, _, player_out, player_in = queues[best_code][0]
+      changes_group = group_of[player_out] != group_of[player_in]
+      extra_cost = swap(player_out, player_in)
+      budget -= extra_cost
+      if extra_cost < 0 or changes_group:
+        for code in queues:
+          fill_queue(code)
+      else:
+        fill_queue(best_code)
+
+  def best_exchange(budget):
+    # Typically: downgrade one player to pay for a bigger upgrade somewhere else
+    outs, ins = [], []
+    for members in members_by_code.values():
+      position_outs, position_ins = np.meshgrid(members[inteam[members]], members[~inteam[members]])
+      outs.append(position_outs.ravel())
+      ins.append(position_ins.ravel())
+    outs, ins = np.concatenate(outs), np.concatenate(ins)
+    gains = (values[ins] - values[outs])[:, None] + (values[ins] - values[outs])[None, :]
+    extra_costs = (costs[ins] - costs[outs])[:, None] + (costs[ins] - costs[outs])[None, :]
+    valid = (extra_costs <= budget) & (outs[:, None] != outs[None, :]) & (ins[:, None] != ins[None, :])
+    if limited:
+      # Size of each in-player's group after both swaps
+      in_groups, out_groups = group_of[ins], group_of[outs]
+      first_group = (counts[in_groups] + 1)[:, None] - (out_groups == in_groups)[:, None] + \
+                    (in_groups[None, :] == in_groups[:, None]) - (out_groups[None, :] == in_groups[:, None])
+      valid &= (first_group <= limits[in_groups][:, None]) & (first_group.T <= limits[in_groups][None, :])
+    gains = np.where(valid, gains, -np.inf)
+    first, second = np.unravel_index(np.argmax(gains), gains.shape)
+    if not gains[first, second] > 1e-9:
+      return None
+    return (outs[first], ins[first]), (outs[second], ins[second])
+
+  # Every step adds value, so this terminates
+  budget = cap - costs[inteam].sum()
+  while True:
+    budget = upgrade(budget)
+    exchange = best_exchange(budget)
+    if exchange is None:
+      return budget
+    (first_out, first_in), (second_out, second_in) = exchange
+    budget -= swap(first_out, first_in) + swap(second_out, second_in)
+
+def greedy_upgrade(data, cost_column, value_column, type_column, required_types, cap, debug_print_fn=None,
+                   group_column=None, max_per_group=None):
+  """
+  Heuristic solution to the restricted knapsack problem for cost <= cap, fast enough to call thousands of times.
+  Runs a local search (see _local_search) from two teams, the cheapest one and the one best_vorp picks, and keeps the
+  better result, so it never does worse than best_vorp. With max_per_group, each starting team is first swapped into
+  keeping the group limit, and the search only makes swaps that keep it.
+  :param pandas.DataFrame data: items (indexed by unique ID) and data about them, or a CandidateTable
+  :param str cost_column: column of data containing cost
+  :param str value_column: column of data containing value
+  :param str type_column: column of data containing the type of item (e.g. player position)
+  :param dict[str, int] required_types: which types we must use, and how many of each
+  :param int cap: maximum total cost
+  :param function debug_print_fn: used to print the final solution when debugging
+  :param str group_column: column of data containing the item's group (e.g. player team)
+  :param int max_per_group: maximum number of items in the solution from any one group
+  :return list: indices of included items (players)
+  """
+  table = prune_dominated(as_candidate_table(data, cost_column, value_column, type_column, group_column),
+                          cost_column, value_column, type_column, required_types, group_column, max_per_group)
+  costs, values = table.costs.astype(np.int64), table.values
+  group_of, limits = _group_limits(table, max_per_group) if max_per_group is not None else (None, None)
+
+  # The cheapest team (the best one, among equally cheap teams)
+  cheapest = np.zeros(len(table), dtype=bool)
+  members_by_code = {}
+  for entry_type, count in required_types.items():
+    members = table.positions_of_type(entry_type)
+    if len(members) < count:
+      raise NotSolvableError("Not enough entries of type %s (required: %d, present: %d)" %
+                             (entry_type, count, len(members)))
+    if count > 0:
+      cheapest[members[np.lexsort((-values[members], costs[members]))][:count]] = True
+      members_by_code[table.types.index(entry_type)] = members
+  if costs[cheapest].sum() > cap:
+    raise NotSolvableError("No satisfying set costs %d or less" % cap)
+
+  best_team, best_budget = None, None
+  for inteam in [cheapest, _vorp_team(table, required_types, cap)]:
+    if limits is not None and not _fit_groups(costs, values, members_by_code, table.type_codes, group_of, limits,
+                                              inteam, cap):
+      continue
+    budget = _local_search(costs, values, members_by_code, inteam, cap, group_of, limits)
+    if best_team is None or values[inteam].sum() > values[best_team].sum():
+      best_team, best_budget = inteam, budget
+  if best_team is None:
+    raise NotSolvableError("Found no team costing %d or less with at most %d from any group" % (cap, max_per_group))
+
+  solution = table.solution_ids(np.flatnonzero(best_team))
+  if debug_print_fn:
+    print('greedy upgrade solution has value %.2f with %d left under the cap' % (values[best_team].sum(), best_budget))
+    debug_print_fn(solution)
+  return solution
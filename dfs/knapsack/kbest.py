@@ -0,0 +1,92 @@
+'''
+Enumerate the K best distinct solutions to the restricted knapsack problem, for multi-entry contests.
+
+This is Lawler-style partitioning done best-first: every node of the branch-and-bound tree is a partial lineup that
+stands for all the lineups extending it, and the nodes sit in a priority queue ordered by their completion bound.
+The bound table is computed once and shared by every node, so the second, third, ... hundredth lineups cost a few
+more pops off the queue rather than a fresh solve. Because the bound never underestimates, complete lineups come off
+the queue in order of decreasing value.
+'''
+from __future__ import print_function
+import heapq
+import itertools
+import numpy as np
+from .candidates import as_candidate_table
+from .exact import _reduce_problem
+from .bnb import _completion_bounds, _constraint_matrix, _Search
+from .knapsack import NotSolvableError
+
+class _Accepted(object):
+  """
+  Lineups accepted so far, stored as an item x lineup membership matrix so that overlap checks are one array sum.
+  """
+  def __init__(self, n_items, max_shared):
+    self.members = np.zeros((n_items, 0), dtype=np.int8)
+    self.max_shared = max_shared
+
+  def add(self, lineup):
+    column = np.zeros((self.members.shape[0], 1), dtype=np.int8)
+    column[list(lineup)] = 1
+    self.members = np.hstack([self.members, column])
+
+  def too_similar(self, lineup):
+    """
+    Does this (possibly partial) lineup already share too many items with a lineup we've accepted?
+    """
+    if not self.members.shape[1] or len(lineup) <= self.max_shared:
+      return False
+    return self.members[list(lineup)].sum(axis=0).max() > self.max_shared
+
+def solve_k_best(data, cost_column, value_column, type_column, required_types, cap, k, min_unique=1,
+                 group_column=None, max_per_group=None, constraints=None, debug_print_fn=None):
+  """
+  Find the k best solutions to the restricted knapsack problem for cost <= cap, best first.
+  Arguments are as for dfs.knapsack.bnb.solve_constrained, plus:
+  :param int k: how many solutions to return (fewer are returned if fewer exist)
+  :param int min_unique: every pair of returned solutions must differ by at least this many items
+  :return list[list]: solutions, each a list of indices of included items (players)
+  """
+  table = as_candidate_table(data, cost_column, value_column, type_column, group_column,
+                             [column for column, _, _ in (constraints or [])])
+  order, costs, values, starts, ends, n_slots, reduced_cap, gcd_cost = _reduce_problem(table, required_types, cap)
+  completion = _completion_bounds(costs, values, starts, ends, n_slots, reduced_cap)
+  coefficients, lower, upper = _constraint_matrix(table, order, max_per_group, constraints)
+  search = _Search(costs, values, starts, ends, n_slots, completion, coefficients, lower, upper)
+  accepted = _Accepted(len(costs), n_slots - min_unique)
+  solutions = []
+  tiebreak = itertools.count()
+
+  # A family is a partial lineup plus its candidate next players, sorted by bound. The queue holds (family, i) pairs
+  # meaning "extend this family with its i-th candidate", and popping one only pushes its next sibling and its own
+  # best child, instead of every child at once.
+  def push_family(queue, slot, first_player, budget, value, lineup, usage):
+    players, bounds = search.children(slot, first_player, budget, value)
+    if len(players) and bounds[0] > -np.inf:
+      family = (slot, budget, value, lineup, usage, players, bounds)
+      heapq.heappush(queue, (-bounds[0], next(tiebreak), 0, family))
+
+  queue = []
+  push_family(queue, 0, 0, reduced_cap, 0.0, (), np.zeros(len(coefficients)))
+  while queue and len(solutions) < k:
+    _, _, i, family = heapq.heappop(queue)
+    slot, budget, value, lineup, usage, players, bounds = family
+    if accepted.too_similar(lineup):
+      continue  # and so is every sibling
+    if i + 1 < len(players) and bounds[i + 1] > -np.inf:
+      heapq.heappush(queue, (-bounds[i + 1], next(tiebreak), i + 1, family))
+    player = players[i]
+    new_lineup = lineup + (player,)
+    new_usage = usage + coefficients[:, player] if len(coefficients) else usage
+    if not search.feasible(new_usage, n_slots - slot - 1) or accepted.too_similar(new_lineup):
+      continue
+    if slot + 1 == n_slots:
+      accepted.add(new_lineup)
+      solutions.append(table.solution_ids(order[list(new_lineup)]))
+      if debug_print_fn:
+        print('solution %d has value %.2f' % (len(solutions), value + values[player]))
+        debug_print_fn(solutions[-1])
+    else:
+      push_family(queue, slot + 1, player + 1, budget - costs[player], value + values[player], new_lineup, new_usage)
+  if not solutions:
+    raise NotSolvableError("No satisfying set costs %d or less and meets the constraints" % cap)
+  return solutions
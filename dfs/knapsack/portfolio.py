@@ -0,0 +1,147 @@
+'''
+Anytime solver portfolio: run several strategies side by side in worker processes and take the best lineup any of them
+has found when the time budget runs out.
+
+The heuristics usually report a good lineup within milliseconds. The branch-and-bound worker reports the bound on the
+best possible lineup as soon as it has its bound table, prunes against the best lineup any worker has found so far
+(shared through a multiprocessing.Value), and proves that lineup optimal if it finishes in time. The gap between the
+bound and the best lineup found so far is the most we could be leaving on the table.
+'''
+from __future__ import print_function
+import multiprocessing
+import time
+import traceback
+import numpy as np
+try:
+  from queue import Empty
+except ImportError:
+  from Queue import Empty
+from .candidates import as_candidate_table
+from .exact import _reduce_problem
+from .bnb import _completion_bounds, _constraint_matrix, _Search
+from .heuristics import best_vorp, greedy_upgrade
+from .knapsack import NotSolvableError
+
+HEURISTICS = {'vorp': best_vorp, 'greedy': greedy_upgrade}
+STRATEGIES = ['vorp', 'greedy', 'bnb']
+
+def _satisfies(table, positions, required_types, cap, max_per_group, constraints):
+  """
+  Is a lineup legal? greedy_upgrade keeps to max_per_group but neither heuristic knows about the extra constraints (and
+  best_vorp doesn't check much else), so their lineups have to be checked.
+  """
+  types = [table.type_of(position) for position in positions]
+  if any(types.count(entry_type) != count for entry_type, count in required_types.items()) or \
+     len(types) != sum(required_types.values()) or table.costs[positions].sum() > cap:
+    return False
+  coefficients, lower, upper = _constraint_matrix(table, np.asarray(positions), max_per_group, constraints)
+  totals = coefficients.sum(axis=1)
+  return np.all(totals <= upper + 1e-9) and np.all(totals >= lower - 1e-9)
+
+def _run_strategy(strategy, table, required_types, cap, max_per_group, constraints, incumbent, results):
+  """
+  Worker process body. Puts ('lineup', strategy, value, ids) for every improvement it finds, ('bound', strategy, bound,
+  None) if it has a bound on the optimum, and finally ('done', strategy, None, None) if it ran to the end or
+  ('error', strategy, traceback, None) if it failed.
+  """
+  def offer(value, ids):
+    with incumbent.get_lock():
+      if value <= incumbent.value:
+        return
+      incumbent.value = value
+    results.put(('lineup', strategy, value, ids))
+
+  try:
+    if strategy in HEURISTICS:
+      # Only greedy_upgrade can keep to the group limit
+      options = {'max_per_group': max_per_group} if strategy == 'greedy' else {}
+      ids = HEURISTICS[strategy](table, None, None, None, required_types, cap, **options)
+      positions = table.positions_of(ids)
+      if _satisfies(table, positions, required_types, cap, max_per_group, constraints):
+        offer(table.values[positions].sum(), ids)
+    else:
+      order, costs, values, starts, ends, n_slots, reduced_cap, gcd_cost = _reduce_problem(table, required_types, cap)
+      completion = _completion_bounds(costs, values, starts, ends, n_slots, reduced_cap)
+      results.put(('bound', strategy, completion[0, 0, reduced_cap], None))
+      coefficients, lower, upper = _constraint_matrix(table, order, max_per_group, constraints)
+      def on_improve(value, lineup):
+        offer(value, table.solution_ids(order[lineup]))
+      search = _Search(costs, values, starts, ends, n_slots, completion, coefficients, lower, upper,
+                       incumbent=incumbent, on_improve=on_improve)
+      search.run(0, 0, reduced_cap, 0.0, [], np.zeros(len(coefficients)))
+  except NotSolvableError:
+    pass
+  except Exception:
+    # Not 'done': for branch and bound that would claim the incumbent is optimal
+    results.put(('error', strategy, traceback.format_exc(), None))
+    return
+  results.put(('done', strategy, None, None))
+
+def solve_portfolio(data, cost_column, value_column, type_column, required_types, cap, time_budget,
+                    group_column=None, max_per_group=None, constraints=None, strategies=STRATEGIES,
+                    debug_print_fn=None):
+  """
+  Find the best solution to the restricted knapsack problem for cost <= cap that the strategies can find within
+  time_budget seconds. Arguments are as for dfs.knapsack.bnb.solve_constrained, plus:
+  :param float time_budget: wall-clock seconds to wait for the workers
+  :param list[str] strategies: which strategies to run: any of 'vorp', 'greedy' (see dfs.knapsack.heuristics) and
+    'bnb' (dfs.knapsack.bnb, which is exact when it has time to finish). Only 'bnb' searches under the constraints;
+    'greedy' keeps to max_per_group, and heuristic lineups that break a limit are dropped.
+  :return (list, float): indices of included items (players), and how far below the optimum it may be (0 if proven
+    optimal, inf if there is no bound)
+  """
+  table = as_candidate_table(data, cost_column, value_column, type_column, group_column,
+                             [column for column, _, _ in (constraints or [])])
+  deadline = time.time() + time_budget
+  incumbent = multiprocessing.Value('d', -np.inf)
+  results = multiprocessing.Queue()
+  workers = [multiprocessing.Process(target=_run_strategy,
+                                     args=(strategy, table, required_types, cap, max_per_group, constraints,
+                                           incumbent, results))
+             for strategy in strategies]
+  for worker in workers:
+    worker.daemon = True
+    worker.start()
+
+  best_value, best_lineup, best_strategy = -np.inf, None, None
+  bound = np.inf
+  proven = False
+  failure = None
+  running = len(workers)
+  # Once branch and bound is done the incumbent is optimal, so there's nothing to wait for but its lineup
+  while running and not (proven and best_value >= incumbent.value):
+    try:
+      if time.time() < deadline:
+        kind, strategy, value, lineup = results.get(timeout=max(deadline - time.time(), 0))
+      else:
+        # Out of time: just pick up whatever has already been sent
+        kind, strategy, value, lineup = results.get_nowait()
+    except Empty:
+      break
+    if kind == 'lineup' and value > best_value:
+      best_value, best_lineup, best_strategy = value, lineup, strategy
+    elif kind == 'bound':
+      bound = value
+    elif kind == 'done':
+      running -= 1
+      # Branch and bound only stops early by finding (or ruling out) everything better than the incumbent
+      proven = proven or strategy == 'bnb'
+    elif kind == 'error':
+      failure = (strategy, value)
+      break
+  for worker in workers:
+    if worker.is_alive():
+      worker.terminate()
+    worker.join()
+
+  if failure:
+    raise RuntimeError("The %s strategy failed:\n%s" % failure)
+  if best_lineup is None:
+    if proven:
+      raise NotSolvableError("No satisfying set costs %d or less and meets the constraints" % cap)
+    raise NotSolvableError("No satisfying set found in %.1f seconds" % time_budget)
+  gap = 0.0 if proven else max(bound - best_value, 0.0)
+  if debug_print_fn:
+    print('best portfolio solution has value %.2f (from %s, within %.2f of optimal)' % (best_value, best_strategy, gap))
+    debug_print_fn(best_lineup)
+  return best_lineup, gap
@@ -0,0 +1,258 @@
+'''
+Incremental re-optimization for when the slate changes under us (injuries, confirmed lineups, late projections).
+
+The restricted knapsack problem splits by type: for each type we can work out the best value of filling that type's
+slots for every exact (reduced) cost, and the best lineup then combines one entry from each of those per-type tables
+(a max-plus convolution). An OptimizerSession keeps the per-type tables along with the convolutions of every prefix
+and suffix of the type order. A change to one player only invalidates its own type's table and the partial
+convolutions that include it, so after a single change a solve is one per-type dynamic program over a few dozen
+players plus one convolution, rather than a full solve over the whole slate.
+'''
+from __future__ import print_function
+import numpy as np
+from .common import get_gcd_cost
+from .candidates import as_candidate_table, CandidateTable
+from .dominance import _dominated_within
+from .exact import _fill_slots, _trace_back
+from .bnb import solve_constrained
+from .knapsack import NotSolvableError
+
+def _max_plus(a, b):
+  """
+  :return numpy.ndarray: c -> max over a[i] + b[c - i]
+  """
+  out = np.full(len(a), -np.inf)
+  for i in np.flatnonzero(a > -np.inf):
+    np.maximum(out[i:], a[i] + b[:len(a) - i], out=out[i:])
+  return out
+
+def _split(a, b, total):
+  """
+  Undo one step of _max_plus.
+  :return int: i such that a[i] + b[total - i] is the best way to make total
+  """
+  return int(np.argmax(a[:total + 1] + b[total::-1]))
+
+class OptimizerSession(object):
+  """
+  The best lineup for a slate that keeps changing. Make changes with remove_player, restore_player, set_value,
+  set_cost, lock_player and unlock_player, then call solve; only the types touched since the last solve are worked out again.
+  If max_per_group is set and the best lineup breaks it, solve falls back to dfs.knapsack.bnb on the current slate.
+  """
+  def __init__(self, data, cost_column, value_column, type_column, required_types, cap,
+               group_column=None, max_per_group=None):
+    """
+    :param pandas.DataFrame data: items (indexed by unique ID) and data about them, or a CandidateTable
+    :param str cost_column: column of data containing cost. Costs must be ints!
+    :param str value_column: column of data containing value. Value must be numeric!
+    :param str type_column: column of data containing the type of item (e.g. player position)
+    :param dict[str, int] required_types: which types we must use, and how many of each
+    :param int cap: maximum total cost
+    :param str group_column: column of data containing the item's group (e.g. player team)
+    :param int max_per_group: maximum number of items in the solution from any one group
+    """
+    self.table = as_candidate_table(data, cost_column, value_column, type_column, group_column)
+    self.required_types = {entry_type: count for entry_type, count in required_types.items() if count > 0}
+    self.cap = cap
+    self.max_per_group = max_per_group
+    self.costs = self.table.costs.astype(np.int64)
+    self.values = self.table.values.copy()
+    self.available = np.ones(len(self.table), dtype=bool)
+    self.locked = np.zeros(len(self.table), dtype=bool)
+    self.types = sorted(self.required_types)
+    self.members = {entry_type: self.table.positions_of_type(entry_type) for entry_type in self.types}
+    self.positions = {item: position for position, item in enumerate(self.table.ids)}
+    self._reset()
+
+  def _reset(self):
+    """
+    Throw away everything we've worked out (e.g. when a new cost changes the cost gcd).
+    """
+    self.gcd_cost = get_gcd_cost(self.costs, self.cap)
+    self.reduced_costs = self.costs // self.gcd_cost
+    self.reduced_cap = self.cap // self.gcd_cost
+    self._type_tables = {}
+    self._prefixes = {0: self._nothing()}
+    self._suffixes = {len(self.types): self._nothing()}
+    self._last_changed = 0
+
+  def _nothing(self):
+    empty = np.full(self.reduced_cap + 1, -np.inf)
+    empty[0] = 0
+    return empty
+
+  def _changed(self, position):
+    """
+    Forget whatever depends on the type of the item at this position.
+    """
+    entry_type = self.table.type_of(position)
+    if entry_type not in self.required_types:
+      return
+    index = self.types.index(entry_type)
+    self._type_tables.pop(entry_type, None)
+    self._prefixes = {i: prefix for i, prefix in self._prefixes.items() if i <= index}
+    self._suffixes = {i: suffix for i, suffix in self._suffixes.items() if i > index}
+    self._last_changed = index
+
+  def _position(self, item):
+    if item not in self.positions:
+      raise KeyError("No such player: %s" % (item,))
+    return self.positions[item]
+
+  def remove_player(self, item):
+    """
+    Take a player out of consideration (e.g. ruled out with an injury).
+    """
+    position = self._position(item)
+    if self.locked[position]:
+      raise ValueError("Can't remove locked player %s" % (item,))
+    self.available[position] = False
+    self._changed(position)
+
+  def restore_player(self, item):
+    """
+    Undo remove_player.
+    """
+    position = self._position(item)
+    self.available[position] = True
+    self._changed(position)
+
+  def set_value(self, item, value):
+    """
+    Change a player's projection.
+    """
+    position = self._position(item)
+    self.values[position] = value
+    self._changed(position)
+
+  def set_cost(self, item, cost):
+    """
+    Change a player's salary.
+    """
+    position = self._position(item)
+    self.costs[position] = cost
+    if cost % self.gcd_cost:
+      self._reset()
+    else:
+      self.reduced_costs[position] = cost // self.gcd_cost
+      self._changed(position)
+
+  def lock_player(self, item):
+    """
+    Make every lineup from now on include this player.
+    """
+    position = self._position(item)
+    if not self.available[position]:
+      raise ValueError("Can't lock removed player %s" % (item,))
+    if self.table.type_of(position) not in self.required_types:
+      raise ValueError("Can't lock player %s, whose type we don't need" % (item,))
+    self.locked[position] = True
+    self._changed(position)
+
+  def unlock_player(self, item):
+    position = self._position(item)
+    self.locked[position] = False
+    self._changed(position)
+
+  def _type_table(self, entry_type):
+    """
+    Best value of filling this type's slots, by exact reduced cost, and what we need to trace back the players.
+    Locked players are taken as given and only the remaining slots are searched, over the players that aren't
+    dominated by as many others as there are remaining slots.
+    """
+    if entry_type not in self._type_tables:
+      members = self.members[entry_type]
+      members = members[self.available[members]]
+      locked = members[self.locked[members]]
+      free = members[~self.locked[members]]
+      slots = self.required_types[entry_type] - len(locked)
+      by_cost = np.full(self.reduced_cap + 1, -np.inf)
+      took = None
+      if 0 <= slots <= len(free):
+        dominated = np.zeros(len(self.table), dtype=bool)
+        dominated[_dominated_within(self.reduced_costs, self.values, free, slots)] = True
+        free = free[~dominated[free]]
+        best, took = _fill_slots(self.reduced_costs[free], self.values[free], np.zeros(len(free), dtype=int),
+                                 np.full(len(free), slots, dtype=int), slots, self.reduced_cap)
+        offset = self.reduced_costs[locked].sum()
+        if offset <= self.reduced_cap:
+          by_cost[offset:] = best[slots, :self.reduced_cap + 1 - offset] + self.values[locked].sum()
+      self._type_tables[entry_type] = (by_cost, free, locked, slots, took)
+    return self._type_tables[entry_type][0]
+
+  def _prefix(self, i):
+    """
+    :return numpy.ndarray: best value of filling the slots of the first i types, by exact reduced cost
+    """
+    if i not in self._prefixes:
+      self._prefixes[i] = _max_plus(self._prefix(i - 1), self._type_table(self.types[i - 1]))
+    return self._prefixes[i]
+
+  def _suffix(self, i):
+    """
+    :return numpy.ndarray: best value of filling the slots of types i and later, by exact reduced cost
+    """
+    if i not in self._suffixes:
+      self._suffixes[i] = _max_plus(self._type_table(self.types[i]), self._suffix(i + 1))
+    return self._suffixes[i]
+
+  def _trace_type(self, entry_type, reduced_cost):
+    by_cost, free, locked, slots, took = self._type_tables[entry_type]
+    remaining = reduced_cost - self.reduced_costs[locked].sum()
+    chosen = _trace_back(free, self.reduced_costs[free], np.zeros(len(free), dtype=int),
+                         np.full(len(free), slots, dtype=int), took, slots, remaining)
+    return list(locked) + chosen
+
+  def _solve_unconstrained(self):
+    """
+    :return (float, list): value and table positions of the best lineup, ignoring max_per_group
+    """
+    # Split the types around the last one that changed: everything before it and after it is still known
+    split = self._last_changed + 1
+    before, after = self._prefix(split), self._suffix(split)
+    # after[c] may cost less than the budget left over, so use the best after-value at or under each cost
+    best_after = np.maximum.accumulate(after)
+    totals = before + best_after[::-1]
+    if not totals.max() > -np.inf:
+      raise NotSolvableError("No satisfying set costs %d or less" % self.cap)
+    before_cost = int(np.argmax(totals))
+    after_cost = int(np.argmax(after[:self.reduced_cap - before_cost + 1]))
+
+    lineup = []
+    for i in range(split, 0, -1):
+      earlier = _split(self._prefix(i - 1), self._type_table(self.types[i - 1]), before_cost)
+      lineup += self._trace_type(self.types[i - 1], before_cost - earlier)
+      before_cost = earlier
+    for i in range(split, len(self.types)):
+      here = _split(self._type_table(self.types[i]), self._suffix(i + 1), after_cost)
+      lineup += self._trace_type(self.types[i], here)
+      after_cost -= here
+    return totals.max(), lineup
+
+  def current_table(self):
+    """
+    :return CandidateTable: the slate as it stands now
+    """
+    table = CandidateTable(ids=self.table.ids, costs=self.costs.astype(np.int32), values=self.values,
+                           type_codes=self.table.type_codes, types=self.table.types,
+                           group_codes=self.table.group_codes, groups=self.table.groups, extras=self.table.extras)
+    return table.take(self.available)
+
+  def solve(self, debug_print_fn=None):
+    """
+    Find the best lineup for the slate as it stands now.
+    :param function debug_print_fn: used to print the solution when debugging
+    :return list: indices of included items (players)
+    """
+    value, lineup = self._solve_unconstrained()
+    groups = self.table.group_codes[lineup]
+    groups = groups[groups >= 0]
+    if self.max_per_group is not None and len(groups) and np.bincount(groups).max() > self.max_per_group:
+      solution = solve_constrained(self.current_table(), None, None, None, self.required_types, self.cap,
+                                   max_per_group=self.max_per_group, locked=self.table.ids[self.locked])
+    else:
+      solution = self.table.solution_ids(lineup)
+    if debug_print_fn:
+      print('session solution has value %.2f' % self.values[[self.positions[item] for item in solution]].sum())
+      debug_print_fn(solution)
+    return solution
@@ -0,0 +1,21 @@
+'''
+Lazily loaded data. Modules that need big tables (gamelogs, player mappings) load them on first use through a
+memoized provider instead of at import time, so that scripts which never touch them (or just print --help) start fast.
+'''
+import functools
+
+def memoized(func):
+  """
+  Decorator for a function that loads data and takes no arguments: the data is loaded on the first call, and every
+  later call returns the same object. Call .reset() on the decorated function to load it afresh next time.
+  """
+  loaded = []
+  @functools.wraps(func)
+  def provider():
+    if not loaded:
+      loaded.append(func())
+    return loaded[0]
+  def reset():
+    del loaded[:]
+  provider.reset = reset
+  return provider
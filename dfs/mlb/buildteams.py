@@ -1,12 +1,19 @@
 from argparse import ArgumentParser
 import pandas as pd, numpy as np
-from dfs.knapsack.knapsack import solve_all
+from dfs.knapsack.bnb import solve_constrained
+from dfs.knapsack.kbest import solve_k_best
+from dfs.knapsack.candidates import CandidateTable
+from dfs.knapsack.dominance import find_dominated
+from dfs.knapsack.portfolio import solve_portfolio
 import IPython
 
 field_positions = {'C': 1, 'SS': 1, '1B': 1, '2B': 1, '3B': 1, 'OF': 3}
 
+# FanDuel won't let you roster more than 4 players from the same team.
+MAX_PLAYERS_PER_TEAM = 4
+
 def build_teams(datafile, salary_col, position_col, prediction_col, num_pitchers, cap=35000,
-                legal_teams=None):
+                legal_teams=None, num_lineups=None, min_unique=1, time_budget=None):
   """
   Construct teams from a set of prediction data
   :param str datafile: saved prediction data (pickle file)
@@ -15,6 +22,10 @@ def build_teams(datafile, salary_col, position_col, prediction_col, num_pitchers
   :param str prediction_col: name of prediction column
   :param int num_pitchers: number of pitchers to built teams around
   :param list[str] legal_teams: an optional list of legal MLB teams for the game
+  :param int num_lineups: if set, build this many distinct teams around any of the pitchers instead of one per pitcher
+  :param int min_unique: min number of players by which any two of the num_lineups teams differ
+  :param float time_budget: if set, run the solver portfolio for each pitcher's team and take the best team it has
+    after this many seconds
   :return:
   """
   player_data = pd.read_pickle(datafile)
@@ -34,21 +45,62 @@ def build_teams(datafile, salary_col, position_col, prediction_col, num_pitchers
   #pitchers.dropna(inplace=True, subset=['value', salary_col, position_col, prediction_col])
   best_pitchers = pitchers.sort(prediction_col, ascending=0).head(num_pitchers)
 
-  cheapest_pitcher = best_pitchers.sort(salary_col, ascending=1)[salary_col].iloc[0]
-  max_batter_sal = cap - cheapest_pitcher
-
   # the following drop is not inplace since batters is a slice
   batters = batters.dropna(subset=[salary_col, position_col, prediction_col])
-  best_batters = solve_all(data=batters,
+
+  # Build the solver's view of the slate once, and just take the rows we need for each pitcher
+  table = CandidateTable.from_frame(pd.concat([best_pitchers, batters]), salary_col, prediction_col, position_col,
+                                    group_column='Team')
+  is_batter = table.type_codes != table.types.index('P')
+
+  if num_lineups:
+    lineups = solve_k_best(data=table,
                            cost_column=salary_col,
                            value_column=prediction_col,
                            type_column=position_col,
-                           required_types=field_positions,
-                           cap=max_batter_sal)
+                           required_types=dict(field_positions, P=1),
+                           cap=cap,
+                           k=num_lineups,
+                           min_unique=min_unique,
+                           group_column='Team',
+                           max_per_group=MAX_PLAYERS_PER_TEAM)
+    for lineup_number, lineup in enumerate(lineups):
+      team = get_team(lineup)
+      print "LINEUP %d: TOTAL PROJ %.2f" % (lineup_number + 1, team[prediction_col].sum())
+      print team
+    return
+
+  # Each lineup only needs the batters that aren't beaten, at their position and within their team, by as many cheaper
+  # batters as it has slots there. Pitchers are picked one at a time below, so keep all of them.
+  dominated = find_dominated(table, salary_col, prediction_col, position_col, field_positions,
+                             group_column='Team', max_per_group=MAX_PLAYERS_PER_TEAM)
+  table = table.take(~(dominated & is_batter))
+  is_batter = table.type_codes != table.types.index('P')
 
   for pitcher_id, pitcher_row in best_pitchers.iterrows():
-    remaining_salary = cap - pitcher_row[salary_col]
-    other_players = best_batters[remaining_salary]
+    # Solve for the whole lineup around this pitcher so that the per-team limit counts the pitcher too
+    candidates = table.take(is_batter | (table.ids == pitcher_id))
+    if time_budget is not None:
+      lineup, gap = solve_portfolio(data=candidates,
+                                    cost_column=salary_col,
+                                    value_column=prediction_col,
+                                    type_column=position_col,
+                                    required_types=dict(field_positions, P=1),
+                                    cap=cap,
+                                    time_budget=time_budget,
+                                    group_column='Team',
+                                    max_per_group=MAX_PLAYERS_PER_TEAM)
+      print "(within %.2f of the best team with this pitcher)" % gap
+    else:
+      lineup = solve_constrained(data=candidates,
+                                 cost_column=salary_col,
+                                 value_column=prediction_col,
+                                 type_column=position_col,
+                                 required_types=dict(field_positions, P=1),
+                                 cap=cap,
+                                 group_column='Team',
+                                 max_per_group=MAX_PLAYERS_PER_TEAM)
+    other_players = [pid for pid in lineup if pid != pitcher_id]
     team = pd.concat([get_team([pitcher_id]), get_team(other_players)])
     print "TOTAL PROJ %.2f with pitcher %s ($%d, PROJ %.2f):" % (team[prediction_col].sum(),
                                                                  team.loc[pitcher_id, 'fullname'],
@@ -66,6 +118,11 @@ def build_teams_cli():
   p.add_argument("--position", default="Position", help="name of position column")
   p.add_argument("--prediction", default="prediction", help="name of predicted column")
   p.add_argument("--teams", default=None, nargs='+', help="legal MLB teams for game")
+  p.add_argument("--num-lineups", type=int, default=None,
+                 help="build this many distinct teams (using any of the top pitchers) instead of one per pitcher")
+  p.add_argument("--min-unique", type=int, default=1, help="min number of players by which any two teams differ")
+  p.add_argument("--time-budget", type=float, default=None,
+                 help="seconds to spend on each team, taking the best found by then instead of the optimum")
   cfg = p.parse_args()
 
   build_teams(datafile=cfg.data,
@@ -73,5 +130,8 @@ def build_teams_cli():
               position_col=cfg.position,
               prediction_col=cfg.prediction,
               num_pitchers=cfg.num_pitchers,
-              legal_teams=cfg.teams)
+              legal_teams=cfg.teams,
+              num_lineups=cfg.num_lineups,
+              min_unique=cfg.min_unique,
+              time_budget=cfg.time_budget)
 
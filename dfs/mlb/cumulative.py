@@ -0,0 +1,187 @@
+"""
+Running totals over every player's gamelogs, for looking up stats as of any date.
+
+All the players' games are stacked into one table sorted by player and date, with a running total of each counting
+stat. A player's totals over any run of their games are then the difference of two running totals, and the games
+before a given date are found by one searchsorted over the whole table -- so a whole column of (player, date) rows
+is answered at once, instead of filtering each player's full gamelog for every row.
+"""
+import numpy as np
+import pandas as pd
+
+from dfs.lazy import memoized
+from dfs.extdata.bsbr.gamelogs import load_gamelogs
+
+pitching_stats = ['BB', 'SO', 'HR', 'BF', 'GB', 'FB', 'PU']
+
+def _to_float(value):
+  try:
+    return float(value)
+  except (TypeError, ValueError):
+    return np.nan
+
+class CumulativeStats(object):
+  """
+  Running totals of some gamelog columns, for every player.
+  """
+  def __init__(self, gamelogs, stats, last_value_columns=()):
+    """
+    :param dict[str, pandas.DataFrame] gamelogs: each player's gamelog, indexed by date
+    :param list[str] stats: counting stats to keep running totals of
+    :param list[str] last_value_columns: columns to look up the latest value of (e.g. a running ERA or batting
+      average), converted to floats
+    """
+    self.stats = list(stats)
+    self.last_value_columns = list(last_value_columns)
+    columns = self.stats + self.last_value_columns
+    players, dates, values = [], [], []
+    for player, df in gamelogs.iteritems():
+      if df is None or not len(df):
+        continue
+      df = df[pd.notnull(df.index)]
+      players.append(np.repeat(player, len(df)).astype(object))
+      dates.append(pd.DatetimeIndex(df.index).values)
+      values.append(df.reindex(columns=columns).values)
+    if players:
+      players, dates, values = np.concatenate(players), np.concatenate(dates), np.vstack(values)
+    else:
+      players, dates = np.array([], dtype=object), np.array([], dtype='datetime64[ns]')
+      values = np.zeros((0, len(columns)), dtype=object)
+    order = np.lexsort((dates, pd.factorize(players, sort=True)[0]))
+    self.players, self.dates, values = players[order], dates[order], values[order]
+
+    counting = np.array([[_to_float(value) for value in row] for row in values[:, :len(self.stats)]]) \
+      .reshape(len(self.players), len(self.stats))
+    present = ~np.isnan(counting)
+    # Row i + 1 holds the totals over the first i games, so the totals over games a..b are row b + 1 minus row a
+    self.totals = np.vstack([np.zeros((1, len(self.stats))), np.cumsum(np.where(present, counting, 0), axis=0)])
+    self.missing = np.vstack([np.zeros((1, len(self.stats))), np.cumsum(~present, axis=0)])
+    self.last_values = np.array([[_to_float(value) for value in row] for row in values[:, len(self.stats):]]) \
+      .reshape(len(self.players), len(self.last_value_columns))
+
+    # Position of the first game of each game's player, and of its player's season
+    positions = np.arange(len(self.players))
+    self.years = pd.DatetimeIndex(self.dates).year.values.astype(np.int64)
+    first_game = np.ones(len(self.players), dtype=bool)
+    first_game[1:] = self.players[1:] != self.players[:-1]
+    first_of_season = first_game.copy()
+    first_of_season[1:] |= self.years[1:] != self.years[:-1]
+    self.player_start = np.maximum.accumulate(np.where(first_game, positions, 0))
+    self.season_start = np.maximum.accumulate(np.where(first_of_season, positions, 0))
+
+  def latest_games(self, players, dates):
+    """
+    :param array players: player of each row
+    :param array dates: date of each row
+    :return numpy.ndarray: position in the table of each player's latest game strictly before the row's date, or -1
+    """
+    players = np.asarray(players, dtype=object)
+    dates = pd.DatetimeIndex(dates).values
+    if not len(self.players) or not len(players):
+      return np.full(len(players), -1, dtype=np.int64)
+    # Players and dates are ranked together so that (player, date) orders as a single integer
+    player_codes = pd.factorize(np.concatenate([self.players, players]))[0]
+    date_codes = np.unique(np.concatenate([self.dates, dates]), return_inverse=True)[1].ravel()
+    keys = player_codes.astype(np.int64) * (date_codes.max() + 1) + date_codes
+    game_keys, row_keys = keys[:len(self.players)], keys[len(self.players):]
+    latest = np.searchsorted(game_keys, row_keys, side='left') - 1
+    found = (latest >= 0) & (player_codes[np.maximum(latest, 0)] == player_codes[len(self.players):])
+    return np.where(found, latest, -1)
+
+  def sums(self, players, dates, window=None, season=False):
+    """
+    Sum the counting stats over each player's games before the row's date, skipping missing values.
+    :param array players: player of each row
+    :param array dates: date of each row
+    :param int window: only sum the player's last `window` games before the date
+    :param bool season: only sum the player's games before the date in the date's season
+    :return (pandas.DataFrame, pandas.DataFrame, numpy.ndarray): sums of each stat, the number of missing values
+      skipped for each stat, and the number of games summed
+    """
+    latest = self.latest_games(players, dates)
+    found = latest >= 0
+    ends = np.where(found, latest + 1, 0)
+    starts = ends.copy()
+    if found.any():
+      first_games = self.season_start if season else self.player_start
+      starts[found] = first_games[latest[found]]
+      if season:
+        # The player's latest game may be from an earlier season, leaving nothing to sum
+        earlier_season = self.years[latest[found]] < pd.DatetimeIndex(dates).year.values[found]
+        starts[np.flatnonzero(found)[earlier_season]] = ends[found][earlier_season]
+    if window is not None:
+      starts = np.maximum(starts, ends - window)
+    sums = pd.DataFrame(self.totals[ends] - self.totals[starts], columns=self.stats)
+    missing = pd.DataFrame(self.missing[ends] - self.missing[starts], columns=self.stats)
+    return sums, missing, ends - starts
+
+  def latest_values(self, players, dates):
+    """
+    :return pandas.DataFrame: the last_value_columns of each player's latest game before the row's date (NaN if none)
+    """
+    latest = self.latest_games(players, dates)
+    values = np.full((len(latest), len(self.last_value_columns)), np.nan)
+    values[latest >= 0] = self.last_values[latest[latest >= 0]]
+    return pd.DataFrame(values, columns=self.last_value_columns)
+
+def fip(sums):
+  """
+  :param pandas.DataFrame sums: summed 'BB', 'SO' and 'HR'
+  :return pandas.Series: FIP, as in the pitcher YTD featurizers
+  """
+  return 3.20 + (3 * sums['BB'] - 2 * sums['SO'] + 13 * sums['HR']) / 9.0
+
+def siera(sums):
+  """
+  :param pandas.DataFrame sums: summed 'BF', 'GB', 'FB', 'PU', 'SO' and 'BB'
+  :return pandas.Series: SIERA
+  """
+  # see http://www.fangraphs.com/blogs/new-siera-part-two-of-five-unlocking-underrated-pitching-skills/
+  with np.errstate(divide='ignore', invalid='ignore'):
+    gb_pa = (sums['GB'] - sums['FB'] - sums['PU']) / sums['BF']
+    so_pa = sums['SO'] / sums['BF']
+    bb_pa = sums['BB'] / sums['BF']
+  return 5.534 \
+         - 15.518 * so_pa \
+         + 8.648 * bb_pa \
+         - 2.298 * gb_pa \
+         + 9.146 * so_pa ** 2 \
+         - 27.252 * bb_pa ** 2 \
+         - 4.920 * gb_pa ** 2 \
+         - 4.036 * so_pa * bb_pa \
+         + 5.155 * so_pa * gb_pa \
+         + 4.546 * bb_pa * gb_pa
+
+def pitching_rates(table, pitchers, dates, window=None, season=False):
+  """
+  ERA, FIP and SIERA of each pitcher over their games before the row's date.
+  :param CumulativeStats table: running totals of the pitching gamelogs (see load_pitching_totals)
+  :param array pitchers: bref_id of each row's pitcher
+  :param array dates: date of each row
+  :param int window: only use the pitcher's last `window` games
+  :param bool season: only use the pitcher's games in the date's season
+  :return pandas.DataFrame: ERA, FIP and SIERA columns (NaN where the pitcher has no games to use). ERA is the
+    pitcher's running ERA as of their latest game, whatever the window.
+  """
+  sums, missing, games = table.sums(pitchers, dates, window=window, season=season)
+  rates = pd.DataFrame({'ERA': table.latest_values(pitchers, dates)['ERA'],
+                        'FIP': fip(sums),
+                        'SIERA': siera(sums)}, columns=['ERA', 'FIP', 'SIERA'])
+  # FIP counts a game with a missing BB, SO or HR as unknown, rather than skipping it
+  rates.loc[(missing[['BB', 'SO', 'HR']] > 0).any(axis=1).values, 'FIP'] = np.nan
+  rates.loc[games == 0] = np.nan
+  return rates
+
+@memoized
+def load_pitching_totals():
+  """
+  :return CumulativeStats: running totals of every pitcher's pitching gamelog
+  """
+  return CumulativeStats(load_gamelogs('pitching'), pitching_stats, last_value_columns=['ERA'])
+
+@memoized
+def load_batting_totals():
+  """
+  :return CumulativeStats: every batter's batting gamelog, for looking up their running averages
+  """
+  return CumulativeStats(load_gamelogs('batting'), [], last_value_columns=['BA', 'OPS', 'SLG'])
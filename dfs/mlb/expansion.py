@@ -1,18 +1,43 @@
-
+import os
 from argparse import ArgumentParser
 import pandas as pd, numpy as np
-from contexttimer import Timer
+from dfs import GLOBAL_ROOT
+from dfs.expansionstore import ExpansionStore
 from dfs.extdata.bsbr.gamelogs import load_gamelogs
-from dfs.extdata.numberfire.io import load_nf_histplayerinfo
+from dfs.extdata.bsbr.starters import load_starting_pitcher_index, starting_pitcher
+from dfs.mlb.cumulative import load_pitching_totals, load_batting_totals, pitching_rates
+from dfs.extdata.numberfire.io import load_nf_histplayerinfo, load_nf_table, lookup_nf_table
 from dfs.extdata.bsbr.park_effects import get_park_effects
-from dfs.extdata.sportsbookreview.sbrio import load_sbr_odds_info
-import progressbar
+from dfs.extdata.sportsbookreview.sbrio import load_sbr_odds_info, load_sbr_odds_table, lookup_sbr_odds, \
+  report_odds_coverage
+from dfs.featureengine import engine
+from dfs.parallel import debug_shell, in_worker
+from dfs.featureengine.registry import FeaturizerRegistry
 import warnings
 
 nf_info_cache = {}
-batting_gamelogs = load_gamelogs('batting')
-pitching_gamelogs = load_gamelogs('pitching')
-feature_generators = {'pitcher': {}, 'batter': {}}
+distinct_nf_players_expanded = set()
+
+def load_featurizer_data():
+  """
+  Load the gamelogs the featurizers read, before forking workers so that they all share the parent's copy.
+  """
+  load_gamelogs('batting')
+  load_gamelogs('pitching')
+  load_starting_pitcher_index()
+
+registries = {who: FeaturizerRegistry('mlb-' + who, player_column='player_id', name_separator=': ', row_results='list',
+                                      preload=load_featurizer_data, expanded_players=distinct_nf_players_expanded)
+              for who in ['pitcher', 'batter']}
+# Expanded rows kept between runs, one store for each registry since their featurizers share names
+expansion_stores = {who: ExpansionStore(os.path.join(GLOBAL_ROOT, 'db/mlb/expansion-%s.sqlite' % who),
+                                        key_columns=('player_id', 'Date'))
+                    for who in ['pitcher', 'batter']}
+feature_generators = {who: registry.generators for who, registry in registries.items()}
+frame_feature_generators = {who: registry.frame_generators for who, registry in registries.items()}
+
+def _registries(who):
+  return [registries['pitcher'], registries['batter']] if who == 'both' else [registries[who]]
 
 def featurizer(name=None, columns=None, who='pitcher', live=True):
   """
@@ -26,18 +51,28 @@ def featurizer(name=None, columns=None, who='pitcher', live=True):
   :return:
   """
   def decorated(func):
-    func_name = name or func.__name__
-    if who == 'pitcher' or who == 'both':
-      assert func_name not in feature_generators['pitcher']
-      feature_generators['pitcher'][func_name] = (func, columns, live)
-    if who == 'batter' or who == 'both':
-      assert func_name not in feature_generators['batter']
-      feature_generators['batter'][func_name] = (func, columns, live)
+    for registry in _registries(who):
+      registry.featurizer(name=name, output_columns=columns, live=live)(func)
+    return func
+  return decorated
+
+def frame_featurizer(name, who='pitcher'):
+  """
+  Decorator for the columnar version of a featurizer, which expands the whole DataFrame of gamelog rows at once.
+  The decorated function should take the DataFrame and return a DataFrame of the featurizer's columns, indexed like
+    the input; expand_mlb_data then uses it in place of the row featurizer with the same name.
+  :param name: name of the row featurizer this replaces
+  :param str who: is this a pitcher or batter featurizer?
+  :return:
+  """
+  def decorated(func):
+    for registry in _registries(who):
+      registry.frame_featurizer(name=name)(func)
     return func
   return decorated
 
 def encode_names(feature_name, columns):
-  return [feature_name + ': ' + col for col in columns]
+  return registries['pitcher'].encode_names(feature_name, columns)
 
 # We're already crediting them with bases per hit -- so reduce value of doubles, triples, & home runs.
 # Then we give them another 0.25 points per hit to offset the out penalty -- Fanduel charges 0.25 points per
@@ -62,7 +97,7 @@ def pitcher_fantasy_points_fzr(row):
 
 @featurizer(name="YTD", columns=['BA', 'OPS', 'SLG'], who='batter')
 def batter_ytd_stats(row):
-  batter_stats = batting_gamelogs.get(row['player_id'])
+  batter_stats = load_gamelogs('batting').get(row['player_id'])
   if batter_stats is not None:
     batter_stats = batter_stats[batter_stats.index < row['Date']]
     if len(batter_stats):
@@ -70,7 +105,11 @@ def batter_ytd_stats(row):
       return [last_stats['BA'], last_stats['OPS'], last_stats['SLG']]
   return []
 
-distinct_nf_players_expanded = set()
+@frame_featurizer(name="YTD", who='batter')
+def batter_ytd_frame_stats(data):
+  latest = load_batting_totals().latest_values(data['player_id'].values, data['Date'].values)
+  latest.index = data.index
+  return latest
 
 # Generate Numberfire predictions
 _nf_batter_columns = ['PA', 'AB', 'H', 'BB', '1B', '2B', '3B', 'HR', 'R', 'RBI', 'SB', 'HBP', 'SO', 'AVG', 'FP']
@@ -103,22 +142,28 @@ def batter_nf_stats(row):
   if not isinstance(bref_id, basestring):
     if isinstance(bref_id, float) and np.isnan(bref_id):  # No MLB ID for this player. We won't load numberfire stats.
       return []
-    print 'playerid not basestring'
-    import IPython
-    IPython.embed()
+    debug_shell('playerid not basestring: %r' % (bref_id,))
   nfdata = load_nf_info_cached(bref_id)
   if nfdata is not None and row['Date'] in nfdata.index:
     distinct_nf_players_expanded.add(bref_id)
     loaded_stats = nfdata.loc[row['Date'], _nf_batter_columns].values
     if not isinstance(loaded_stats, np.ndarray) or len(loaded_stats) > 15:
-      print 'Something is wrong loading numberfire data for (brefid=%s, date=%s)' % (bref_id, row['Date'])
-      import IPython
-      IPython.embed()
+      debug_shell('Something is wrong loading numberfire data for (brefid=%s, date=%s)' % (bref_id, row['Date']))
     loaded_stats = list(loaded_stats)
   else: # No data for this player on this date.
     loaded_stats = []
   return loaded_stats
 
+@frame_featurizer(name="NFBatter", who='batter')
+def batter_nf_frame_stats(data):
+  nfdata = load_nf_table('mlb', data['player_id'].dropna().unique(),
+                         required_columns=['1B', '2B', '3B', 'HR'] + [c for c in batter_scorer.index if c != 'H'])
+  nfdata['H'] = nfdata['1B'] + nfdata['2B'] + nfdata['3B'] + nfdata['HR']
+  nfdata['FP'] = nfdata[batter_scorer.index].dot(batter_scorer)
+  loaded_stats = lookup_nf_table(data, nfdata, 'player_id', 'Date', _nf_batter_columns)
+  distinct_nf_players_expanded.update(data['player_id'][loaded_stats.notnull().any(axis=1)])
+  return loaded_stats
+
 _nf_pitcher_columns = ['W', 'L', 'IP', 'BF', 'H', 'R', 'ER', 'HR', 'SO', 'BB', 'ERA', 'WHIP', 'FP']
 @featurizer(name="NFPitcher", columns=_nf_pitcher_columns, who='pitcher')
 def pitcher_nf_stats(row):
@@ -153,22 +198,19 @@ def pitcher_nf_stats(row):
     distinct_nf_players_expanded.add(bref_id)
     loaded_stats = nfdata.loc[row['Date'], _nf_pitcher_columns].values
     if not isinstance(loaded_stats, np.ndarray) or len(loaded_stats) > 13:
-      print 'Something is wrong loading numberfire data for (brefid=%s, date=%s)' % (bref_id, row['Date'])
-      import IPython
-      IPython.embed()
+      debug_shell('Something is wrong loading numberfire data for (brefid=%s, date=%s)' % (bref_id, row['Date']))
     loaded_stats = list(loaded_stats)
   else: # No data for this player on this date.
     loaded_stats = []
   return loaded_stats
 
-def _get_starting_pitcher(team, date):
-  # TODO(jgershen): handle the case here where we are predicting a game in the future!
-  # Need to get projected starters!
-  def lookup_pitcher(team, date):
-    for pitcher, df in pitching_gamelogs.iteritems():
-      if date in df.index and df.loc[date, 'Tm'] == team and df.loc[date, 'Entered'].strip().startswith('1'):
-        return pitcher
-  return lookup_pitcher(team, date)
+@frame_featurizer(name="NFPitcher", who='pitcher')
+def pitcher_nf_frame_stats(data):
+  nfdata = load_nf_table('mlb', data['player_id'].dropna().unique(), required_columns=pitcher_scorer.index)
+  nfdata['FP'] = nfdata[pitcher_scorer.index].dot(pitcher_scorer)
+  loaded_stats = lookup_nf_table(data, nfdata, 'player_id', 'Date', _nf_pitcher_columns)
+  distinct_nf_players_expanded.update(data['player_id'][loaded_stats.notnull().any(axis=1)])
+  return loaded_stats
 
 def _calc_siera(past_games):
   totals = past_games.sum()
@@ -194,13 +236,13 @@ def ytd_opp_pitcher(row):
   if 'OppStartingPitcher' not in row:
     # Get opposing pitcher
     opp_team = row['Opp']
-    opp_pitcher = _get_starting_pitcher(team=opp_team, date=row['Date'])
+    opp_pitcher = starting_pitcher(team=opp_team, date=row['Date'])
   else:
     opp_pitcher = row['OppStartingPitcher']
   if not opp_pitcher or (type(opp_pitcher) is float and np.isnan(opp_pitcher)):
     print 'no starting pitcher for this row', row
     return []
-  games = pitching_gamelogs.get(opp_pitcher)
+  games = load_gamelogs('pitching').get(opp_pitcher)
   if games is None:
     return []
   past_games = games[games.index < row['Date']]
@@ -212,9 +254,23 @@ def ytd_opp_pitcher(row):
   siera = _calc_siera(past_games)
   return [curr_era, fip, siera]
 
+def _opp_starting_pitchers(data):
+  if 'OppStartingPitcher' in data.columns:
+    return data['OppStartingPitcher']
+  return pd.Series([starting_pitcher(team=opp, date=date) for opp, date in zip(data['Opp'], data['Date'])],
+                   index=data.index)
+
+@frame_featurizer(name="OppPitcherYTD", who='batter')
+def ytd_opp_pitcher_frame(data):
+  opp_pitchers = _opp_starting_pitchers(data)
+  rates = pitching_rates(load_pitching_totals(), opp_pitchers.values, data['Date'].values)
+  rates.index = data.index
+  return rates
+
 @featurizer(name="PitcherYTD", columns=['ERA', 'FIP', 'SIERA'], who='pitcher')
 def ytd_pitcher(row):
   pitcher = row['player_id']
+  pitching_gamelogs = load_gamelogs('pitching')
   if pitcher not in pitching_gamelogs:
     return []
   games = pitching_gamelogs[pitcher]
@@ -231,6 +287,12 @@ def ytd_pitcher(row):
   siera = _calc_siera(past_games)
   return [curr_era, fip, siera]
 
+@frame_featurizer(name="PitcherYTD", who='pitcher')
+def ytd_pitcher_frame(data):
+  rates = pitching_rates(load_pitching_totals(), data['player_id'].values, data['Date'].values)
+  rates.index = data.index
+  return rates
+
 @featurizer(name="Park", columns=['PPA'], who='pitcher')
 def pitcher_adjustment(row):
   stadium = row['Opp'] if row["HomeAway"] == '@' else row['Tm']
@@ -243,6 +305,8 @@ def batter_adjustment(row):
   try:
     bpa, ppa = get_park_effects(stadium)
   except:
+    if in_worker():
+      raise
     print 'park effect stadium problem'
     import IPython
     IPython.embed()
@@ -269,48 +333,42 @@ def vegas_odds(row):
   retval = [odds['odds'], odds['runline']]
   return retval
 
+@frame_featurizer(name='Vegas', who='both')
+def vegas_frame_odds(data):
+  odds, missing_days = load_sbr_odds_table('mlb', data['Date'])
+  found, listed = lookup_sbr_odds(data, odds, 'Tm', 'Date', ['odds', 'runline'], game_by_hour=True)
+  report_odds_coverage('mlb', data, 'Date', missing_days, listed)
+  # The same defaults as vegas_odds where the team has no odds that day
+  found.loc[~listed, 'odds'] = 0.5
+  found.loc[~listed, 'runline'] = 8.5
+  return pd.DataFrame({'WinProb': found['odds'].values, 'RunLine': found['runline'].values}, index=data.index)
+
 def get_expansion_targets(pitcher=False, expanding_live=False):
-  for feature_name, (func, columns, live) in feature_generators['pitcher' if pitcher else 'batter'].iteritems():
-    if (expanding_live and live) or not expanding_live:
-      yield feature_name, (func, columns)
-
-def expand_mlb_data(infile_data, pitcher=False, live=False):
-  new_feature_dataframes = [infile_data]
-  expanded_columns = []
-  for feature_name, (func, columns) in get_expansion_targets(pitcher=pitcher, expanding_live=live):
-    with Timer() as t:
-      print 'Expanding', feature_name, '(' + ', '.join(columns) + ')...'
-      raw_data = [func(row) for index, row in infile_data.iterrows()]
-      raw_columns = encode_names(feature_name, columns)
-      expanded_columns += raw_columns
-      try:
-        new_feature_data = pd.DataFrame(raw_data,
-                                      index=infile_data.index,
-                                      columns=raw_columns)
-      except AssertionError as ex:
-        print 'Debugging assertion error -- probably no data for some featurizer was loaded. ' \
-              'I suspect Numberfire scraping needs to happen!'
-        import IPython
-        IPython.embed()
-      except TypeError as ex:
-        print 'Debugging type error'
-        import IPython
-        IPython.embed()
-
-      new_feature_dataframes.append(new_feature_data)
-    print '  took %d seconds' % t.elapsed
-  expanded_data = pd.concat(new_feature_dataframes, axis=1)
-  # After doing all of that concatenation the index is super weird so just reset it
-  expanded_data.reset_index(drop=True, inplace=True)
+  return registries['pitcher' if pitcher else 'batter'].targets(live=expanding_live)
+
+def expand_mlb_data(infile_data, pitcher=False, live=False, workers=1, use_store=False):
+  """
+  Run every featurizer over the input rows, and join on the new columns.
+  :param pd.DataFrame infile_data: dumped player stats
+  :param bool pitcher: expand using pitcher features, not batter features
+  :param bool live: only run the featurizers used for live data
+  :param int workers: run the row featurizers in this many processes (the output is the same however many)
+  :param bool use_store: take rows expanded before by the same featurizer versions from the expansion store, and
+    store the newly expanded ones
+  :return pd.DataFrame: expanded data
+  """
+  who = 'pitcher' if pitcher else 'batter'
+  registry = registries[who]
+  expanded_data = engine.expand(registry, infile_data, live=live, workers=workers,
+                                store=expansion_stores[who] if use_store else None)
+  expanded_columns = [col for feature_name, (func, columns) in registry.targets(live=live)
+                      for col in registry.encode_names(feature_name, columns)]
   # Transform categorical variables to indicator variables -- but only for expanded discrete columns.
-  # May need to tweak how this list is generated in the future.
-  categorical_cols = [c for c in expanded_columns if expanded_data[c].dtype.name == 'object']
-  expanded_discretized = pd.get_dummies(expanded_data, prefix_sep='=', columns=categorical_cols)
-  return expanded_discretized
+  return engine.discretize(expanded_data, expanded_columns)
 
-def expand_file_data(infile, outfile, pitcher):
+def expand_file_data(infile, outfile, pitcher, workers=1, use_store=False):
   infile_data = pd.read_pickle(infile)
-  outfile_data = expand_mlb_data(infile_data=infile_data, pitcher=pitcher)
+  outfile_data = expand_mlb_data(infile_data=infile_data, pitcher=pitcher, workers=workers, use_store=use_store)
   pd.to_pickle(outfile_data, outfile)
   return outfile_data
 
@@ -320,9 +378,15 @@ def expand_cli():
   p.add_argument("outfile", default="expanded.pickle", help="Expanded pickle file targets.")
   p.add_argument("--end-date", default=None, help="Max date to include data from.")
   p.add_argument("--pitcher", action='store_true', help="Expand using pitcher features, not batter features")
+  p.add_argument("--workers", type=int, default=1, help="Number of processes to expand with.")
+  p.add_argument("--use-store", action='store_true', help="Reuse (and save) rows from the expansion store.")
+  p.add_argument("--clear-store", action='store_true', help="Empty the expansion store first.")
   cfg = p.parse_args()
 
-  outfile_data = expand_file_data(cfg.infile, cfg.outfile, cfg.pitcher)
+  if cfg.clear_store:
+    expansion_stores['pitcher' if cfg.pitcher else 'batter'].clear()
+
+  outfile_data = expand_file_data(cfg.infile, cfg.outfile, cfg.pitcher, workers=cfg.workers, use_store=cfg.use_store)
 
   print 'Expansion statistics:'
   print '  Expanded %d rows total.' % len(outfile_data)
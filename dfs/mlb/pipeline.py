@@ -41,7 +41,7 @@ NFPitcher: FP
 
 global_na_strategy = 'drop'
 
-def run_pipeline(stage, modeldir, start_date, end_date, algorithm='ridge'):
+def run_pipeline(stage, modeldir, start_date, end_date, algorithm='ridge', workers=1):
   batter_dir = os.path.join(modeldir, 'batting')
   pitcher_dir = os.path.join(modeldir, 'pitching')
 
@@ -62,10 +62,12 @@ def run_pipeline(stage, modeldir, start_date, end_date, algorithm='ridge'):
   if stage == 'expand':
     expand_file_data(os.path.join(batter_dir, 'dumped.pickle'),
                      os.path.join(batter_dir, 'expanded.pickle'),
-                     pitcher=False)
+                     pitcher=False,
+                     workers=workers)
     expand_file_data(os.path.join(pitcher_dir, 'dumped.pickle'),
                      os.path.join(pitcher_dir, 'expanded.pickle'),
-                     pitcher=True)
+                     pitcher=True,
+                     workers=workers)
     stage = 'attrs'
   if stage == 'attrs':
     with open(os.path.join(batter_dir, 'attrs.txt'), 'w') as outf:
@@ -108,13 +110,15 @@ def run_pipeline_cli():
   p.add_argument("--start-date", default=None, help="Don't include data before this date.")
   p.add_argument("--end-date", default=None, help="Don't include data after this date.")
   p.add_argument("--algorithm", default='ridge', help="Type of model to use.")
+  p.add_argument("--workers", type=int, default=1, help="Number of processes to expand data with.")
   cfg = p.parse_args()
   print 'Running pipeline from stage ', cfg.stage
   run_pipeline(stage=cfg.stage,
                modeldir=cfg.modeldir,
                start_date=cfg.start_date,
                end_date=cfg.end_date,
-               algorithm=cfg.algorithm)
+               algorithm=cfg.algorithm,
+               workers=cfg.workers)
 
 live_stages = ['begin', 'dump', 'project', 'teamgen', 'finish']
 
@@ -1,26 +1,47 @@
 import warnings
 from fuzzywuzzy import process as fzmatch
 from dfs.extdata.crunchtime import load_latest_mapping
+from dfs.lazy import memoized
 
-mapping_df = load_latest_mapping()
-unset_index = mapping_df.reset_index()
-unset_index.fillna('', inplace=True)
-mapping_by_brefid = unset_index.set_index('bref_id')
-mapping_by_brefname = unset_index.set_index('bref_name')
-mapping_by_mlbname = unset_index.set_index('mlb_name')
-mapping_by_espnid = unset_index.set_index('espn_id')
+# The mapping table is loaded the first time it's needed, not at import
+get_mapping_df = memoized(load_latest_mapping)
 
-known_teams = set(mapping_by_mlbname['mlb_team'].values)
+@memoized
+def _unset_index():
+  unset_index = get_mapping_df().reset_index()
+  unset_index.fillna('', inplace=True)
+  return unset_index
+
+@memoized
+def get_mapping_by_brefid():
+  return _unset_index().set_index('bref_id')
+
+@memoized
+def get_mapping_by_brefname():
+  return _unset_index().set_index('bref_name')
+
+@memoized
+def get_mapping_by_mlbname():
+  return _unset_index().set_index('mlb_name')
+
+@memoized
+def get_mapping_by_espnid():
+  return _unset_index().set_index('espn_id')
+
+@memoized
+def get_known_teams():
+  return set(get_mapping_by_mlbname()['mlb_team'].values)
 
 def name2mlbid(player_name, player_team=None, get_confidence=False):
   """ Consolidate all fuzzy-matching name lookups into this function alone.
   :param str player_name: player name
   :return:
   """
+  mapping_by_mlbname = get_mapping_by_mlbname()
   if player_team is not None:
-    if player_team not in known_teams:
+    if player_team not in get_known_teams():
       warnings.warn("UNKNOWN TEAM %s" % player_team)
-      warnings.warn('known teams are %s' % ','.join(set(mapping_by_mlbname['mlb_team'].values)))
+      warnings.warn('known teams are %s' % ','.join(get_known_teams()))
     usable_mapping = mapping_by_mlbname[mapping_by_mlbname['mlb_team'] == player_team]
   else:
     usable_mapping = mapping_by_mlbname
@@ -36,7 +57,7 @@ def name2mlbid(player_name, player_team=None, get_confidence=False):
 def name2brefid(player_name, player_team=None):
   # consider calling this 'lookupbyname' and asking for what you want back?
   mlb_id = name2mlbid(player_name, player_team)
-  return mapping_df.loc[mlb_id, 'bref_id']
+  return get_mapping_df().loc[mlb_id, 'bref_id']
 
 def name2brefid_confidence(player_name, player_team=None):
   # Get the confidence of a match
@@ -44,29 +65,29 @@ def name2brefid_confidence(player_name, player_team=None):
 
 def name2position(player_name):
   mlb_id = name2mlbid(player_name)
-  return mapping_df.loc[mlb_id, 'mlb_pos']
+  return get_mapping_df().loc[mlb_id, 'mlb_pos']
 
 def brefid_is_pitcher(bref_id):
-  return mapping_by_brefid.loc[bref_id, 'mlb_pos'] == 'P'
+  return get_mapping_by_brefid().loc[bref_id, 'mlb_pos'] == 'P'
 
 def brefid_is_starting_pitcher(bref_id):
-  return mapping_by_brefid.loc[bref_id, 'espn_pos'] == 'SP'
+  return get_mapping_by_brefid().loc[bref_id, 'espn_pos'] == 'SP'
 
 def espnid2mlbid(pid):
   try:
-    return mapping_by_espnid.loc[pid, 'mlb_id']
+    return get_mapping_by_espnid().loc[pid, 'mlb_id']
   except KeyError:
     return None
 
 def brefid2mlbid(bref_id):
   try:
-    return mapping_by_brefid.loc[bref_id, 'mlb_id']
+    return get_mapping_by_brefid().loc[bref_id, 'mlb_id']
   except KeyError:
     return None
 
 def mlbid2brefid(mlb_id):
   try:
-    return mapping_df.loc[mlb_id, 'bref_id']
+    return get_mapping_df().loc[mlb_id, 'bref_id']
   except KeyError:
     return None
 
@@ -82,4 +103,4 @@ def players_equal(name1, name2, team1=None, team2=None):
   return name2mlbid(name1) == name2mlbid(name2)
 
 def get_all_playerids():
-  return mapping_df['bref_id'].values
\ No newline at end of file
+  return get_mapping_df()['bref_id'].values
\ No newline at end of file
@@ -4,10 +4,11 @@ Predict values (using a pre-built model) for a game which has not yet taken plac
 from argparse import ArgumentParser
 from dfs.extdata.rotoguru import rgio
 from dfs.extdata.nbc.starting_pitcher import get_nbc_starting_pitchers
+from dfs.extdata.bsbr.starters import starting_pitcher
 from dfs.mlb.expansion import expand_mlb_data
 from dateutil import parser
 import datetime
-from .playerid import mapping_df, name2brefid, name2brefid_confidence
+from .playerid import name2brefid, name2brefid_confidence
 from dfs.fanduel2.io import read_day_mlb_csv, read_lineup_csv, read_mlb_player_csv, get_available_game_ids
 from .attrs import read_attrs
 import pandas as pd, numpy as np
@@ -53,6 +54,11 @@ fdteam2mlbteam = {
 def estimate_starting_pitchers(game_day, fd_data):
   sps = {}
   teams = set(fd_data['Tm'].values)
+  if game_day.date() < datetime.date.today():
+    # The game has been played, so the gamelogs know who actually started
+    historical_sps = {team: starting_pitcher(team, game_day) for team in teams}
+    if all(historical_sps.values()):
+      return historical_sps
   nbc_starts = get_nbc_starting_pitchers(game_day)
   for team in teams:
     if team in nbc_starts.index:
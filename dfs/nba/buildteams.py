@@ -1,12 +1,18 @@
 from __future__ import print_function
 from argparse import ArgumentParser
+import datetime
 import pandas as pd, numpy as np
-
-from collections import Counter
+from dateutil.parser import parse
 
 from dfs.nba.playerid import id2name
-from dfs.knapsack.knapsack import solve_all
-from dfs.knapsack.heuristics import best_vorp
+from dfs.knapsack.bnb import solve_constrained
+from dfs.knapsack.kbest import solve_k_best
+from dfs.knapsack.dominance import prune_dominated as prune_dominated_players
+from dfs.knapsack.portfolio import solve_portfolio
+from dfs.knapsack.session import OptimizerSession
+from dfs.knapsack.knapsack import NotSolvableError
+from dfs.sim.montecarlo import fit_residual_model, draw_outcomes, lineup_matrix, rank_lineups
+from dfs.sim.history import nba_player_games
 
 MAX_PLAYERS_PER_TEAM = 3
 
@@ -14,15 +20,11 @@ import IPython
 
 positions = {'PG': 2, 'SG': 2, 'SF': 2, 'PF': 2, 'C': 1}
 
-def build_team(datafile, salary_col, position_col, prediction_col, cap=60000, legal_teams=None):
+def _load_candidates(datafile, salary_col, position_col, prediction_col, legal_teams=None, prune_dominated=True):
   """
-  Construct teams from a set of prediction data
-  :param str datafile: saved prediction data (pickle file)
-  :param str salary_col: name of salary column
-  :param str position_col: name of position column
-  :param str prediction_col: name of prediction column to use
-  :param list[str] legal_teams: an optional list of legal NBA teams for the game
-  :return pd.DataFrame: prediction data for chosen team
+  Load prediction data and clean it up into candidate players for the solvers
+  :param bool prune_dominated: drop players who can't be in the single best team
+  :return pd.DataFrame: candidate players, indexed by bref_id
   """
   player_data = pd.read_pickle(datafile)
   # Load real names for later use
@@ -36,55 +38,203 @@ def build_team(datafile, salary_col, position_col, prediction_col, cap=60000, le
   # Cast player cost column to integers; this will also break the solver! :)
   player_data[salary_col] = player_data[salary_col].astype(int)
 
-  # an optimization: speed up computation by only keeping the best-projected two players at each (position, salary).
-  # this should mean we only keep players we could potentially use
-  # it is hypothetically true that this could burn us if we get hit by the "too many players from team X" consideration
-  #grouped_player_data = player_data.groupby([salary_col, position_col], sort=False)
-  # this actually figures out how many players we need at the given position and keeps only that many at each salary level
-  #candidates = grouped_player_data.apply(lambda group: group.sort(prediction_col).tail(positions[group[position_col].iloc[0]]))
-  #
-
-  # more detailed, even more aggressive sketchier optimization: remove all players which are strictly worse than others
-  # (all players for whom two players are better and at least as cheap -- or one for centers. I hard coded that to save time)
-  # this could burn us pretty hard if we run into a team constraint in the end
-  def dominators(row):
-    return len(player_data[(player_data['predicted'] > row['predicted'])
-                           & (player_data['salary'] <= row['salary'])
-                           & (player_data['pos'] == row['pos'])])
-  player_data['dominators'] = player_data.apply(dominators, axis=1)
-  candidates = player_data[(player_data['dominators'] == 0) |
-                           ((player_data['pos'] != 'C') & (player_data['dominators'] <= 1))]
-  candidates.set_index('bref_id', inplace=True)
-
-  while True:   # because python doesn't have do... while
-    best_team = best_vorp(data=candidates,
-                          cost_column=salary_col,
-                          value_column=prediction_col,
-                          type_column=position_col,
-                          required_types=positions,
-                          cap=cap,
-                          debug_print_fn=print)
-    # Implement an additional constraint -- we can't have more than 4 players from the same team.
-    # We'll actually be a little stricter and try to restrict it at 3 (see MAX_PLAYERS_PER_TEAM).
-    teams_of_selection = Counter(candidates.loc[best_team, 'Tm'].values)
-    most_common_team, count = teams_of_selection.popitem()
-    if count <= MAX_PLAYERS_PER_TEAM:
-      return candidates.loc[best_team]
-    else:
-      # Nope, this is an illegal team. Try to help us generate a real one by dropping the lowest-valued player
-      # on the team from the list of possible candidates.
-      players_on_most_common_team = [c for c in best_team if candidates.loc[c, 'Tm'] == most_common_team]
-      team_players = candidates.loc[players_on_most_common_team].copy()
-      team_players['value'] = team_players[prediction_col].divide(team_players[salary_col])
-      team_players.sort('value', inplace=True)
-      worst_player = team_players.iloc[0].name
-      print('Ideal team had %d players from %s. Banning player: %s' % (count, most_common_team, worst_player))
-      candidates = candidates.drop([worst_player])
-
-def genteam_to_file(outfile, datafile, salary_col, position_col, prediction_col, cap=60000, legal_teams=None):
-  best_team = build_team(datafile, salary_col, position_col, prediction_col, cap, legal_teams)
+  # Drop players who can't be in the best team: at least as many players at their position are better and no more
+  # expensive as we have slots there. Only same-team players count as better, so the team limit can't burn us.
+  if prune_dominated:
+    candidates = prune_dominated_players(player_data, salary_col, prediction_col, position_col, positions,
+                                         group_column='Tm', max_per_group=MAX_PLAYERS_PER_TEAM)
+  else:
+    candidates = player_data
+  return candidates.set_index('bref_id')
+
+def build_team(datafile, salary_col, position_col, prediction_col, cap=60000, legal_teams=None, time_budget=None):
+  """
+  Construct teams from a set of prediction data
+  :param str datafile: saved prediction data (pickle file)
+  :param str salary_col: name of salary column
+  :param str position_col: name of position column
+  :param str prediction_col: name of prediction column to use
+  :param list[str] legal_teams: an optional list of legal NBA teams for the game
+  :param float time_budget: if set, run the solver portfolio and take the best team it has after this many seconds
+  :return pd.DataFrame: prediction data for chosen team
+  """
+  candidates = _load_candidates(datafile, salary_col, position_col, prediction_col, legal_teams)
+
+  # We can't have more than 4 players from the same team. We'll actually be a little stricter and try to restrict
+  # it at 3 (see MAX_PLAYERS_PER_TEAM). The branch-and-bound solver handles this directly.
+  if time_budget is not None:
+    best_team, gap = solve_portfolio(data=candidates,
+                                     cost_column=salary_col,
+                                     value_column=prediction_col,
+                                     type_column=position_col,
+                                     required_types=positions,
+                                     cap=cap,
+                                     time_budget=time_budget,
+                                     group_column='Tm',
+                                     max_per_group=MAX_PLAYERS_PER_TEAM,
+                                     debug_print_fn=print)
+    print('(within %.2f of the best possible team)' % gap)
+    return candidates.loc[best_team]
+  best_team = solve_constrained(data=candidates,
+                                cost_column=salary_col,
+                                value_column=prediction_col,
+                                type_column=position_col,
+                                required_types=positions,
+                                cap=cap,
+                                group_column='Tm',
+                                max_per_group=MAX_PLAYERS_PER_TEAM,
+                                debug_print_fn=print)
+  return candidates.loc[best_team]
+
+def build_lineups(datafile, salary_col, position_col, prediction_col, num_lineups, min_unique=1, cap=60000,
+                  legal_teams=None):
+  """
+  Construct the best several distinct teams from a set of prediction data, for entering multiple contests
+  :param int num_lineups: how many teams to build
+  :param int min_unique: every pair of teams must differ by at least this many players
+  (other params as for build_team)
+  :return pd.DataFrame: prediction data for chosen teams, with a 'lineup' column numbering the teams from best to worst
+  """
+  # The dominated-player shortcut only holds for the single best team, so keep everyone
+  candidates = _load_candidates(datafile, salary_col, position_col, prediction_col, legal_teams,
+                                prune_dominated=False)
+  lineups = solve_k_best(data=candidates,
+                         cost_column=salary_col,
+                         value_column=prediction_col,
+                         type_column=position_col,
+                         required_types=positions,
+                         cap=cap,
+                         k=num_lineups,
+                         min_unique=min_unique,
+                         group_column='Tm',
+                         max_per_group=MAX_PLAYERS_PER_TEAM)
+  teams = []
+  for lineup_number, lineup in enumerate(lineups):
+    team = candidates.loc[lineup].copy()
+    team['lineup'] = lineup_number
+    teams.append(team)
+  return pd.concat(teams)
+
+def genteam_to_file(outfile, datafile, salary_col, position_col, prediction_col, cap=60000, legal_teams=None,
+                    num_lineups=1, min_unique=1, time_budget=None):
+  if num_lineups > 1:
+    best_team = build_lineups(datafile, salary_col, position_col, prediction_col, num_lineups, min_unique, cap,
+                              legal_teams)
+  else:
+    best_team = build_team(datafile, salary_col, position_col, prediction_col, cap, legal_teams, time_budget)
   best_team.to_pickle(outfile)
 
+def get_locked_teams(schedule_file, as_of=None):
+  """
+  Find the teams whose games have started
+  :param str schedule_file: CSV of game start times, one row per team, with 'Tm' and 'start' columns
+  :param datetime.datetime as_of: time to check against (default: now)
+  :return list[str]: teams whose players are locked
+  """
+  schedule = pd.read_csv(schedule_file, parse_dates=['start'])
+  if as_of is None:
+    as_of = datetime.datetime.now()
+  return list(schedule.loc[schedule['start'] <= as_of, 'Tm'])
+
+def late_swap(teams_file, datafile, salary_col, position_col, prediction_col, locked_teams, cap=60000):
+  """
+  Re-optimize already submitted teams once some games have started: players in those games can't be swapped in or out,
+  but every other slot can be refilled using refreshed predictions. A team whose locked players alone are over the cap
+  is an error.
+  :param str teams_file: submitted teams, as saved by genteam_to_file
+  :param str datafile: refreshed prediction data (pickle file)
+  :param list[str] locked_teams: NBA teams whose games have started
+  (other params as for build_team)
+  :return pd.DataFrame: prediction data for the new teams, in the same shape as teams_file
+  """
+  submitted = pd.read_pickle(teams_file)
+  has_lineups = 'lineup' in submitted.columns
+  if not has_lineups:
+    submitted = submitted.assign(lineup=0)
+  candidates = _load_candidates(datafile, salary_col, position_col, prediction_col, prune_dominated=False)
+
+  # Submitted players in started games stay put, even if the refreshed data has dropped them. Nobody else from those
+  # games can come in.
+  locked_ids = set(submitted.index[submitted['Tm'].isin(locked_teams)])
+  unique_submitted = submitted[~submitted.index.duplicated()].drop('lineup', axis=1)
+  dropped = unique_submitted.loc[[pid for pid in locked_ids if pid not in candidates.index]]
+  pool = pd.concat([candidates[~candidates['Tm'].isin(locked_teams) | candidates.index.isin(locked_ids)], dropped])
+
+  # One session serves every team: swapping a team's locks in and out only reworks the positions they play
+  session = OptimizerSession(pool, salary_col, prediction_col, position_col, positions, cap,
+                             group_column='Tm', max_per_group=MAX_PLAYERS_PER_TEAM)
+  teams = []
+  for lineup_number, team in submitted.groupby('lineup'):
+    mine = [pid for pid in team.index if pid in locked_ids]
+    others = [pid for pid in locked_ids if pid not in mine]
+    # No swap can fix a team whose locked players are already over the cap
+    locked_salary = pool.loc[mine, salary_col].sum()
+    if locked_salary > cap:
+      raise ValueError('Locked players in lineup %d cost %d, over the cap of %d' % (lineup_number, locked_salary, cap))
+    for pid in others:
+      session.remove_player(pid)
+    for pid in mine:
+      session.lock_player(pid)
+    try:
+      new_team = pool.loc[session.solve()].copy()
+    except NotSolvableError:
+      print('No legal swaps for lineup %d; keeping it as submitted' % lineup_number)
+      new_team = team.drop('lineup', axis=1)
+    for pid in mine:
+      session.unlock_player(pid)
+    for pid in others:
+      session.restore_player(pid)
+    print('Lineup %d: out %s, in %s; predicted total %.1f' % (lineup_number,
+                                                             sorted(set(team.index) - set(new_team.index)),
+                                                             sorted(set(new_team.index) - set(team.index)),
+                                                             new_team[prediction_col].sum()))
+    new_team['lineup'] = lineup_number
+    teams.append(new_team)
+  teams = pd.concat(teams)
+  return teams if has_lineups else teams.drop('lineup', axis=1)
+
+def late_swap_to_file(outfile, *args, **kwargs):
+  late_swap(*args, **kwargs).to_pickle(outfile)
+
+def rank_by_simulation(teams_file, prediction_col, n_sims=100000, cash_line=None, percentile=None, seed=None):
+  """
+  Rank built teams by simulating the slate: by chance of beating cash_line (50/50s), or by a high percentile of their
+  score (tournaments), or by mean simulated score if neither is given.
+  :param str teams_file: teams with a 'lineup' column, as saved by genteam_to_file
+  :param str prediction_col: name of predicted column
+  :param int n_sims: number of simulated slates
+  :param float cash_line: points needed to cash
+  :param float percentile: percentile of each team's simulated scores to rank by (e.g. 90)
+  :param int seed: random seed
+  :return pd.DataFrame: the teams, renumbered best first, with the simulation results as extra columns
+  """
+  teams = pd.read_pickle(teams_file)
+  # Opponents are what correlate players across teams in the simulation, and the teams file may predate them
+  missing = [column for column in ['Tm', 'Opp', prediction_col] if column not in teams.columns]
+  if missing:
+    raise ValueError("Can't simulate teams from %s: no %s column" % (teams_file, ', '.join(missing)))
+  if 'lineup' not in teams.columns:
+    teams = teams.assign(lineup=0)
+  players = teams[~teams.index.duplicated()]
+  model = fit_residual_model(nba_player_games(), 'bref_id', 'FP')
+  print('Residual sd %.2f, teammate correlation %.3f, opponent correlation %.3f' % (model.league_sd,
+                                                                                 model.teammate_corr,
+                                                                                 model.opponent_corr))
+  outcomes = draw_outcomes(model, list(players.index), players[prediction_col].values, list(players['Tm']),
+                           list(players['Opp']), n_sims=n_sims, seed=seed)
+  lineup_numbers, lineups = zip(*[(number, list(team.index)) for number, team in teams.groupby('lineup')])
+  ranking = rank_lineups(lineup_matrix(lineups, list(players.index)), outcomes, cash_line, percentile)
+  ranking.index = np.asarray(lineup_numbers)[ranking.index]
+  ranked = []
+  for rank, (lineup_number, stats) in enumerate(ranking.iterrows()):
+    team = teams[teams['lineup'] == lineup_number].copy()
+    for column, value in stats.iteritems():
+      team['sim_' + column] = value
+    team['lineup'] = rank
+    ranked.append(team)
+  print(ranking)
+  return pd.concat(ranked)
+
 def build_teams_cli():
   p = ArgumentParser()
   p.add_argument("data", help="pickled dataframe containing players positions, salaries, and predictions")
@@ -92,8 +242,12 @@ def build_teams_cli():
   p.add_argument("--salary", default="salary", help="name of salary column")
   p.add_argument("--position", default="pos", help="name of position column")
   p.add_argument("--prediction", default="predicted", help="name of predicted column")
-  p.add_argument("--cap", default=60000, help="salary cap amount")
+  p.add_argument("--cap", type=int, default=60000, help="salary cap amount")
   p.add_argument("--teams", default=None, nargs='+', help="legal NBA teams for game")
+  p.add_argument("--num-lineups", type=int, default=1, help="how many distinct teams to build")
+  p.add_argument("--min-unique", type=int, default=1, help="min number of players by which any two teams differ")
+  p.add_argument("--time-budget", type=float, default=None,
+                 help="seconds to spend on the team, taking the best found by then instead of the optimum")
   cfg = p.parse_args()
 
   genteam_to_file(outfile=cfg.outfile,
@@ -102,5 +256,55 @@ def build_teams_cli():
                   position_col=cfg.position,
                   prediction_col=cfg.prediction,
                   cap=cfg.cap,
-                  legal_teams=cfg.teams)
+                  legal_teams=cfg.teams,
+                  num_lineups=cfg.num_lineups,
+                  min_unique=cfg.min_unique,
+                  time_budget=cfg.time_budget)
+
+
+def late_swap_cli():
+  p = ArgumentParser()
+  p.add_argument("teams", help="pickled dataframe of the submitted teams (e.g. teams.pickle from the live pipeline)")
+  p.add_argument("data", help="pickled dataframe containing refreshed players positions, salaries, and predictions")
+  p.add_argument("outfile", help="output: pickled dataframe containing information for the swapped teams")
+  p.add_argument("--locked-teams", default=[], nargs='+', help="NBA teams whose games have started")
+  p.add_argument("--schedule", default=None,
+                 help="CSV of game start times ('Tm' and 'start' columns); teams that have started are locked too")
+  p.add_argument("--as-of", default=None, help="time to check the schedule against (default: now)")
+  p.add_argument("--salary", default="salary", help="name of salary column")
+  p.add_argument("--position", default="pos", help="name of position column")
+  p.add_argument("--prediction", default="predicted", help="name of predicted column")
+  p.add_argument("--cap", type=int, default=60000, help="salary cap amount")
+  cfg = p.parse_args()
+
+  locked_teams = list(cfg.locked_teams)
+  if cfg.schedule:
+    locked_teams += get_locked_teams(cfg.schedule, parse(cfg.as_of) if cfg.as_of else None)
+  print('Locked teams:', ', '.join(sorted(set(locked_teams))))
+  late_swap_to_file(outfile=cfg.outfile,
+                    teams_file=cfg.teams,
+                    datafile=cfg.data,
+                    salary_col=cfg.salary,
+                    position_col=cfg.position,
+                    prediction_col=cfg.prediction,
+                    locked_teams=locked_teams,
+                    cap=cfg.cap)
+
+def rank_teams_cli():
+  p = ArgumentParser()
+  p.add_argument("teams", help="pickled dataframe of built teams (e.g. from pl-nba-teamgen --num-lineups)")
+  p.add_argument("outfile", help="output: pickled dataframe of the teams, renumbered from best to worst")
+  p.add_argument("--prediction", default="predicted", help="name of predicted column")
+  p.add_argument("--sims", type=int, default=100000, help="number of simulated slates")
+  p.add_argument("--cash-line", type=float, default=None, help="points needed to cash (rank 50/50 teams by it)")
+  p.add_argument("--percentile", type=float, default=None,
+                 help="rank tournament teams by this percentile of their simulated scores")
+  p.add_argument("--seed", type=int, default=None, help="random seed")
+  cfg = p.parse_args()
 
+  rank_by_simulation(teams_file=cfg.teams,
+                     prediction_col=cfg.prediction,
+                     n_sims=cfg.sims,
+                     cash_line=cfg.cash_line,
+                     percentile=cfg.percentile,
+                     seed=cfg.seed).to_pickle(cfg.outfile)
@@ -47,7 +47,7 @@ def dump_nba_data(outfile, start_date=None, end_date=None, max_count=None, use_r
       kept_indices = random.sample(all_game_rows.index, max_count)
       selected = all_game_rows.loc[kept_indices]
     else:
-      all_game_rows.sort("date")
+      all_game_rows = all_game_rows.sort("date", kind='mergesort')
       selected = all_game_rows.tail(max_count)
   else:
     selected = all_game_rows
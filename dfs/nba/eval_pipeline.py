@@ -10,14 +10,13 @@ from dfs.nba.featurizers import fantasy_points_fzr
 
 from dfs.nba.pipeline import run_pipeline, run_live_postmodel_pipeline
 
-gamedata = load_gamelogs()
-
 import IPython
 
 def eval_historical_teamgen(game_day, team_file):
   # how well did that team actually do
   team = pd.read_pickle(team_file)
   team['date'] = pd.Series(game_day, index=team.index)
+  gamedata = load_gamelogs()
   team['actual'] = team.apply(lambda row: fantasy_points_fzr(gamedata[row.name].loc[game_day]), axis=1)
   print team[['pos', 'salary', 'predicted', 'actual']]
   print team['predicted'].sum(), team['actual'].sum()
@@ -58,10 +57,9 @@ def run_all_days(root_dir):
       outf.write('%s,%.1f,%.1f\n' % (day,pred,actual))
       print '%10s %.1f %.1f' % (day, pred, actual)
 
+if __name__ == '__main__':
+  p = ArgumentParser()
+  p.add_argument("rootdir", help="root directory")
+  cfg = p.parse_args()
 
-
-p = ArgumentParser()
-p.add_argument("rootdir", help="root directory")
-cfg = p.parse_args()
-
-run_all_days(root_dir=cfg.rootdir)
\ No newline at end of file
+  run_all_days(root_dir=cfg.rootdir)
\ No newline at end of file
@@ -1,66 +1,85 @@
 
+import os
 from argparse import ArgumentParser
-import pandas as pd, numpy as np
-from contexttimer import Timer
+import pandas as pd
 
-from .featurizers import feature_generators, distinct_nf_players_expanded
+from dfs import GLOBAL_ROOT
+from dfs.expansionstore import ExpansionStore
+from dfs.featureengine import engine
+from .attrs import read_attrs
+from .featurestore import stored_features
+from .featurizers import registry, feature_generators, distinct_nf_players_expanded, feature_cache
 
 import logging
-import progressbar
-import warnings
-import IPython
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.FileHandler('./pipeline.log'))
 logger.setLevel(logging.DEBUG)
 
-def get_expansion_targets(expanding_live=False):
-  for feature_name, (func, columns, live) in feature_generators.iteritems():
-    if (expanding_live and live) or not expanding_live:
-      yield feature_name, (func, columns)
+# Expanded rows kept between runs, so that expanding overlapping data only computes the new rows
+expansion_store = ExpansionStore(os.path.join(GLOBAL_ROOT, 'expansionstore.sqlite'))
+
+def get_expansion_targets(expanding_live=False, featurizers=None):
+  return registry.targets(live=expanding_live, featurizers=featurizers)
+
+def featurizers_for_attrs(attrs):
+  """
+  Work out which featurizers we need to expand to get the given attributes.
+  :param list[str] attrs: attribute names as in attrs.txt, 'Featurizer:column' (or 'Featurizer:column=value' for
+    discretized columns). Attributes without a featurizer name are dumped columns and need no featurizer.
+  :return set[str]: names of the featurizers producing those attributes, plus the featurizers they require
+  """
+  return registry.featurizers_for_attrs(attrs)
 
 def encode_names(feature_name, columns):
-  return {col: (feature_name + ':' + col) for col in columns}
-
-def expand_nba_data(infile_data, live=False):
-  new_feature_dataframes = [infile_data]
-  for feature_name, (func, columns) in get_expansion_targets(expanding_live=live):
-    with Timer() as t:
-      logger.info('Expanding %s (provides: %s)...', feature_name, ','.join(columns))
-      # Apply featurizer to each row
-      try:
-        raw_series = [func(row) for index, row in infile_data.iterrows()]
-      except Exception as ex:
-        print 'Exception raised while expanding %s on' % feature_name, row
-        raise ex
-        IPython.embed()
-      # Generate DataFrame by combining Series results of featurizer
-      new_feature_data = pd.DataFrame(raw_series,
-                                      index=infile_data.index)
-      # Rename columns of new DataFrame to have full name of featurizer+data
-      column_renaming_dict = encode_names(feature_name, columns)
-      new_feature_data.rename(columns=column_renaming_dict, inplace=True)
-      # and store result of this featurizer
-      new_feature_dataframes.append(new_feature_data)
-    logger.info('  took %d seconds', t.elapsed)
-  # Stitch the expanded data together onto the input (dataframe of games played)
-  expanded_data = pd.concat(new_feature_dataframes, axis=1)
-  # After doing all that concatenation the index is super weird so just reset / nuke it
-  expanded_data.reset_index(drop=True, inplace=True)
-  return expanded_data
+  return dict(zip(columns, registry.encode_names(feature_name, columns)))
+
+def expansion_plan(infile_data, live=False, attrs=None, use_store=False, use_feature_store=False):
+  """
+  Work out what expand_nba_data would run, without running it.
+  :param pd.DataFrame infile_data: dumped player stats
+  :param bool live: only run the featurizers used for live data
+  :param list[str] attrs: only run the featurizers needed for these attributes
+  :param bool use_store: leave out rows already in the expansion store
+  :param bool use_feature_store: read the featurizers the feature store holds from it
+  :return pd.DataFrame: one row for each featurizer that would run: whether it expands every row at once ('frame'),
+    row by row ('row') or is read from the feature store ('store'), and how many rows it would compute (for cached
+    featurizers, the rows not cached yet; for the feature store, the rows not materialized yet)
+  """
+  featurizers = featurizers_for_attrs(attrs) if attrs is not None else None
+  return engine.expansion_plan(registry, infile_data, live=live, featurizers=featurizers,
+                               store=expansion_store if use_store else None,
+                               feature_source=stored_features if use_feature_store else None)
+
+def expand_nba_data(infile_data, live=False, workers=1, attrs=None, use_store=False, use_feature_store=False):
+  """
+  Run the featurizers over the input rows, and join on the new columns.
+  :param pd.DataFrame infile_data: dumped player stats
+  :param bool live: only run the featurizers used for live data
+  :param int workers: run the row featurizers in this many processes (the output is the same however many)
+  :param list[str] attrs: only run the featurizers needed for these attributes (by default, run every featurizer)
+  :param bool use_store: take rows expanded before by the same featurizer versions from the expansion store, and
+    store the newly expanded ones
+  :param bool use_feature_store: read the featurizers the point-in-time feature store holds from it (materializing
+    any rows it doesn't have yet) instead of expanding them
+  :return pd.DataFrame: expanded data
+  """
+  featurizers = None
+  if attrs is not None:
+    featurizers = featurizers_for_attrs(attrs)
+    logger.info('Expanding only the featurizers needed for the attributes: %s', ','.join(sorted(featurizers)))
+  return engine.expand(registry, infile_data, live=live, workers=workers, featurizers=featurizers,
+                       store=expansion_store if use_store else None,
+                       feature_source=stored_features if use_feature_store else None)
 
 def discretize_data(expanded_data):
-  # Transform categorical variables to indicator variables -- but only for expanded discrete columns.
-  # May need to tweak how this list is generated in the future.
-  categorical_cols = [c for c in expanded_data.columns if expanded_data[c].dtype.name == 'object']
   # Only discretize *expanded* columns! Stuff like player age or bref_id shouldn't be expanded
-  categorical_expanded_cols = filter(lambda col: ':' in col, categorical_cols)
-  expanded_discretized = pd.get_dummies(expanded_data, prefix_sep='=', columns=categorical_expanded_cols)
-  return expanded_discretized
+  return engine.discretize(expanded_data, [col for col in expanded_data.columns if registry.name_separator in col])
 
-def expand_file_data(infile, outfile, live=False):
+def expand_file_data(infile, outfile, live=False, workers=1, attrs=None, use_store=False, use_feature_store=False):
   infile_data = pd.read_pickle(infile)
-  expanded = expand_nba_data(infile_data=infile_data, live=live)
+  expanded = expand_nba_data(infile_data=infile_data, live=live, workers=workers, attrs=attrs, use_store=use_store,
+                             use_feature_store=use_feature_store)
   discretized = discretize_data(expanded)
   pd.to_pickle(discretized, outfile)
   return discretized
@@ -70,11 +89,32 @@ def expand_cli():
   p.add_argument("infile", default="dumped.pickle", help="Dumped player stats data.")
   p.add_argument("outfile", default="expanded.pickle", help="Expanded pickle file targets.")
   p.add_argument("--live", action='store_true', help="Use live expansion mode.")
+  p.add_argument("--workers", type=int, default=1, help="Number of processes to expand with.")
+  p.add_argument("--attrs", default=None, help="Only expand the featurizers needed for the attributes in this file.")
+  p.add_argument("--dry-run", action='store_true', help="Just report which featurizers would run, and their cost.")
+  p.add_argument("--use-store", action='store_true', help="Reuse (and save) rows from the expansion store.")
+  p.add_argument("--clear-store", action='store_true', help="Empty the expansion store first.")
+  p.add_argument("--use-feature-store", action='store_true', help="Read features from the point-in-time feature store.")
   cfg = p.parse_args()
+  attrs = read_attrs(cfg.attrs) if cfg.attrs else None
+
+  if cfg.clear_store:
+    expansion_store.clear()
+
+  if cfg.dry_run:
+    plan = expansion_plan(pd.read_pickle(cfg.infile), live=cfg.live, attrs=attrs, use_store=cfg.use_store,
+                          use_feature_store=cfg.use_feature_store)
+    print 'Featurizers to expand (rows computed excludes rows already cached or stored):'
+    print plan
+    print 'Skipped:', ', '.join(sorted(set(feature_generators) - set(plan.index))) or 'none'
+    return
 
-  outfile_data = expand_file_data(cfg.infile, cfg.outfile, live = cfg.live)
+  outfile_data = expand_file_data(cfg.infile, cfg.outfile, live = cfg.live, workers=cfg.workers, attrs=attrs,
+                                  use_store=cfg.use_store, use_feature_store=cfg.use_feature_store)
 
   print 'Expansion statistics:'
   print '  Expanded %d rows total.' % len(outfile_data)
   print '  Total features (attrvals) including targets:', len(outfile_data.columns)
-  print '  Expanded Numberfire data for', len(distinct_nf_players_expanded), 'players.'
\ No newline at end of file
+  print '  Expanded Numberfire data for', len(distinct_nf_players_expanded), 'players.'
+  print '  Featurizer cache:'
+  print feature_cache.report()
\ No newline at end of file
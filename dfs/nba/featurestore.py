@@ -0,0 +1,56 @@
+'''
+Point-in-time NBA features, shared by training and live scoring.
+
+Every cached featurizer declares the columns its result depends on (e.g. the player and the date, or the opponent and
+the date), so its results can be materialized ahead of time into a FeatureStore table keyed by those columns. The
+table is brought up to date after each scrape (pl-nba-update-features), and expansion reads features from it instead
+of recomputing them from the gamelogs.
+'''
+import os
+from argparse import ArgumentParser
+import logging
+import pandas as pd
+
+from dfs import GLOBAL_ROOT
+from dfs.featurestore import FeatureStore, StoredFeatures
+from dfs.extdata.bbr.gamelogs import load_all_game_data
+from .featurizers import registry
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.FileHandler('./pipeline.log'))
+logger.setLevel(logging.DEBUG)
+
+feature_store = FeatureStore(os.path.join(GLOBAL_ROOT, 'featurestore'))
+stored_features = StoredFeatures(feature_store, registry)
+
+def stored_featurizers(featurizers=None):
+  return stored_features.stored_featurizers(featurizers)
+
+def materialize_features(data, featurizers=None, replace=False):
+  stored_features.materialize(data, featurizers=featurizers, replace=replace)
+
+def features_as_of(data, feature_name):
+  return stored_features.features(data, feature_name)
+
+def update_feature_store(start_date=None, game_day=None):
+  """
+  Bring the feature store up to date after a scrape: materialize every game row we have (from start_date on), and the
+  eligible players for an upcoming game day, so that expanding them is just a lookup.
+  :param str start_date: only materialize games from this date on
+  :param str game_day: also materialize (afresh) the players eligible to play on this day
+  """
+  games = load_all_game_data()
+  if start_date is not None:
+    games = games[games['date'] >= pd.Timestamp(start_date)]
+  materialize_features(games)
+  if game_day is not None:
+    from .predict import get_eligible_players_df
+    materialize_features(get_eligible_players_df(game_day), replace=True)
+
+def update_cli():
+  p = ArgumentParser()
+  p.add_argument("--start-date", default=None, help="Only materialize games from this date on.")
+  p.add_argument("--game-day", default=None, help="Also materialize players eligible to play on this day.")
+  cfg = p.parse_args()
+  logging.basicConfig(level=logging.DEBUG)
+  update_feature_store(start_date=cfg.start_date, game_day=cfg.game_day)
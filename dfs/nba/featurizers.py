@@ -1,86 +1,46 @@
 import datetime
 import logging
 import pandas as pd, numpy as np
-import random
 import os
-import pickle
 
 from dfs import GLOBAL_ROOT
+from dfs.featurecache import FeatureCache
+from dfs.featureengine.registry import FeaturizerRegistry, feature_cache_key
 from dfs.extdata.bbr.gamelogs import load_gamelogs, load_all_game_data
-from dfs.extdata.numberfire.io import load_nf_histplayerinfo, load_nf_salaryinfo
-from dfs.extdata.sportsbookreview.sbrio import load_sbr_odds_info
+from dfs.extdata.numberfire.io import load_nf_histplayerinfo, load_nf_salaryinfo, load_nf_table, lookup_nf_table
+from dfs.extdata.sportsbookreview.sbrio import load_sbr_odds_info, load_sbr_odds_table, lookup_sbr_odds, \
+  report_odds_coverage
 
 import IPython
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.FileHandler('./pipeline.log'))
 logger.setLevel(logging.DEBUG)
 
-# Gigantic hack -- we just cache expansion results globally for now to speed things up.
-# NOT BEST PRACTICE...
-
-GLOBAL_CACHE_DICT = os.path.join(GLOBAL_ROOT, 'expansioncache')
-
-if os.path.exists(GLOBAL_CACHE_DICT):
-  expansion_cache = pickle.load(open(GLOBAL_CACHE_DICT, 'rb'))
-  logger.info("Loaded %d keys from cache", len(expansion_cache))
-else:
-  expansion_cache = {}
+# Featurizer results are cached on disk between runs, by featurizer version and input values
+feature_cache = FeatureCache(os.path.join(GLOBAL_ROOT, 'featurecache.sqlite'), max_age_days=365)
 
 nf_info_cache = {}
 nf_salary_cache = {}
-gamelogs = load_gamelogs()
-all_game_data = load_all_game_data()
-feature_generators = {}
-distinct_nf_players_expanded = set()
-
 
-def featurizer(name=None, output_columns=None, live=True):
+def load_featurizer_data():
   """
-  Decorator for functions that expand data by creating new feature columns.
-  The decorated expansion function should take as input a new game row from BBR and return
-    one row for each value in 'columns', in order.
-  A featurizer returns None if it can't load data. This wrapper also transforms that into a pandas.Series
-    of np.nan the same length as the number of columns generated, so that unloaded values will
-    successfully turn into NaNs.
-  :param name: name of featurizer, prepended to each column name
-  :param output_columns: list of features generated
-  :param bool live: whether to use this featurizer when expanding live data
-  :return:
+  Load the gamelogs the featurizers read. They're loaded on first use anyway; call this before forking workers so
+  that they all share the parent's copy instead of each loading their own.
   """
-  def decorated(func):
-    func_name = name or func.__name__
-    assert func_name not in feature_generators
-    def wrapper(*args, **kwargs):
-      result = func(*args, **kwargs)
-      if result is None:
-        return pd.Series(data=np.nan, index=output_columns)
-      else:
-        #print 'result', result
-        #print 'index', columns
-        return pd.Series(data=result, index=output_columns)
-    feature_generators[func_name] = (wrapper, output_columns, live)
-    return wrapper
-  return decorated
-
-def cached_featurizer(name=None, input_columns=None):
-  def decorated(func):
-    def wrapper(*args, **kwargs):
-      cache_key = name + '|' + str(list(args[0].loc[input_columns].values))
-      if cache_key in expansion_cache:
-        return expansion_cache[cache_key]
-      else:
-        result = func(*args, **kwargs)
-        expansion_cache[cache_key] = result
-        # Don't do this all the time
-        if random.random() < 0.001:
-          with open(GLOBAL_CACHE_DICT, 'wb') as outf:
-            pickle.dump(expansion_cache, outf)
-        return result
-    return wrapper
-  return decorated
-
-def encode_names(feature_name, columns):
-  return [feature_name + ': ' + col for col in columns]
+  load_gamelogs()
+  load_all_game_data()
+
+registry = FeaturizerRegistry('nba', player_column='bref_id', name_separator=':', cache=feature_cache,
+                              preload=load_featurizer_data)
+featurizer = registry.featurizer
+frame_featurizer = registry.frame_featurizer
+cached_featurizer = registry.cached_featurizer
+feature_generators = registry.generators
+frame_feature_generators = registry.frame_generators
+featurizer_requirements = registry.requirements
+featurizer_versions = registry.versions
+cached_featurizer_inputs = registry.cached_inputs
+distinct_nf_players_expanded = registry.expanded_players
 
 scorer = pd.Series({'PTS': 1,
                     'TRB': 1.2,   # BBR calls rebounds (REB) as TRB (total rebounds)
@@ -101,10 +61,77 @@ numberfire_scorer = pd.Series({'PTS': 1,
 def fantasy_points_fzr(row):
   return row[scorer.index].dot(scorer)
 
+@frame_featurizer(name="Target")
+def fantasy_points_frame_fzr(data):
+  return pd.DataFrame({'FDFP': data[scorer.index].dot(scorer)})
+
+scored_game_data = None
+
+def load_scored_game_data():
+  """
+  Every game we have information for, sorted by player and date, with its fantasy points in 'PPG'.
+  Scored once and then kept around.
+  :return pandas.DataFrame: all game rows
+  """
+  global scored_game_data
+  if scored_game_data is None:
+    all_game_data = load_all_game_data()
+    player_codes = pd.factorize(all_game_data['bref_id'], sort=True)[0]
+    order = np.lexsort((all_game_data['date'].values, player_codes))
+    scored_game_data = all_game_data.iloc[order].reset_index(drop=True)
+    scored_game_data['PPG'] = scored_game_data[scorer.index].dot(scorer)
+  return scored_game_data
+
+def rolling_game_means(data, window, stats):
+  """
+  For every row of data, average stats over the player's last `window` games strictly before the row's date (as
+  last5games_fzr does one row at a time). Missing stats are skipped, as in DataFrame.mean.
+  :param pandas.DataFrame data: rows with 'bref_id' and 'date'
+  :param int window: number of games to average over
+  :param list[str] stats: columns of load_scored_game_data() to average, e.g. 'PPG' or 'MP'
+  :return pandas.DataFrame: the averages, indexed like data; NaN where the player has no earlier games
+  """
+  games = load_scored_game_data()
+  # Running totals over all games; each game looks back over at most `window` of its own player's games
+  players = games['bref_id'].values
+  first = np.r_[True, players[1:] != players[:-1]]
+  position_in_player = np.arange(len(games)) - np.maximum.accumulate(np.where(first, np.arange(len(games)), 0))
+  lookback = np.minimum(position_in_player + 1, window)
+  values = games[stats].values.astype(float)
+  present = ~np.isnan(values)
+  totals = np.vstack([np.zeros((1, len(stats))), np.cumsum(np.where(present, values, 0), axis=0)])
+  counts = np.vstack([np.zeros((1, len(stats))), np.cumsum(present, axis=0)])
+  ends = np.arange(1, len(games) + 1)
+  with np.errstate(divide='ignore', invalid='ignore'):
+    means = (totals[ends] - totals[ends - lookback]) / (counts[ends] - counts[ends - lookback])
+
+  # As-of join: the latest game of the same player strictly before each row's date. Players and dates are ranked
+  # together so that (player, date) orders as a single integer.
+  player_codes, player_names = pd.factorize(np.concatenate([players, data['bref_id'].values]))
+  date_codes = np.unique(np.concatenate([games['date'].values, data['date'].values]), return_inverse=True)[1]
+  keys = player_codes.astype(np.int64) * (date_codes.max() + 1) + date_codes
+  game_keys, row_keys = keys[:len(games)], keys[len(games):]
+  latest = np.searchsorted(game_keys, row_keys, side='left') - 1
+  found = (latest >= 0) & (player_codes[np.maximum(latest, 0)] == player_codes[len(games):])
+  result = np.full((len(data), len(stats)), np.nan)
+  result[found] = means[latest[found]]
+  return pd.DataFrame(result, index=data.index, columns=stats)
+
+def last_n_games_featurizer(name, window, stats=('PPG',), live=True):
+  """
+  Register a frame featurizer averaging stats over each player's last `window` games, e.g.
+  last_n_games_featurizer('Last10', 10, ['PPG', 'MP'])
+  """
+  stats = list(stats)
+  @frame_featurizer(name=name, output_columns=stats, live=live)
+  def last_n_games_frame_fzr(data):
+    return rolling_game_means(data, window, stats)
+  return last_n_games_frame_fzr
+
 @featurizer(name="Last5", output_columns=['PPG'])
 @cached_featurizer(name="Last5", input_columns=['bref_id', 'date'])
 def last5games_fzr(row):
-  player_stats = gamelogs.get(row['bref_id'])
+  player_stats = load_gamelogs().get(row['bref_id'])
   if player_stats is not None and len(player_stats) > 0:
     player_stats = player_stats[player_stats.index < row['date']].tail(5)
     if len(player_stats) > 0:
@@ -113,6 +140,10 @@ def last5games_fzr(row):
     # Otherwise no games in the last two weeks, so go ahead and return none.
   return None
 
+@frame_featurizer(name="Last5")
+def last5games_frame_fzr(data):
+  return rolling_game_means(data, 5, ['PPG'])
+
 _nf_columns = ['Minutes', 'PTS', 'REB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'FP']
 @featurizer(name="NF", output_columns=_nf_columns)
 @cached_featurizer(name="NF", input_columns=['bref_id', 'date'])
@@ -146,6 +177,14 @@ def nf_stats_fzr(row):
   else: # No data for this player on this date.
     return None
 
+@frame_featurizer(name="NF")
+def nf_stats_frame_fzr(data):
+  nfdata = load_nf_table('nba', data['bref_id'].dropna().unique(), required_columns=numberfire_scorer.index)
+  nfdata['FP'] = nfdata[numberfire_scorer.index].dot(numberfire_scorer)
+  loaded_stats = lookup_nf_table(data, nfdata, 'bref_id', 'date', _nf_columns)
+  distinct_nf_players_expanded.update(data['bref_id'][loaded_stats.notnull().any(axis=1)])
+  return loaded_stats
+
 _salary_columns = ["FanDuel Salary"]
 @featurizer(name="Salary", output_columns=_salary_columns, live=False)    # Turn this off for live scoring, we will grab salary elsewhere
 @cached_featurizer(name="Salary", input_columns=['bref_id', 'date'])
@@ -170,6 +209,11 @@ def salary_fzr(row):  # load FanDuel salary from Numberfire
   else:
     return None
 
+@frame_featurizer(name="Salary")
+def salary_frame_fzr(data):
+  nf_salary_data = load_nf_table('nba', data['bref_id'].dropna().unique(), salary=True)
+  return lookup_nf_table(data, nf_salary_data, 'bref_id', 'date', _salary_columns)
+
 @featurizer(name='Vegas', output_columns=['Spread', 'OverUnder'])
 @cached_featurizer(name="Vegas", input_columns=['Tm', 'date'])
 def vegas_fzr(row):
@@ -186,9 +230,135 @@ def vegas_fzr(row):
   retval = [odds['spread'], odds['scoreline']]
   return retval
 
-# Future work: see if we can carve this up by position too
+@frame_featurizer(name='Vegas')
+def vegas_frame_fzr(data):
+  odds, missing_days = load_sbr_odds_table('nba', data['date'])
+  found, listed = lookup_sbr_odds(data, odds, 'Tm', 'date', ['spread', 'scoreline'])
+  report_odds_coverage('nba', data, 'date', missing_days, listed)
+  return pd.DataFrame({'Spread': found['spread'].values, 'OverUnder': found['scoreline'].values}, index=data.index)
+
+# Future work: see if we can carve this up by position too (OpponentAllowedTable can already answer by position)
 opp_ffpg_cache = {}
 
+def _day_numbers(dates):
+  return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+class OpponentAllowedTable(object):
+  """
+  Fantasy points allowed, as daily totals on a dense (day x group) grid where a group is an opponent, or an
+  (opponent, position) pair. Running totals down the days turn any trailing window into a single subtraction, so
+  looking up a row costs the same however many games the window holds.
+  """
+  def __init__(self, games, group_columns):
+    """
+    :param pandas.DataFrame games: game rows as from load_all_game_data
+    :param list[str] group_columns: columns of games that make up a group, e.g. ['Opp'] or ['Opp', 'pos']
+    """
+    self.group_columns = group_columns
+    fps = games[scorer.index].dot(scorer).values.astype(float)
+    minutes = games['MP'].values.astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+      fppmp = fps / minutes
+    keys = self._keys(games)
+    self.groups = pd.Index(pd.unique(keys))
+    days = _day_numbers(games['date'])
+    self.first_day = days.min()
+    self.n_days = days.max() - self.first_day + 1
+    cells = (days - self.first_day) * len(self.groups) + self.groups.get_indexer(keys)
+    shape = (self.n_days, len(self.groups))
+
+    def total(weights):
+      return np.bincount(cells, weights=weights, minlength=shape[0] * shape[1]).reshape(shape)
+    def running(grid):
+      return np.vstack([np.zeros((1, shape[1])), np.cumsum(grid, axis=0)])
+    def best(values):
+      grid = np.full(shape[0] * shape[1], np.nan)
+      present = ~np.isnan(values)
+      maxima = pd.Series(values[present]).groupby(cells[present]).max()
+      grid[maxima.index.values] = maxima.values
+      return grid.reshape(shape)
+
+    self.running = {'games': running(total(None)),
+                    'fp': running(total(np.nan_to_num(fps))),
+                    'fp_count': running(total(~np.isnan(fps))),
+                    'mp': running(total(np.nan_to_num(minutes))),
+                    'missing': running(total(np.isnan(fps) | np.isnan(minutes))),
+                    'fppmp': running(total(np.where(np.isnan(fppmp), 0, fppmp))),
+                    'fppmp_count': running(total(~np.isnan(fppmp)))}
+    self.daily_max = {'fp': best(fps), 'fppmp': best(fppmp)}
+    self._window_max = {}
+
+  def _keys(self, data):
+    keys = data[self.group_columns[0]].astype(str).values
+    for column in self.group_columns[1:]:
+      keys = keys + '|' + data[column].astype(str).values
+    return keys
+
+  def _trailing_max(self, name, days):
+    """
+    :return numpy.ndarray: row t holds the max over days t - days + 1 to t - 1 (like the running totals, row t covers
+      the days before day t)
+    """
+    if (name, days) not in self._window_max:
+      daily = self.daily_max[name]
+      trailing = np.full((self.n_days + days, daily.shape[1]), np.nan)
+      for shift in range(1, days):
+        trailing[shift:shift + self.n_days] = np.fmax(trailing[shift:shift + self.n_days], daily)
+      self._window_max[(name, days)] = trailing
+    return self._window_max[(name, days)]
+
+  def window_stats(self, data, weeks=2):
+    """
+    What each row's group allowed in the `weeks` weeks before the row's date (not counting that day), as
+    opp_ffpg_fzr works out one row at a time.
+    :param pandas.DataFrame data: rows with 'date' and the group columns
+    :param int weeks: length of the window
+    :return pandas.DataFrame: 'AvgFPPG', 'MaxFPPG', 'FPPMP', 'AvgFPPMP' and 'MaxFPPMP' columns, indexed like data;
+      NaN where the group played no games in the window
+    """
+    days = 7 * weeks
+    groups = self.groups.get_indexer(self._keys(data))
+    known = groups >= 0
+    day = _day_numbers(data['date'])[known] - self.first_day
+    groups = groups[known]
+    end, start = np.clip(day, 0, self.n_days), np.clip(day - days + 1, 0, self.n_days)
+    window = {name: totals[end, groups] - totals[start, groups] for name, totals in self.running.items()}
+    clipped = np.clip(day, 0, self.n_days + days - 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+      stats = pd.DataFrame({'AvgFPPG': window['fp'] / window['fp_count'],
+                            'MaxFPPG': self._trailing_max('fp', days)[clipped, groups],
+                            # A missing score or minutes total spoils the whole ratio, as in opp_ffpg_fzr
+                            'FPPMP': np.where(window['missing'] > 0, np.nan, window['fp'] / window['mp']),
+                            'AvgFPPMP': window['fppmp'] / window['fppmp_count'],
+                            'MaxFPPMP': self._trailing_max('fppmp', days)[clipped, groups]},
+                           index=data.index[known])
+    stats[window['games'] == 0] = np.nan
+    return stats.reindex(index=data.index, columns=['AvgFPPG', 'MaxFPPG', 'FPPMP', 'AvgFPPMP', 'MaxFPPMP'])
+
+opponent_allowed_tables = {}
+
+def opponent_allowed(data, weeks=2, by_position=False):
+  """
+  Fantasy points allowed by each row's opponent in the weeks before the row's date (see OpponentAllowedTable).
+  :param pandas.DataFrame data: rows with 'bref_id', 'Opp' and 'date'
+  :param bool by_position: only count what the opponent allowed to players of the row player's position
+  :return pandas.DataFrame: as OpponentAllowedTable.window_stats
+  """
+  if by_position not in opponent_allowed_tables:
+    all_game_data = load_all_game_data()
+    if by_position:
+      from dfs.nba.playerid import get_mapping_by_id
+      positions = get_mapping_by_id()['pos']
+      games = all_game_data.assign(pos=all_game_data['bref_id'].map(positions).values)
+      opponent_allowed_tables[by_position] = OpponentAllowedTable(games, ['Opp', 'pos'])
+    else:
+      opponent_allowed_tables[by_position] = OpponentAllowedTable(all_game_data, ['Opp'])
+  if by_position:
+    from dfs.nba.playerid import get_mapping_by_id
+    data = data.assign(pos=data['bref_id'].map(get_mapping_by_id()['pos']).values)
+  return opponent_allowed_tables[by_position].window_stats(data, weeks)
+
 @featurizer(name='OpponentLast2Weeks', output_columns=['AvgFPPG', 'MaxFPPG', 'FPPMP', 'AvgFPPMP', 'MaxFPPMP'])
 @cached_featurizer(name="OpponentLast2Weeks", input_columns=['Opp', 'date'])
 def opp_ffpg_fzr(row):
@@ -196,6 +366,7 @@ def opp_ffpg_fzr(row):
     return opp_ffpg_cache[(row['Opp'], row['date'])]
   opp = row['Opp']
   cutoff_time = row['date'] - datetime.timedelta(weeks=2)
+  all_game_data = load_all_game_data()
   against_team = all_game_data[all_game_data['Opp'] == opp]
   before_date = against_team[against_team['date'] < row['date']]
   recent = before_date[before_date['date'] > cutoff_time]
@@ -208,3 +379,7 @@ def opp_ffpg_fzr(row):
     retval = None
   opp_ffpg_cache[(row['Opp'], row['date'])] = retval
   return retval
+
+@frame_featurizer(name='OpponentLast2Weeks')
+def opp_ffpg_frame_fzr(data):
+  return opponent_allowed(data, weeks=2)
@@ -16,6 +16,7 @@ from email.mime.text import MIMEText
 
 from .dumping import dump_nba_data
 from .expansion import expand_file_data
+from .attrs import read_attrs
 from .split import strip_and_process_to_files, split_to_files
 from .model import build_model, apply_model
 
@@ -54,7 +55,7 @@ Vegas:OverUnder
 
 global_na_strategy = 'drop'
 
-def run_pipeline(stage, modeldir, start_date, end_date, algorithm='ridge', sample_size=20000):
+def run_pipeline(stage, modeldir, start_date, end_date, algorithm='ridge', sample_size=20000, workers=1):
   data_dir = os.path.join(modeldir, 'data')
   dumped_pickle = os.path.join(data_dir, 'dumped.pickle')
   expanded_pickle = os.path.join(data_dir, 'expanded.pickle')
@@ -78,7 +79,8 @@ def run_pipeline(stage, modeldir, start_date, end_date, algorithm='ridge', sampl
     stage = 'expand'
   if stage == 'expand':
     logger.info("Pipeline Stage: %s", stage)
-    expand_file_data(dumped_pickle, expanded_pickle, live=False)
+    expand_file_data(dumped_pickle, expanded_pickle, live=False, workers=workers, attrs=attrs.splitlines(),
+                     use_store=True, use_feature_store=True)
     stage = 'attrs'
   if stage == 'attrs':
     logger.info("Pipeline Stage: %s", stage)
@@ -125,6 +127,7 @@ def run_pipeline_cli():
   p.add_argument("--end-date", default=None, help="Don't include data after this date.")
   p.add_argument("--algorithm", default='ridge', help="Type of model to use.")
   p.add_argument("--max-count", default=20000, help="Max records to include.")
+  p.add_argument("--workers", type=int, default=1, help="Number of processes to expand data with.")
   cfg = p.parse_args()
   logging.basicConfig(level=logging.DEBUG)
   logger.propagate = True
@@ -133,7 +136,8 @@ def run_pipeline_cli():
                start_date=cfg.start_date,
                end_date=cfg.end_date,
                algorithm=cfg.algorithm,
-               sample_size=cfg.max_count)
+               sample_size=cfg.max_count,
+               workers=cfg.workers)
 
 live_postmodel_stages = ['start', 'dumplive', 'expandlive', 'stripna', 'predict', 'teamgen', 'finish']
 
@@ -166,7 +170,8 @@ def run_live_postmodel_pipeline(stage, modeldir, game_day, gameday_historical=Tr
     stage = 'expandlive'
   if stage == 'expandlive':
     logger.info("Pipeline Stage: %s", stage)
-    expand_file_data(infile=dumped_pickle, outfile=expanded_pickle, live=True)
+    expand_file_data(infile=dumped_pickle, outfile=expanded_pickle, live=True, attrs=read_attrs(attrs_txt),
+                     use_feature_store=True)
     stage = 'stripna'
   if stage == 'stripna':
     logger.info("Pipeline Stage: %s", stage)
@@ -7,12 +7,24 @@ Update it on NBA scrape from BREF.
 import warnings
 from fuzzywuzzy import process as fzmatch
 from dfs.extdata.bbr.mapping_df import load_player_table
+from dfs.lazy import memoized
 
-mapping_df = load_player_table()
-unset_index = mapping_df.reset_index()
-unset_index.fillna('', inplace=True)
-mapping_by_name = unset_index.set_index('name')
-mapping_by_id = unset_index.set_index('brefid')
+# The mapping table is loaded the first time it's needed, not at import
+get_mapping_df = memoized(load_player_table)
+
+@memoized
+def _unset_index():
+  unset_index = get_mapping_df().reset_index()
+  unset_index.fillna('', inplace=True)
+  return unset_index
+
+@memoized
+def get_mapping_by_name():
+  return _unset_index().set_index('name')
+
+@memoized
+def get_mapping_by_id():
+  return _unset_index().set_index('brefid')
 
 def name2nbaid(player_name, player_team=None, get_confidence=False):
   """ Consolidate all fuzzy-matching name lookups into this function alone.
@@ -20,6 +32,7 @@ def name2nbaid(player_name, player_team=None, get_confidence=False):
   :return:
   """
   tla = None
+  mapping_by_name = get_mapping_by_name()
   if player_team is not None:
     tla = team_tla(player_team)
     usable_mapping = mapping_by_name[mapping_by_name['team'] == tla]
@@ -38,7 +51,7 @@ def name2nbaid(player_name, player_team=None, get_confidence=False):
     return usable_mapping.loc[match, 'brefid']
 
 def id2name(player_id):
-  return mapping_by_id.loc[player_id, 'name']
+  return get_mapping_by_id().loc[player_id, 'name']
 
 def team_tla(team, get_confidence=False):
   """
@@ -46,11 +59,12 @@ def team_tla(team, get_confidence=False):
   :param str team:
   :return str: TLA
   """
-  if team in _acceptable_tlas:  # We can't use _team_tlas here for a shortcut since we ban some bad TLAs.
+  team_choices, acceptable_tlas = _team_choices()
+  if team in acceptable_tlas:  # We can't use the mapping's TLAs here for a shortcut since we ban some bad TLAs.
     return team
   else:
-    match, score = fzmatch.extractOne(team, _team_choices.keys())
-    actual_team = _team_choices[match]
+    match, score = fzmatch.extractOne(team, team_choices.keys())
+    actual_team = team_choices[match]
   if score < 90 and not get_confidence:
     warnings.warn("Low confidence NBA team match: %s -> %s -> %s (confidence=%d)" % (team, match, actual_team, score))
   if get_confidence:
@@ -58,8 +72,6 @@ def team_tla(team, get_confidence=False):
   else:
     return actual_team
 
-_team_tlas = set(mapping_df['team'].values)
-
 # add aliases in the form of (TLA, alias)
 _team_alias_list = [
   ('ATL', "Atlanta Hawks"),
@@ -102,14 +114,23 @@ _team_alias_list = [
   ('TOR', "Toronto Raptors"),
   ('UTA', "Utah Jazz"),
   ('WAS', "Washington Wizards"),
-] + [(tla, tla) for tla in _team_tlas]  # also consider that the TLA may have just been misspelled.
+]
 
 
 # There are some old team TLA's with no active players that I am just banning here to make it easy.
 _bad_tlas = ["NOH"]
-_filtered_alias_list = filter(lambda (tla, _): tla not in _bad_tlas, _team_alias_list)
-_team_choices = {alias: tla for tla, alias in _filtered_alias_list}
-_acceptable_tlas = set(_team_choices.values())
+
+@memoized
+def _team_choices():
+  """
+  :return (dict[str, str], set[str]): team alias -> TLA, and the TLAs we accept as they are
+  """
+  # also consider that the TLA may have just been misspelled.
+  team_tlas = set(get_mapping_df()['team'].values)
+  alias_list = _team_alias_list + [(tla, tla) for tla in team_tlas]
+  filtered_alias_list = filter(lambda (tla, _): tla not in _bad_tlas, alias_list)
+  team_choices = {alias: tla for tla, alias in filtered_alias_list}
+  return team_choices, set(team_choices.values())
 
 
 
@@ -120,4 +141,4 @@ def get_position(player_id):
   :param str player_id: bref_id
   :return str: position
   """
-  return mapping_by_id.loc[player_id]['pos']
\ No newline at end of file
+  return get_mapping_by_id().loc[player_id]['pos']
\ No newline at end of file
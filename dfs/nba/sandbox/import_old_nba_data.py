@@ -2,7 +2,7 @@
 import simplejson as json
 import os
 import pandas as pd
-from dfs.nba.playerid import name2nbaid, mapping_by_id
+from dfs.nba.playerid import name2nbaid, get_mapping_by_id
 from dfs.extdata.numberfire.io import load_nf_histplayerinfo, save_nf_histplayerinfo
 from progressbar import ProgressBar
 
@@ -14,7 +14,7 @@ pbar = ProgressBar()
 for id, name in pbar(list(old_dict['id2bbr'].iteritems())):
   bref_id, confidence = name2nbaid(name, get_confidence=True)
   if confidence >= 80 and isinstance(bref_id, basestring):
-    #print name, bref_id, mapping_by_id.loc[bref_id, 'name']
+    #print name, bref_id, get_mapping_by_id().loc[bref_id, 'name']
     old_to_new[id] = bref_id
 
 data_to_save = {}
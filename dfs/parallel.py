@@ -0,0 +1,68 @@
+'''
+Helpers for spreading row-by-row feature expansion over worker processes.
+
+The workers are forked, so they share the gamelogs and other tables the parent has already loaded (copy-on-write)
+rather than loading their own.
+'''
+import multiprocessing
+import numpy as np
+import pandas as pd
+
+def fork_pool(workers, initializer=None):
+  """
+  :param int workers: number of worker processes
+  :param function initializer: called in each worker when it starts
+  :return multiprocessing.Pool: a pool of forked workers
+  """
+  if hasattr(multiprocessing, 'get_context'):
+    return multiprocessing.get_context('fork').Pool(workers, initializer=initializer)
+  return multiprocessing.Pool(workers, initializer=initializer)
+
+def in_worker():
+  """
+  :return bool: whether this is a worker process rather than the main one
+  """
+  return multiprocessing.current_process().name != 'MainProcess'
+
+def debug_shell(message):
+  """
+  Print message and drop into an IPython shell to look around, as the featurizers do when they meet data they can't
+  handle. A worker process has no terminal, and the shell would hang its pool, so there it raises instead.
+  :param str message: what went wrong
+  """
+  if in_worker():
+    raise RuntimeError(message)
+  print message
+  import IPython
+  IPython.embed()
+
+def shard_by(keys, n_shards):
+  """
+  Split rows into shards, keeping rows with the same key (e.g. the same player) together.
+  :param pandas.Series keys: key of each row
+  :param int n_shards: number of shards
+  :return list[numpy.ndarray]: positions of the rows in each shard, in their original order (empty shards left out)
+  """
+  codes = pd.factorize(keys, sort=True)[0] % n_shards
+  shards = [np.flatnonzero(codes == shard) for shard in range(n_shards)]
+  return [shard for shard in shards if len(shard)]
+
+def map_shards(func, data, keys, workers, initializer=None, shards_per_worker=4):
+  """
+  Run func over shards of data in a pool of forked workers.
+  :param function func: takes a shard of data (a DataFrame) and returns something picklable
+  :param pandas.DataFrame data: rows to split up
+  :param pandas.Series keys: key of each row of data; rows with the same key are kept in the same shard
+  :param int workers: number of worker processes
+  :param function initializer: called in each worker when it starts
+  :param int shards_per_worker: more shards than workers evens out the load when some shards are slower
+  :return (list, list[numpy.ndarray]): func's result for each shard, and the positions in data of the shard's rows
+  """
+  shards = shard_by(keys, workers * shards_per_worker)
+  pool = fork_pool(workers, initializer)
+  try:
+    results = pool.map(func, [data.iloc[shard] for shard in shards])
+  finally:
+    pool.close()
+    pool.join()
+  return results, shards
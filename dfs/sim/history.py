@@ -0,0 +1,43 @@
+'''
+Historical player-games for fitting a dfs.sim.montecarlo.ResidualModel, from the scraped gamelogs.
+
+The scorers and gamelogs are imported when these are called rather than at import time, since importing the
+featurizer modules loads a lot of data.
+'''
+import pandas as pd
+
+def nba_player_games():
+  """
+  :return pandas.DataFrame: one row per player-game from basketball-reference, with 'bref_id', 'date', 'Tm', 'Opp'
+    and FanDuel points in 'FP'
+  """
+  from dfs.extdata.bbr.gamelogs import load_all_game_data
+  from dfs.nba.featurizers import scorer
+  all_games = load_all_game_data().dropna(subset=list(scorer.index))
+  games = all_games[['bref_id', 'date', 'Tm', 'Opp']].copy()
+  games['FP'] = all_games[scorer.index].astype(float).dot(scorer)
+  return games
+
+def _stack_gamelogs(gamelogs, player_column):
+  frames = []
+  for player, gamelog in gamelogs.items():
+    frame = gamelog.reset_index()
+    frame = frame.rename(columns={frame.columns[0]: 'date'})
+    frame[player_column] = player
+    frames.append(frame)
+  return pd.concat(frames, ignore_index=True)
+
+def mlb_player_games():
+  """
+  :return pandas.DataFrame: one row per player-game from baseball-reference, batters and pitchers both, with
+    'player', 'date', 'Tm', 'Opp' and FanDuel points in 'FP'
+  """
+  from dfs.extdata.bsbr.gamelogs import load_gamelogs
+  from dfs.mlb.expansion import batter_scorer, pitcher_scorer
+  batting = _stack_gamelogs(load_gamelogs('batting'), 'player')
+  batting['FP'] = batting[batter_scorer.index].fillna(0).astype(float).dot(batter_scorer)
+  pitching = _stack_gamelogs(load_gamelogs('pitching'), 'player')
+  pitching['W'] = pitching['Dec'].astype(str).str.startswith('W').astype(float)
+  pitching['FP'] = pitching[pitcher_scorer.index].fillna(0).astype(float).dot(pitcher_scorer)
+  columns = ['player', 'date', 'Tm', 'Opp', 'FP']
+  return pd.concat([batting[columns], pitching[columns]], ignore_index=True).dropna(subset=['date', 'Tm', 'Opp'])
@@ -0,0 +1,166 @@
+'''
+Monte Carlo lineup simulation, for picking lineups by their chance of cashing rather than by projected points alone.
+
+Player outcomes are modelled as projection + sd * noise. The noise is a game factor (shared by both teams in a game),
+a team factor and a player's own noise, weighted so that teammates and opponents are as correlated as they have
+historically been. Outcomes are drawn as one players x simulations matrix; a set of lineups is then a 0/1
+lineups x players matrix, and scoring every lineup in every simulation is a single matrix product.
+'''
+import numpy as np
+import pandas as pd
+
+class ResidualModel(object):
+  """
+  How far players' results stray from expectation, and how those misses are correlated.
+  :ivar pandas.Series player_sd: residual standard deviation, by player
+  :ivar float league_sd: residual standard deviation over all players
+  :ivar float teammate_corr: average correlation of two teammates' residuals in the same game
+  :ivar float opponent_corr: average correlation of two opponents' residuals in the same game
+  """
+  def __init__(self, player_sd, league_sd, teammate_corr, opponent_corr):
+    self.player_sd = player_sd
+    self.league_sd = league_sd
+    self.teammate_corr = teammate_corr
+    self.opponent_corr = opponent_corr
+
+  def sd_for(self, players):
+    """
+    :param list players: player IDs
+    :return numpy.ndarray: residual sd of each player (the league's for players we have no history for)
+    """
+    return self.player_sd.reindex(players).fillna(self.league_sd).values
+
+def fit_residual_model(games, player_column, score_column, window=10, min_games=5, shrinkage=10):
+  """
+  Estimate a ResidualModel from historical games. A player's expected score for a game is his average over his
+  previous `window` games, and his residual is how far he missed it by.
+  :param pandas.DataFrame games: one row per player per game, with player_column, score_column, 'date', 'Tm' and 'Opp'
+  :param str player_column: column of games containing the player ID
+  :param str score_column: column of games containing the fantasy score
+  :param int window: number of earlier games that make up the expectation
+  :param int min_games: skip games with fewer than this many earlier games to go on
+  :param int shrinkage: each player's sd is shrunk towards the league's as if it were this many games of league data
+  :return ResidualModel:
+  """
+  games = games.sort([player_column, 'date'])
+  scores = games[score_column].values.astype(np.float64)
+  players = games[player_column].values
+  # Trailing means in one pass: running sums, with each row looking back over at most its own player's earlier games
+  sums = np.concatenate([[0.0], np.cumsum(scores)])
+  rows = np.arange(len(scores))
+  lookback = np.minimum(games.groupby(player_column).cumcount().values, window)
+  with np.errstate(divide='ignore', invalid='ignore'):
+    expected = (sums[rows] - sums[rows - lookback]) / lookback
+  usable = lookback >= min_games
+  residuals = pd.DataFrame({'player': players[usable],
+                            'date': games['date'].values[usable],
+                            'Tm': games['Tm'].values[usable],
+                            'Opp': games['Opp'].values[usable],
+                            'residual': scores[usable] - expected[usable]})
+
+  league_var = residuals['residual'].var()
+  by_player = residuals.groupby('player')['residual']
+  counts, variances = by_player.count(), by_player.var().fillna(league_var)
+  player_sd = np.sqrt((counts * variances + shrinkage * league_var) / (counts + shrinkage))
+
+  # Pool the correlations over every (date, team): the sum over pairs of z_i * z_j is ((sum z)^2 - sum z^2) / 2
+  residuals['z'] = residuals['residual'].values / player_sd.reindex(residuals['player']).values
+  residuals['z2'] = residuals['z'] ** 2
+  residuals['n'] = 1
+  teams = residuals.groupby(['date', 'Tm', 'Opp'])[['z', 'z2', 'n']].sum().reset_index()
+  teammate_corr = ((teams['z'] ** 2 - teams['z2']) / 2).sum() / (teams['n'] * (teams['n'] - 1) / 2).sum()
+  opponents = teams.merge(teams, left_on=['date', 'Opp'], right_on=['date', 'Tm'], suffixes=('', '_opp'))
+  opponent_corr = (opponents['z'] * opponents['z_opp']).sum() / (opponents['n'] * opponents['n_opp']).sum()
+  return ResidualModel(player_sd, np.sqrt(league_var), teammate_corr, opponent_corr)
+
+def draw_outcomes(model, players, projections, teams, opponents, n_sims=100000, seed=None, chunk_size=10000):
+  """
+  Draw correlated fantasy scores for a slate.
+  :param ResidualModel model: residual sizes and correlations
+  :param list players: player IDs
+  :param numpy.ndarray projections: each player's projected score
+  :param list teams: each player's team
+  :param list opponents: each player's opponent
+  :param int n_sims: number of simulations
+  :param int seed: random seed
+  :param int chunk_size: simulations to draw at a time (bounds the memory for float64 temporaries)
+  :return numpy.ndarray: float32 scores, players x simulations
+  """
+  rng = np.random.RandomState(seed)
+  sd = model.sd_for(players).astype(np.float32)
+  projections = np.asarray(projections, dtype=np.float32)
+  # Weights for the game, team and player noise so teammates correlate at teammate_corr, opponents at opponent_corr
+  game_var = np.clip(model.opponent_corr, 0, 0.9)
+  team_var = np.clip(model.teammate_corr - game_var, 0, 0.9 - game_var)
+  weights = np.sqrt([game_var, team_var, 1 - game_var - team_var]).astype(np.float32)
+  team_codes, team_names = pd.factorize(pd.Series(list(teams)))
+  games = ['|'.join(sorted([str(team), str(opponent)])) for team, opponent in zip(teams, opponents)]
+  game_codes, game_names = pd.factorize(pd.Series(games))
+
+  outcomes = np.empty((len(sd), n_sims), dtype=np.float32)
+  for start in range(0, n_sims, chunk_size):
+    size = min(chunk_size, n_sims - start)
+    game_noise = rng.randn(len(game_names), size).astype(np.float32)
+    team_noise = rng.randn(len(team_names), size).astype(np.float32)
+    noise = weights[0] * game_noise[game_codes] + weights[1] * team_noise[team_codes] + \
+            weights[2] * rng.randn(len(sd), size).astype(np.float32)
+    outcomes[:, start:start + size] = projections[:, None] + sd[:, None] * noise
+  return outcomes
+
+def lineup_matrix(lineups, players):
+  """
+  :param list[list] lineups: each a list of player IDs
+  :param list players: player IDs, in the order of the rows of the outcome matrix
+  :return numpy.ndarray: float32 matrix, lineups x players, 1 where the lineup uses the player
+  """
+  positions = {player: position for position, player in enumerate(players)}
+  matrix = np.zeros((len(lineups), len(players)), dtype=np.float32)
+  for row, lineup in enumerate(lineups):
+    matrix[row, [positions[player] for player in lineup]] = 1
+  return matrix
+
+def field_cash_line(field, outcomes, cash_fraction=0.5, chunk_size=10000):
+  """
+  The score needed to cash in each simulation, if the contest field looked like these lineups.
+  :param numpy.ndarray field: lineups x players matrix (see lineup_matrix)
+  :param numpy.ndarray outcomes: players x simulations
+  :param float cash_fraction: fraction of the field that cashes (0.5 for a 50/50)
+  :return numpy.ndarray: cash line for each simulation
+  """
+  lines = np.empty(outcomes.shape[1], dtype=np.float32)
+  for start in range(0, outcomes.shape[1], chunk_size):
+    scores = field.dot(outcomes[:, start:start + chunk_size])
+    lines[start:start + chunk_size] = np.percentile(scores, 100 * (1 - cash_fraction), axis=0)
+  return lines
+
+def rank_lineups(lineups, outcomes, cash_line=None, percentile=None, chunk_size=500):
+  """
+  Score every lineup in every simulation and rank them: by chance of beating cash_line if given, by the percentile
+  score if given (for tournaments, where only the upside matters), and by mean score otherwise.
+  :param numpy.ndarray lineups: lineups x players matrix (see lineup_matrix)
+  :param numpy.ndarray outcomes: players x simulations
+  :param cash_line: score needed to cash, either one number or one for each simulation (see field_cash_line)
+  :param float percentile: report this percentile (0-100) of each lineup's scores
+  :param int chunk_size: lineups to score at a time (bounds the lineups x simulations score matrix)
+  :return pandas.DataFrame: 'mean', 'sd' and, as requested, 'cash_prob' and 'pNN' columns, indexed by lineup number
+    (row of lineups), best first
+  """
+  stats = []
+  for start in range(0, lineups.shape[0], chunk_size):
+    scores = lineups[start:start + chunk_size].dot(outcomes)
+    chunk = pd.DataFrame({'mean': scores.mean(axis=1), 'sd': scores.std(axis=1)},
+                         index=np.arange(start, start + scores.shape[0]))
+    if cash_line is not None:
+      chunk['cash_prob'] = (scores > cash_line).mean(axis=1)
+    if percentile is not None:
+      chunk['p%g' % percentile] = np.percentile(scores, percentile, axis=1)
+    stats.append(chunk)
+  stats = pd.concat(stats)
+  if cash_line is not None:
+    key = 'cash_prob'
+  elif percentile is not None:
+    key = 'p%g' % percentile
+  else:
+    key = 'mean'
+  order = np.argsort(-stats[key].values, kind='mergesort')
+  return stats.iloc[order]
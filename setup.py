@@ -48,6 +48,7 @@ if __name__ == '__main__':
         'bsbr-load-overviews = dfs.extdata.bsbr.scrape_bsbr:create_json_file',
         'bsbr-load-player = dfs.extdata.bsbr.scrape_bsbr:cli_load_player',
         'bsbr-update-players = dfs.extdata.bsbr.scrape_bsbr:cli_update_players',
+        'bsbr-migrate-gamelogs = dfs.extdata.bsbr.scrape_bsbr:migrate_cli',
         # MLB Player scraping from other data sources
         'mlb-scrape-nf = dfs.extdata.numberfire.mlb_scraper:scrape_cli',
         'mlb-scrape-sbr = dfs.extdata.sportsbookreview.scrape_mlb_odds:scrape_cli',
@@ -68,16 +69,20 @@ if __name__ == '__main__':
 
         # Load or update active NBA stats from basketball reference
         'bbr-update-players = dfs.extdata.bbr.scraper:cli_update_players',
+        'bbr-migrate-gamelogs = dfs.extdata.bbr.io:migrate_cli',
         # NBA external data scraping
         'nba-scrape-nf = dfs.extdata.numberfire.nba_scraper:scrape_cli',
         'nba-scrape-sbr = dfs.extdata.sportsbookreview.scrape_nba_odds:scrape_cli',
         # NBA pipeline
         'pl-nba-dump = dfs.nba.dumping:dump_cli',
         'pl-nba-expand = dfs.nba.expansion:expand_cli',
+        'pl-nba-update-features = dfs.nba.featurestore:update_cli',
         'pl-nba-dumpattrs = dfs.nba.attrs:dump_attrs_cli',
         'pl-nba-split = dfs.nba.split:split_cli',
         'pl-nba-model = dfs.nba.model:build_model_cli',
         'pl-nba-teamgen = dfs.nba.buildteams:build_teams_cli',
+        'pl-nba-lateswap = dfs.nba.buildteams:late_swap_cli',
+        'pl-nba-simulate = dfs.nba.buildteams:rank_teams_cli',
 
         # NBA full pipeline scripts
         'pl-nba = dfs.nba.pipeline:run_pipeline_cli',
@@ -0,0 +1,74 @@
+import os
+import sys
+import shutil
+import tempfile
+import cPickle as pickle
+from unittest import TestCase
+from mock import patch
+import pandas as pd
+from dfs.extdata.bbr import io, gamelogs
+
+def gamelog(dates, points, minutes):
+  dates = pd.to_datetime(dates)
+  return pd.DataFrame({'Date': dates, 'PTS': points, 'MP': minutes, 'Opp': 'NYK'}, index=dates,
+                      columns=['Date', 'PTS', 'MP', 'Opp'])
+
+class GamelogStoreIOTest(TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.patches = [patch('dfs.extdata.bbr.io.datadir', self.tmpdir),
+                    patch.object(gamelogs, 'prepared_bbr_data', None),
+                    patch.object(gamelogs, 'prepared_unindexed_data', None)]
+    for p in self.patches:
+      p.start()
+    # Games from two seasons, out of order
+    self.gamelogs = {'jamesle01': gamelog(['2015-11-02', '2014-11-01', '2015-03-01'], [30, 25, 20],
+                                          ['36:30', '40:00', '30:15']),
+                     'curryst01': gamelog(['2015-11-01', '2015-01-02'], [40, 35], ['34:00', '12:30'])}
+    os.makedirs(os.path.join(self.tmpdir, 'player_data'))
+    for bref_id, df in self.gamelogs.items():
+      with open(io.get_player_filename(bref_id), 'wb') as outf:
+        pickle.dump(df, outf)
+    io.save_overview_dict(io.create_player_dict({bref_id: '' for bref_id in self.gamelogs}))
+
+  def tearDown(self):
+    for p in self.patches:
+      p.stop()
+    shutil.rmtree(self.tmpdir)
+
+  def reload(self):
+    gamelogs.prepared_bbr_data = None
+    gamelogs.prepared_unindexed_data = None
+    return gamelogs.load_all_game_data()
+
+  def test_store_matches_pickles(self):
+    from_pickles = self.reload()
+    io.migrate_gamelogs()
+    from_store = self.reload()
+    self.assertTrue(from_pickles.equals(from_store))
+    # By season, then player, then date
+    self.assertEqual(['curryst01', 'jamesle01', 'jamesle01', 'curryst01', 'jamesle01'], list(from_store['bref_id']))
+    self.assertEqual(['date', 'PTS', 'MP', 'Opp', 'bref_id'], list(from_store.columns))
+    self.assertAlmostEqual(12.5, from_store['MP'].iloc[0])
+
+  def test_migrate_cli(self):
+    with patch.object(sys, 'argv', ['bbr-migrate-gamelogs']):
+      io.migrate_cli()
+    store = io.get_gamelog_store()
+    self.assertTrue(store.exists())
+    loaded = store.gamelogs()
+    for bref_id, df in self.gamelogs.items():
+      self.assertTrue(df.sort_index().equals(loaded[bref_id]))
+
+  def test_save_load(self):
+    players = io.create_player_dict({'jamesle01': ''})
+    players['jamesle01']['gamelog_data'] = gamelog(['2015-11-02', '2015-11-04'], [31, 26], [None, '38:00'])
+    # The first save moves the pickled gamelogs into the store, then adds the new games
+    io.save_dataframes(players)
+    loaded = io.load_dataframes(io.create_player_dict({bref_id: '' for bref_id in self.gamelogs}))
+    self.assertEqual([25, 20, 31, 26], list(loaded['jamesle01']['gamelog_data']['PTS']))
+    self.assertEqual(['40:00', '30:15', '36:30', '38:00'], list(loaded['jamesle01']['gamelog_data']['MP']))
+    self.assertTrue(self.gamelogs['curryst01'].sort_index().equals(loaded['curryst01']['gamelog_data']))
+    io.save_dataframes(players, overwrite=True)
+    loaded = io.load_dataframes(io.create_player_dict({'jamesle01': ''}))
+    self.assertEqual([31, 26], list(loaded['jamesle01']['gamelog_data']['PTS']))
@@ -0,0 +1,72 @@
+import os
+import sys
+import shutil
+import tempfile
+import cPickle as pickle
+from unittest import TestCase
+from mock import patch
+import pandas as pd
+from dfs.extdata.bsbr import scrape_bsbr, starters
+
+def gamelog(dates, values, entered=None):
+  df = pd.DataFrame({'Tm': 'NYY', 'H': values}, index=pd.to_datetime(dates))
+  if entered is not None:
+    df['Entered'] = entered
+  return df
+
+def starts(index):
+  return sorted((day.strftime('%Y-%m-%d'), pitcher) for (_, day, _), pitcher in index.iteritems())
+
+class GamelogStoreIOTest(TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.patches = [patch('dfs.extdata.bsbr.scrape_bsbr.datadir', self.tmpdir),
+                    patch('dfs.extdata.bsbr.starters.starters_file', os.path.join(self.tmpdir, 'starters.pickle'))]
+    for p in self.patches:
+      p.start()
+    starters.load_starting_pitcher_index.reset()
+    self.batting = {'judgeaa01': gamelog(['2015-04-02 00:00', '2014-05-01 00:00'], [2, 1]),
+                    'ruthba01': gamelog(['2015-04-02 00:00'], [3])}
+    self.pitching = {'ruthba01': gamelog(['2014-06-01 00:00'], [4], ['1-t']),
+                     'gehrilo01': gamelog(['2014-06-02 00:00', '2014-06-03 00:00'], [1, 2], ['1-b', '6-t'])}
+    os.makedirs(os.path.join(self.tmpdir, 'player_data'))
+    for data_type, gamelogs in [('batting', self.batting), ('pitching', self.pitching)]:
+      for bref_id, df in gamelogs.items():
+        with open(scrape_bsbr.get_attr_filename(bref_id, data_type), 'wb') as outf:
+          pickle.dump(df, outf)
+
+  def tearDown(self):
+    for p in self.patches:
+      p.stop()
+    starters.load_starting_pitcher_index.reset()
+    shutil.rmtree(self.tmpdir)
+
+  def test_migrate_cli(self):
+    with patch.object(sys, 'argv', ['bsbr-migrate-gamelogs']):
+      scrape_bsbr.migrate_cli()
+    for data_type, gamelogs in [('batting', self.batting), ('pitching', self.pitching)]:
+      loaded = scrape_bsbr.get_gamelog_store(data_type).gamelogs()
+      self.assertEqual(sorted(gamelogs), sorted(loaded))
+      for bref_id, df in gamelogs.items():
+        self.assertTrue(df.sort_index().equals(loaded[bref_id]))
+    self.assertEqual([('2014-06-01', 'ruthba01'), ('2014-06-02', 'gehrilo01')],
+                     starts(starters.load_starting_pitcher_index()))
+
+  def test_save_load(self):
+    players = {'judgeaa01': {'batting': gamelog(['2015-04-03 00:00'], [0])},
+               'ruthba01': {'pitching': gamelog(['2014-06-01 00:00', '2014-06-05 00:00'], [5, 6], ['1-t', '1-b'])}}
+    # The first save moves the pickled gamelogs into the stores, then adds the new games
+    scrape_bsbr.save_dataframes(players)
+    loaded = scrape_bsbr.load_dataframes({'judgeaa01': {}, 'ruthba01': {}})
+    self.assertEqual([1, 2, 0], list(loaded['judgeaa01']['batting']['H']))
+    self.assertNotIn('pitching', loaded['judgeaa01'])
+    self.assertEqual([3], list(loaded['ruthba01']['batting']['H']))
+    self.assertEqual([5, 6], list(loaded['ruthba01']['pitching']['H']))
+    # The batch's starts are added, and other pitchers' starts are kept
+    self.assertEqual([('2014-06-01', 'ruthba01'), ('2014-06-02', 'gehrilo01'), ('2014-06-05', 'ruthba01')],
+                     starts(starters.load_starting_pitcher_index()))
+    # Overwriting a pitcher's gamelog drops starts it no longer has
+    scrape_bsbr.save_dataframes({'ruthba01': {'pitching': gamelog(['2014-06-05 00:00'], [6], ['1-b'])}},
+                                overwrite=True)
+    self.assertEqual([('2014-06-02', 'gehrilo01'), ('2014-06-05', 'ruthba01')],
+                     starts(starters.load_starting_pitcher_index()))
@@ -0,0 +1,42 @@
+import datetime
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+from dfs.extdata.bsbr import starters
+from dfs.extdata.bsbr.starters import build_starting_pitcher_index, starting_pitcher
+
+def gamelog(dates, teams, entered):
+  return pd.DataFrame({'Tm': teams, 'Entered': entered}, index=pd.to_datetime(dates))
+
+class StartersTest(TestCase):
+  def setUp(self):
+    self.gamelogs = {
+      # Started both halves of a doubleheader (game numbers are encoded as hours)
+      'starter01': gamelog(['2015-06-01 00:00', '2015-06-07 01:00', '2015-06-07 02:00'], ['NYY', 'NYY', 'NYY'],
+                           ['1-t', ' 1-b', '1-t']),
+      'relief01': gamelog(['2015-06-01', '2015-06-02'], ['NYY', 'NYY'], ['7-b', '8-t']),
+      # Rows without a date (trades, say) are skipped
+      'starter02': gamelog(['2015-06-02', '2015-06-03', None], ['SFG', 'SFG', 'SFG'], ['1-b', np.nan, '1-t']),
+      'batter01': None,
+    }
+    self.index = build_starting_pitcher_index(self.gamelogs)
+    self.real_loader = starters.load_starting_pitcher_index
+    starters.load_starting_pitcher_index = lambda: self.index
+
+  def tearDown(self):
+    starters.load_starting_pitcher_index = self.real_loader
+
+  def test_build_index(self):
+    self.assertEqual(len(self.index), 4)
+    self.assertEqual(self.index.loc[('NYY', pd.Timestamp('2015-06-07'), 2)], 'starter01')
+    self.assertEqual(self.index.loc[('SFG', pd.Timestamp('2015-06-02'), 0)], 'starter02')
+
+  def test_starting_pitcher(self):
+    self.assertEqual(starting_pitcher('NYY', datetime.datetime(2015, 6, 1)), 'starter01')
+    self.assertEqual(starting_pitcher('NYY', datetime.datetime(2015, 6, 7, 2)), 'starter01')
+    # A plain date on a doubleheader day means the first game
+    self.assertEqual(starting_pitcher('NYY', datetime.datetime(2015, 6, 7)), 'starter01')
+    # Other people's TLAs work too
+    self.assertEqual(starting_pitcher('SF', datetime.datetime(2015, 6, 2)), 'starter02')
+    self.assertIsNone(starting_pitcher('SFG', datetime.datetime(2015, 6, 3)))
+    self.assertIsNone(starting_pitcher('BOS', datetime.datetime(2015, 6, 1)))
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from mock import patch
+import numpy as np
+import pandas as pd
+from dfs.extdata.numberfire import io
+from dfs.extdata.numberfire.utils import get_histplayerinfo_filename
+
+def predictions(dates, points, minutes):
+  return pd.DataFrame({'date': pd.to_datetime(dates), 'pts': points, 'min': minutes}, columns=['date', 'pts', 'min'])
+
+class NFTableTest(TestCase):
+  def setUp(self):
+    self.tempdir = tempfile.mkdtemp()
+    self.patch = patch('dfs.extdata.numberfire.utils.nf_data_dir', os.path.join(self.tempdir, '{sport}'))
+    self.patch.start()
+    os.makedirs(os.path.join(self.tempdir, 'nba', 'player_predictions'))
+    self.saved = {'jamesle01': predictions(['2015-11-01', '2015-11-03'], [25.0, 30.0], [36.0, 38.0]),
+                  # Scraped twice for the 5th
+                  'curryst01': predictions(['2015-11-01', '2015-11-05', '2015-11-05'], [28.0, 31.0, 33.0],
+                                           [34.0, 35.0, 36.0]),
+                  # Scraped before the columns we need were published
+                  'duncati01': pd.DataFrame({'date': pd.to_datetime(['2015-11-01']), 'pts': [12.0]})}
+    for bref_id, df in self.saved.items():
+      df.to_pickle(get_histplayerinfo_filename('nba', bref_id))
+    self.data = pd.DataFrame({'bref_id': ['jamesle01', 'curryst01', 'jamesle01', 'curryst01', 'bryanko01',
+                                          'duncati01', 'jamesle01'],
+                              'date': pd.to_datetime(['2015-11-03', '2015-11-01', '2015-11-02', '2015-11-05',
+                                                      '2015-11-01', '2015-11-01', '2015-11-01'])},
+                             index=[10, 20, 30, 40, 50, 60, 70])
+
+  def tearDown(self):
+    self.patch.stop()
+    shutil.rmtree(self.tempdir)
+
+  def row_lookup(self, row, columns):
+    # What the per-row featurizers did: each player's own frame, indexed by date
+    player_data = io.load_nf_histplayerinfo('nba', [row['bref_id']]).get(row['bref_id'])
+    if player_data is None or any(column not in player_data for column in columns) \
+        or row['date'] not in player_data.index:
+      return [np.nan] * len(columns)
+    # With more than one scrape for a date, the last one is the current one
+    return list(player_data.loc[[row['date']], columns].iloc[-1])
+
+  def test_load_table(self):
+    table = io.load_nf_table('nba', list(self.data['bref_id']), required_columns=['pts', 'min'])
+    self.assertEqual(['identifier', 'date'], list(table.index.names))
+    self.assertEqual(['curryst01', 'jamesle01'], sorted(set(table.index.get_level_values('identifier'))))
+    self.assertFalse(table.index.duplicated().any())
+    self.assertEqual(33.0, table.loc[('curryst01', pd.Timestamp('2015-11-05')), 'pts'])
+
+  def test_lookup_matches_rows(self):
+    columns = ['pts', 'min']
+    table = io.load_nf_table('nba', list(self.data['bref_id']), required_columns=columns)
+    found = io.lookup_nf_table(self.data, table, 'bref_id', 'date', columns)
+    self.assertEqual(list(self.data.index), list(found.index))
+    expected = pd.DataFrame([self.row_lookup(row, columns) for _, row in self.data.iterrows()],
+                            index=self.data.index, columns=columns)
+    self.assertTrue(expected.equals(found))
+    # Unknown player, a date with no prediction, and a player without the columns all come back empty
+    self.assertTrue(found.loc[[30, 50, 60]].isnull().all().all())
+
+  def test_lookup_empty_table(self):
+    table = io.load_nf_table('nba', ['bryanko01'], required_columns=['pts'])
+    found = io.lookup_nf_table(self.data, table, 'bref_id', 'date', ['pts'])
+    self.assertEqual(list(self.data.index), list(found.index))
+    self.assertTrue(found['pts'].isnull().all())
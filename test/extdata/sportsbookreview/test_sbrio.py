@@ -0,0 +1,57 @@
+import datetime
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+from dfs.extdata.sportsbookreview import sbrio
+from dfs.extdata.sportsbookreview.sbrio import load_sbr_odds_table, lookup_sbr_odds
+
+def day_odds(teams, odds, runlines):
+  df = pd.DataFrame({'Team': teams, 'odds': odds, 'runline': runlines})
+  return df.set_index('Team', drop=True)
+
+class SbrOddsTableTest(TestCase):
+  def setUp(self):
+    self.tempdir = tempfile.mkdtemp()
+    self.real_data_dir = sbrio.sbr_data_dir
+    sbrio.sbr_data_dir = os.path.join(self.tempdir, '{sport}')
+    os.makedirs(os.path.join(self.tempdir, 'mlb'))
+    # NYY play a doubleheader on the 2nd
+    sbrio.save_sbr_odds_info('mlb', datetime.datetime(2015, 6, 1), day_odds(['NYY', 'BOS'], [0.6, 0.4], [8.0, 8.0]))
+    sbrio.save_sbr_odds_info('mlb', datetime.datetime(2015, 6, 2), day_odds(['NYY', 'TOR', 'NYY', 'TOR'],
+                                                                            [0.55, 0.45, 0.5, 0.5],
+                                                                            [9.0, 9.0, 7.5, 7.5]))
+    self.data = pd.DataFrame({'Tm': ['NYY', 'BOS', 'NYY', 'NYY', 'NYY', 'SFG', 'NYY'],
+                              'Date': pd.to_datetime(['2015-06-01 00:00', '2015-06-01 00:00', '2015-06-02 00:00',
+                                                      '2015-06-02 01:00', '2015-06-02 02:00', '2015-06-02 00:00',
+                                                      '2015-06-03 00:00'])},
+                             index=[10, 20, 30, 40, 50, 60, 70])
+
+  def tearDown(self):
+    sbrio.sbr_data_dir = self.real_data_dir
+    shutil.rmtree(self.tempdir)
+
+  def test_load_table(self):
+    table, missing_days = load_sbr_odds_table('mlb', self.data['Date'])
+    self.assertEqual([datetime.date(2015, 6, 3)], missing_days)
+    self.assertEqual(6, len(table))
+    self.assertEqual([0, 0, 0, 0, 1, 1], list(table['game']))
+
+  def test_lookup(self):
+    table, missing_days = load_sbr_odds_table('mlb', self.data['Date'])
+    found, listed = lookup_sbr_odds(self.data, table, 'Tm', 'Date', ['odds', 'runline'], game_by_hour=True)
+    self.assertTrue(found.index.equals(self.data.index))
+    self.assertEqual([True, True, True, True, True, False, False], list(listed))
+    # Doubleheader listings are picked by the date's hour; there is no third listing for game 2
+    np.testing.assert_array_equal([0.6, 0.4, 0.55, 0.5, np.nan, np.nan, np.nan], found['odds'].values)
+    found, listed = lookup_sbr_odds(self.data, table, 'Tm', 'Date', ['runline'])
+    np.testing.assert_array_equal([8.0, 8.0, 9.0, 9.0, 9.0, np.nan, np.nan], found['runline'].values)
+
+  def test_no_odds(self):
+    table, missing_days = load_sbr_odds_table('nba', self.data['Date'])
+    self.assertEqual(3, len(missing_days))
+    found, listed = lookup_sbr_odds(self.data, table, 'Tm', 'Date', ['odds'])
+    self.assertFalse(listed.any())
+    self.assertTrue(found['odds'].isnull().all())
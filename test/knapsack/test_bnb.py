@@ -0,0 +1,62 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+from dfs.knapsack.bnb import solve_constrained
+from dfs.knapsack.exact import solve_exact
+from dfs.knapsack.knapsack import NotSolvableError
+
+class BranchAndBoundTest(TestCase):
+  def setUp(self):
+    self.df = pd.DataFrame([[1, 1, 'A', 'red'],
+                            [2, 4, 'A', 'red'],
+                            [2, 2.5, 'A', 'blue'],
+                            [1, 1, 'B', 'blue'],
+                            [2, 5, 'B', 'red'],
+                            [2, 4, 'B', 'blue'],
+                            [1, 1, 'C', 'red'],
+                            [3, 6, 'C', 'red'],
+                            [3, 4.4, 'C', 'blue']],
+                           columns=['cost', 'value', 'color', 'team'])
+    self.required = {'A': 1, 'B': 1, 'C': 1}
+
+  def test_unconstrained_matches_exact(self):
+    for cap in range(3, 9):
+      self.assertItemsEqual(solve_constrained(self.df, 'cost', 'value', 'color', self.required, cap),
+                            solve_exact(self.df, 'cost', 'value', 'color', self.required, cap))
+
+  def test_group_limit(self):
+    self.assertItemsEqual(solve_constrained(self.df, 'cost', 'value', 'color', self.required, 7), [1, 4, 7])
+    # All-red lineup is no longer legal, so the best legal lineup mixes in a blue item
+    self.assertItemsEqual(solve_constrained(self.df, 'cost', 'value', 'color', self.required, 7,
+                                            group_column='team', max_per_group=2), [1, 5, 7])
+    self.assertRaises(NotSolvableError, solve_constrained, self.df, 'cost', 'value', 'color', {'A': 3}, 10,
+                      group_column='team', max_per_group=1)
+
+  def test_column_constraints(self):
+    self.df['blue'] = (self.df['team'] == 'blue').astype(int)
+    self.assertItemsEqual(solve_constrained(self.df, 'cost', 'value', 'color', self.required, 7,
+                                            constraints=[('blue', 2, None)]), [2, 5, 7])
+    self.assertItemsEqual(solve_constrained(self.df, 'cost', 'value', 'color', self.required, 7,
+                                            constraints=[('blue', None, 0)]), [1, 4, 7])
+
+  def test_large_slate(self):
+    rng = np.random.RandomState(0)
+    positions = {'PG': 2, 'SG': 2, 'SF': 2, 'PF': 2, 'C': 1}
+    data = pd.DataFrame({'salary': rng.randint(35, 110, 300) * 100,
+                         'pos': rng.choice(sorted(positions), 300),
+                         'Tm': rng.choice(['T%d' % i for i in range(4)], 300)})
+    data['predicted'] = data['salary'] / 250.0 + rng.normal(0, 6, 300)
+    lineup = solve_constrained(data, 'salary', 'predicted', 'pos', positions, 60000,
+                               group_column='Tm', max_per_group=3)
+    self.assertLessEqual(data.loc[lineup, 'salary'].sum(), 60000)
+    self.assertLessEqual(data.loc[lineup, 'Tm'].value_counts().max(), 3)
+    self.assertEqual(data.loc[lineup, 'pos'].value_counts().to_dict(), positions)
+
+  def test_locked(self):
+    self.assertItemsEqual(solve_constrained(self.df, 'cost', 'value', 'color', self.required, 7, locked=[0]),
+                          [0, 4, 7])
+    # The locked item counts towards its team's limit
+    self.assertItemsEqual(solve_constrained(self.df, 'cost', 'value', 'color', self.required, 7,
+                                            group_column='team', max_per_group=2, locked=[0]), [0, 5, 7])
+    self.assertRaises(NotSolvableError, solve_constrained, self.df, 'cost', 'value', 'color', self.required, 7,
+                      locked=[0, 1])
@@ -0,0 +1,49 @@
+from unittest import TestCase
+from dfs.knapsack.candidates import CandidateTable
+from dfs.knapsack.exact import solve_exact
+from dfs.knapsack.heuristics import best_vorp
+import numpy as np
+import pandas as pd
+
+class CandidateTableTest(TestCase):
+  def setUp(self):
+    self.df = pd.DataFrame([[10, 1.0, 'A', 'x'],
+                            [20, 2.5, 'A', 'y'],
+                            [10, 1.0, 'B', 'x'],
+                            [30, 3.0, 'B', 'y'],
+                            [10, 1.5, 'C', 'x'],
+                            [40, 5.0, 'C', 'z'],],
+                           columns=['cost', 'value', 'color', 'team'],
+                           index=['a1', 'a2', 'b1', 'b2', 'c1', 'c2'])
+    self.table = CandidateTable.from_frame(self.df, 'cost', 'value', 'color', group_column='team')
+
+  def test_from_frame(self):
+    self.assertEqual(len(self.table), 6)
+    self.assertEqual(self.table.costs.dtype, np.int32)
+    self.assertEqual(self.table.values.dtype, np.float64)
+    self.assertEqual(self.table.type_codes.dtype, np.int8)
+    self.assertItemsEqual(self.table.types, ['A', 'B', 'C'])
+    self.assertItemsEqual(self.table.groups, ['x', 'y', 'z'])
+    self.assertEqual(self.table.type_of(3), 'B')
+    self.assertEqual(list(self.table.positions_of_type('C')), [4, 5])
+    self.assertEqual(list(self.table.positions_of_type('D')), [])
+    self.assertEqual(self.table.solution_ids([0, 5]), ['a1', 'c2'])
+
+  def test_take(self):
+    sub = self.table.take(self.table.costs < 30)
+    self.assertEqual(list(sub.ids), ['a1', 'a2', 'b1', 'c1'])
+    self.assertEqual(sub.types, self.table.types)
+    self.assertEqual(sub.type_of(2), 'B')
+
+  def test_solvers_accept_table(self):
+    required_colors = {'A': 1, 'B': 1, 'C': 1}
+    for cap in [30, 50, 70, 90]:
+      self.assertItemsEqual(solve_exact(self.table, None, None, None, required_colors, cap),
+                            solve_exact(self.df, 'cost', 'value', 'color', required_colors, cap))
+      self.assertItemsEqual(best_vorp(self.table, None, None, None, required_colors, cap),
+                            best_vorp(self.df, 'cost', 'value', 'color', required_colors, cap))
+
+  def test_with_values(self):
+    reweighted = self.table.with_values(self.table.values[::-1])
+    self.assertItemsEqual(solve_exact(self.table, None, None, None, {'A': 1, 'C': 1}, 60), ['a2', 'c2'])
+    self.assertItemsEqual(solve_exact(reweighted, None, None, None, {'A': 1, 'C': 1}, 60), ['a1', 'c1'])
@@ -0,0 +1,41 @@
+from unittest import TestCase
+from dfs.knapsack.dominance import find_dominated, prune_dominated
+from dfs.knapsack.candidates import CandidateTable
+import pandas as pd
+
+class DominanceTest(TestCase):
+  def setUp(self):
+    self.df = pd.DataFrame([[10, 5, 'A', 'x'],
+                            [10, 4, 'A', 'y'],
+                            [20, 3, 'A', 'x'],
+                            [30, 6, 'A', 'x'],
+                            [20, 4, 'A', 'y'],
+                            [10, 1, 'B', 'x'],
+                            [20, 1, 'B', 'y'],
+                            [30, 2, 'C', 'x'],],
+                           columns=['cost', 'value', 'color', 'team'])
+
+  def test_dominated(self):
+    # row 2 is beaten by rows 0 and 1 (and 4), row 4 only by row 0, row 6 ties row 5 and C isn't required
+    self.assertEqual(list(find_dominated(self.df, 'cost', 'value', 'color', {'A': 2, 'B': 1})),
+                     [False, False, True, False, False, False, False, True])
+    self.assertEqual(list(find_dominated(self.df, 'cost', 'value', 'color', {'A': 1, 'B': 1})),
+                     [False, True, True, False, True, False, False, True])
+
+  def test_equal_costs(self):
+    # players at the same cost dominate each other
+    self.assertEqual(list(find_dominated(self.df, 'cost', 'value', 'color', {'A': 1, 'B': 1, 'C': 1}))[:2],
+                     [False, True])
+
+  def test_team_aware(self):
+    # only same-team dominators count, and we never need more than max_per_group of them
+    self.assertEqual(list(find_dominated(self.df, 'cost', 'value', 'color', {'A': 2, 'B': 1, 'C': 1}, 'team', 1)),
+                     [False, False, True, False, False, False, False, False])
+    self.assertEqual(list(find_dominated(self.df, 'cost', 'value', 'color', {'A': 2, 'B': 1, 'C': 1}, 'team', 2)),
+                     [False, False, False, False, False, False, False, False])
+
+  def test_prune(self):
+    required_colors = {'A': 1, 'B': 1}
+    self.assertEqual(list(prune_dominated(self.df, 'cost', 'value', 'color', required_colors).index), [0, 3, 5, 6])
+    table = CandidateTable.from_frame(self.df, 'cost', 'value', 'color')
+    self.assertEqual(list(prune_dominated(table, None, None, None, required_colors).ids), [0, 3, 5, 6])
@@ -0,0 +1,78 @@
+from unittest import TestCase
+from itertools import combinations, product
+import numpy as np
+import pandas as pd
+from dfs.knapsack.exact import solve_exact, solve_all, _reduce_problem
+from dfs.knapsack.candidates import CandidateTable
+from dfs.knapsack.knapsack import NotSolvableError
+
+class ExactKnapsackTest(TestCase):
+  def setUp(self):
+    self.df1 = pd.DataFrame([[1, 1, 'A'],
+                             [2, 2, 'A'],
+                             [1, 1, 'B'],
+                             [3, 3, 'B'],
+                             [1, 1, 'C'],
+                             [4, 5, 'C'],],
+                            columns=['cost', 'value', 'color'])
+    self.gcd_df = pd.DataFrame([[10, 1, 'A'],
+                                [20, 2, 'A'],
+                                [10, 1, 'B'],
+                                [30, 3, 'B'],
+                                [10, 1, 'C'],
+                                [40, 5, 'C'],],
+                               columns=['cost', 'value', 'color'])
+
+  def test_unsatisfiable_types(self):
+    self.assertRaises(NotSolvableError, solve_exact, self.df1, 'cost', 'value', 'color', {'A': 3}, 3)
+    self.assertRaises(NotSolvableError, solve_exact, self.df1, 'cost', 'value', 'color', {'D': 1}, 3)
+    self.assertRaises(NotSolvableError, solve_exact, self.df1, 'cost', 'value', 'color', {'A': 1, 'B': 1}, 1)
+
+  def test_reduced_problem_types(self):
+    # Slot bounds feed range() in the dynamic program, so they must be integers whatever numpy's np.full defaults to
+    table = CandidateTable.from_frame(self.gcd_df, 'cost', 'value', 'color')
+    order, costs, values, starts, ends, n_slots, reduced_cap, gcd_cost = _reduce_problem(table, {'A': 1, 'C': 2}, 70)
+    self.assertEqual('i', starts.dtype.kind)
+    self.assertEqual('i', ends.dtype.kind)
+    self.assertEqual('i', costs.dtype.kind)
+    self.assertEqual([0, 1, 4, 5], list(order))
+    self.assertEqual([0, 0, 1, 1], list(starts))
+    self.assertEqual([1, 1, 3, 3], list(ends))
+    self.assertEqual((3, 7, 10), (n_slots, reduced_cap, gcd_cost))
+
+  def test_increasing_space(self):
+    required_colors = {'A': 1, 'B': 1, 'C': 1}
+    self.assertItemsEqual(solve_exact(self.df1, 'cost', 'value', 'color', required_colors, 3), [0, 2, 4])
+    self.assertItemsEqual(solve_exact(self.df1, 'cost', 'value', 'color', required_colors, 4), [1, 2, 4])
+    self.assertItemsEqual(solve_exact(self.df1, 'cost', 'value', 'color', required_colors, 5), [0, 3, 4])
+    self.assertItemsEqual(solve_exact(self.df1, 'cost', 'value', 'color', required_colors, 6), [0, 2, 5])
+    self.assertItemsEqual(solve_exact(self.df1, 'cost', 'value', 'color', required_colors, 7), [1, 2, 5])
+    self.assertItemsEqual(solve_exact(self.df1, 'cost', 'value', 'color', required_colors, 8), [0, 3, 5])
+    self.assertItemsEqual(solve_exact(self.df1, 'cost', 'value', 'color', required_colors, 9), [1, 3, 5])
+    self.assertItemsEqual(solve_exact(self.df1, 'cost', 'value', 'color', required_colors, 10), [1, 3, 5])
+
+  def test_solve_all_cost_levels(self):
+    required_colors = {'A': 1, 'B': 1, 'C': 1}
+    solutions = solve_all(self.gcd_df, 'cost', 'value', 'color', required_colors, 90)
+    self.assertItemsEqual(solutions.keys(), [30, 40, 50, 60, 70, 80, 90])
+    self.assertItemsEqual(solutions[30], [0, 2, 4])
+    self.assertItemsEqual(solutions[90], [1, 3, 5])
+
+  def test_matches_brute_force(self):
+    rng = np.random.RandomState(0)
+    required = {'X': 2, 'Y': 1, 'Z': 1}
+    for trial in range(20):
+      data = pd.DataFrame({'cost': rng.randint(1, 8, 14) * 100,
+                           'value': rng.rand(14) * 10,
+                           'pos': ['X'] * 6 + ['Y'] * 4 + ['Z'] * 4})
+      # Make sure every cap below has at least one satisfying set
+      data.loc[[0, 1, 6, 10], 'cost'] = 100
+      for cap in [1000, 1500, 2500]:
+        best_value = max(data.loc[list(x) + list(y) + list(z), 'value'].sum()
+                         for x, y, z in product(combinations(range(6), 2),
+                                                combinations(range(6, 10), 1),
+                                                combinations(range(10, 14), 1))
+                         if data.loc[list(x) + list(y) + list(z), 'cost'].sum() <= cap)
+        solution = solve_exact(data, 'cost', 'value', 'pos', required, cap)
+        self.assertLessEqual(data.loc[solution, 'cost'].sum(), cap)
+        self.assertAlmostEqual(data.loc[solution, 'value'].sum(), best_value)
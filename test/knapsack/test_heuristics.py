@@ -0,0 +1,46 @@
+from unittest import TestCase
+from dfs.knapsack.heuristics import best_vorp, greedy_upgrade
+from dfs.knapsack.exact import solve_exact
+from dfs.knapsack.bnb import solve_constrained
+from dfs.knapsack.knapsack import NotSolvableError
+import numpy as np
+import pandas as pd
+
+class HeuristicsTest(TestCase):
+  def setUp(self):
+    rng = np.random.RandomState(0)
+    self.required_types = {'A': 2, 'B': 2, 'C': 1}
+    costs = rng.randint(3, 12, 120) * 100
+    self.data = pd.DataFrame({'cost': costs,
+                              'value': costs / 100.0 + rng.randn(120) * 2,
+                              'color': rng.choice(['A', 'B', 'C'], 120),
+                              'team': rng.choice(['x', 'y', 'z', 'w'], 120)})
+
+  def test_greedy_upgrade(self):
+    for cap in [2000, 3000, 4000, 5000]:
+      greedy = greedy_upgrade(self.data, 'cost', 'value', 'color', self.required_types, cap)
+      vorp = best_vorp(self.data, 'cost', 'value', 'color', self.required_types, cap)
+      exact = solve_exact(self.data, 'cost', 'value', 'color', self.required_types, cap)
+      self.assertEqual(len(greedy), 5)
+      self.assertLessEqual(self.data.loc[greedy, 'cost'].sum(), cap)
+      self.assertEqual(sorted(self.data.loc[greedy, 'color']), ['A', 'A', 'B', 'B', 'C'])
+      self.assertGreaterEqual(self.data.loc[greedy, 'value'].sum(), self.data.loc[vorp, 'value'].sum() - 1e-9)
+      self.assertLessEqual(self.data.loc[greedy, 'value'].sum(), self.data.loc[exact, 'value'].sum() + 1e-9)
+
+  def test_greedy_group_limit(self):
+    for cap in [2000, 3000, 4000, 5000]:
+      greedy = greedy_upgrade(self.data, 'cost', 'value', 'color', self.required_types, cap, group_column='team',
+                              max_per_group=2)
+      exact = solve_constrained(self.data, 'cost', 'value', 'color', self.required_types, cap, 'team', 2)
+      self.assertLessEqual(self.data.loc[greedy, 'team'].value_counts().max(), 2)
+      self.assertLessEqual(self.data.loc[greedy, 'cost'].sum(), cap)
+      self.assertEqual(sorted(self.data.loc[greedy, 'color']), ['A', 'A', 'B', 'B', 'C'])
+      self.assertLessEqual(self.data.loc[greedy, 'value'].sum(), self.data.loc[exact, 'value'].sum() + 1e-9)
+      self.assertGreaterEqual(self.data.loc[greedy, 'value'].sum(), 0.9 * self.data.loc[exact, 'value'].sum())
+    # Only one team to pick from, so no lineup keeps to the limit
+    self.assertRaises(NotSolvableError, greedy_upgrade, self.data.assign(team='x'), 'cost', 'value', 'color',
+                      self.required_types, 5000, group_column='team', max_per_group=2)
+
+  def test_unsolvable(self):
+    self.assertRaises(NotSolvableError, greedy_upgrade, self.data, 'cost', 'value', 'color', {'D': 1}, 5000)
+    self.assertRaises(NotSolvableError, greedy_upgrade, self.data, 'cost', 'value', 'color', self.required_types, 1000)
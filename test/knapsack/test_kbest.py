@@ -0,0 +1,43 @@
+from unittest import TestCase
+from itertools import combinations, product
+import numpy as np
+import pandas as pd
+from dfs.knapsack.kbest import solve_k_best
+from dfs.knapsack.bnb import solve_constrained
+
+class KBestTest(TestCase):
+  def setUp(self):
+    rng = np.random.RandomState(0)
+    self.required = {'X': 2, 'Y': 1, 'Z': 1}
+    self.data = pd.DataFrame({'cost': rng.randint(1, 6, 14) * 100,
+                              'value': rng.rand(14) * 10,
+                              'pos': ['X'] * 6 + ['Y'] * 4 + ['Z'] * 4,
+                              'team': rng.choice(['a', 'b'], 14)})
+    self.cap = 1400
+    self.all_lineups = []
+    for x, y, z in product(combinations(range(6), 2), range(6, 10), range(10, 14)):
+      lineup = list(x) + [y, z]
+      if self.data.loc[lineup, 'cost'].sum() <= self.cap:
+        self.all_lineups.append((self.data.loc[lineup, 'value'].sum(), frozenset(lineup)))
+    self.all_lineups.sort(key=lambda entry: -entry[0])
+
+  def test_best_first(self):
+    lineups = solve_k_best(self.data, 'cost', 'value', 'pos', self.required, self.cap, 10)
+    self.assertEqual([frozenset(lineup) for lineup in lineups], [lineup for _, lineup in self.all_lineups[:10]])
+    self.assertItemsEqual(lineups[0], solve_constrained(self.data, 'cost', 'value', 'pos', self.required, self.cap))
+
+  def test_min_unique(self):
+    expected = []
+    for _, lineup in self.all_lineups:
+      if all(len(lineup & other) <= 2 for other in expected):
+        expected.append(lineup)
+    lineups = solve_k_best(self.data, 'cost', 'value', 'pos', self.required, self.cap, 5, min_unique=2)
+    self.assertEqual([frozenset(lineup) for lineup in lineups], expected[:5])
+
+  def test_runs_out_of_lineups(self):
+    lineups = solve_k_best(self.data, 'cost', 'value', 'pos', self.required, self.cap, 10000)
+    self.assertEqual(len(lineups), len(self.all_lineups))
+    lineups = solve_k_best(self.data, 'cost', 'value', 'pos', self.required, self.cap, 10000,
+                           group_column='team', max_per_group=2)
+    for lineup in lineups:
+      self.assertLessEqual(self.data.loc[lineup, 'team'].value_counts().max(), 2)
@@ -0,0 +1,53 @@
+from unittest import TestCase
+from mock import patch
+from dfs.knapsack import portfolio
+from dfs.knapsack.portfolio import solve_portfolio
+from dfs.knapsack.bnb import solve_constrained
+from dfs.knapsack.knapsack import NotSolvableError
+import numpy as np
+import pandas as pd
+
+class PortfolioTest(TestCase):
+  def setUp(self):
+    rng = np.random.RandomState(0)
+    self.required_types = {'A': 2, 'B': 2, 'C': 1}
+    costs = rng.randint(3, 12, 150) * 100
+    self.data = pd.DataFrame({'cost': costs,
+                              'value': costs / 100.0 + rng.randn(150) * 2,
+                              'color': rng.choice(['A', 'B', 'C'], 150),
+                              'team': rng.choice(['x', 'y', 'z'], 150)})
+
+  def test_portfolio(self):
+    exact = solve_constrained(self.data, 'cost', 'value', 'color', self.required_types, 4000, 'team', 2)
+    lineup, gap = solve_portfolio(self.data, 'cost', 'value', 'color', self.required_types, 4000, 30,
+                                  group_column='team', max_per_group=2)
+    self.assertEqual(gap, 0)
+    self.assertAlmostEqual(self.data.loc[lineup, 'value'].sum(), self.data.loc[exact, 'value'].sum())
+    self.assertLessEqual(self.data.loc[lineup, 'team'].value_counts().max(), 2)
+
+  def test_heuristics_only(self):
+    exact = solve_constrained(self.data, 'cost', 'value', 'color', self.required_types, 4000)
+    lineup, gap = solve_portfolio(self.data, 'cost', 'value', 'color', self.required_types, 4000, 30,
+                                  strategies=['vorp', 'greedy'])
+    self.assertEqual(gap, np.inf)
+    self.assertLessEqual(self.data.loc[lineup, 'value'].sum(), self.data.loc[exact, 'value'].sum() + 1e-9)
+
+  def test_heuristics_group_limit(self):
+    # Without the limit, greedy_upgrade's best lineup at this cap has three players from one team
+    exact = solve_constrained(self.data, 'cost', 'value', 'color', self.required_types, 5000, 'team', 2)
+    lineup, gap = solve_portfolio(self.data, 'cost', 'value', 'color', self.required_types, 5000, 30,
+                                  group_column='team', max_per_group=2, strategies=['greedy'])
+    self.assertEqual(gap, np.inf)
+    self.assertLessEqual(self.data.loc[lineup, 'team'].value_counts().max(), 2)
+    self.assertLessEqual(self.data.loc[lineup, 'value'].sum(), self.data.loc[exact, 'value'].sum() + 1e-9)
+
+  def test_unsolvable(self):
+    self.assertRaises(NotSolvableError, solve_portfolio, self.data, 'cost', 'value', 'color', {'D': 1}, 4000, 30)
+
+  def test_failed_strategy(self):
+    # A branch and bound worker that crashes hasn't proven anything; the failure comes back instead of a gap of 0
+    with patch.object(portfolio, '_reduce_problem', side_effect=MemoryError('no room for the bound table')):
+      with self.assertRaises(RuntimeError) as raised:
+        solve_portfolio(self.data, 'cost', 'value', 'color', self.required_types, 4000, 30)
+    self.assertIn('bnb', str(raised.exception))
+    self.assertIn('no room for the bound table', str(raised.exception))
@@ -0,0 +1,58 @@
+from unittest import TestCase
+from dfs.knapsack.session import OptimizerSession
+from dfs.knapsack.bnb import solve_constrained
+from dfs.knapsack.knapsack import NotSolvableError
+import numpy as np
+import pandas as pd
+
+class OptimizerSessionTest(TestCase):
+  def setUp(self):
+    rng = np.random.RandomState(0)
+    self.required_types = {'A': 2, 'B': 1, 'C': 2}
+    self.data = pd.DataFrame({'cost': rng.randint(1, 12, 80) * 100,
+                              'value': rng.rand(80) * 10,
+                              'color': rng.choice(['A', 'B', 'C', 'D'], 80),
+                              'team': rng.choice(['x', 'y', 'z'], 80)})
+    self.rng = rng
+
+  def assertOptimal(self, session, max_per_group=None):
+    data = self.data[session.available]
+    locked = list(np.flatnonzero(session.locked))
+    expected = solve_constrained(data, 'cost', 'value', 'color', self.required_types, 3000,
+                                 group_column='team', max_per_group=max_per_group, locked=locked)
+    lineup = session.solve()
+    self.assertAlmostEqual(self.data.loc[lineup, 'value'].sum(), self.data.loc[expected, 'value'].sum())
+    self.assertLessEqual(self.data.loc[lineup, 'cost'].sum(), 3000)
+    self.assertTrue(set(locked) <= set(lineup))
+    self.assertTrue(session.available[lineup].all())
+
+  def test_changes(self):
+    session = OptimizerSession(self.data, 'cost', 'value', 'color', self.required_types, 3000)
+    self.assertOptimal(session)
+    best = session.solve()
+    session.remove_player(best[0])
+    self.assertOptimal(session)
+    session.restore_player(best[0])
+    self.assertItemsEqual(session.solve(), best)
+    for item in self.rng.choice(80, 10):
+      value = self.rng.rand() * 10
+      session.set_value(item, value)
+      self.data.loc[item, 'value'] = value
+      self.assertOptimal(session)
+    for item, cost in [(3, 200), (10, 1100), (20, 150)]:
+      session.set_cost(item, cost)
+      self.data.loc[item, 'cost'] = cost
+      self.assertOptimal(session)
+
+  def test_locks(self):
+    session = OptimizerSession(self.data, 'cost', 'value', 'color', self.required_types, 3000, 'team', 2)
+    self.assertOptimal(session, 2)
+    session.lock_player(int(np.flatnonzero(self.data['color'] == 'B')[-1]))
+    self.assertOptimal(session, 2)
+    session.lock_player(int(np.flatnonzero(self.data['color'] == 'A')[-1]))
+    self.assertOptimal(session, 2)
+    self.assertRaises(ValueError, session.lock_player, int(np.flatnonzero(self.data['color'] == 'D')[0]))
+    session.lock_player(int(np.flatnonzero(self.data['color'] == 'B')[0]))
+    self.assertRaises(NotSolvableError, session.solve)
+    session.unlock_player(int(np.flatnonzero(self.data['color'] == 'B')[0]))
+    self.assertOptimal(session, 2)
@@ -0,0 +1,77 @@
+import os
+import shutil
+import datetime
+import tempfile
+from unittest import TestCase
+from mock import patch
+import numpy as np
+import pandas as pd
+from dfs.knapsack.bnb import solve_constrained
+from dfs.nba import buildteams
+
+def slate(seed):
+  rng = np.random.RandomState(seed)
+  rows = []
+  for i in range(60):
+    rows.append({'bref_id': 'p%02d' % i,
+                 'Tm': 'T%d' % (i % 6),
+                 'pos': ['PG', 'SG', 'SF', 'PF', 'C'][i % 5],
+                 'salary': int(rng.randint(7, 22)) * 500,
+                 'pred': rng.rand() * 40})
+  return pd.DataFrame(rows, columns=['bref_id', 'Tm', 'pos', 'salary', 'pred'])
+
+class LateSwapTest(TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.patch = patch('dfs.nba.buildteams.id2name', lambda bref_id: bref_id)
+    self.patch.start()
+    self.datafile = os.path.join(self.tmpdir, 'data.pickle')
+    self.teams_file = os.path.join(self.tmpdir, 'teams.pickle')
+    self.refreshed_file = os.path.join(self.tmpdir, 'refreshed.pickle')
+    slate(0).to_pickle(self.datafile)
+    buildteams.genteam_to_file(self.teams_file, self.datafile, 'salary', 'pos', 'pred')
+    self.submitted = pd.read_pickle(self.teams_file)
+    # Refreshed projections for everyone; salaries don't change
+    refreshed = slate(0)
+    refreshed['pred'] = slate(1)['pred']
+    refreshed.to_pickle(self.refreshed_file)
+    self.refreshed = refreshed.set_index('bref_id')
+
+  def tearDown(self):
+    self.patch.stop()
+    shutil.rmtree(self.tmpdir)
+
+  def test_get_locked_teams(self):
+    schedule_file = os.path.join(self.tmpdir, 'schedule.csv')
+    schedule = pd.DataFrame({'Tm': ['T0', 'T1', 'T2'],
+                             'start': ['2015-11-01 19:00', '2015-11-01 19:30', '2015-11-01 22:00']})
+    schedule.to_csv(schedule_file, index=False)
+    self.assertEqual([], buildteams.get_locked_teams(schedule_file, datetime.datetime(2015, 11, 1, 18, 59)))
+    # A game locks at its start time
+    self.assertEqual(['T0', 'T1'], buildteams.get_locked_teams(schedule_file, datetime.datetime(2015, 11, 1, 19, 30)))
+    self.assertEqual(['T0', 'T1', 'T2'], buildteams.get_locked_teams(schedule_file, datetime.datetime(2015, 11, 2)))
+
+  def test_late_swap(self):
+    locked_teams = list(self.submitted['Tm'].unique()[:2])
+    kept = sorted(self.submitted.index[self.submitted['Tm'].isin(locked_teams)])
+    team = buildteams.late_swap(self.teams_file, self.refreshed_file, 'salary', 'pos', 'pred', locked_teams)
+    self.assertNotIn('lineup', team.columns)
+    # Locked players stay, and nobody else from a started game comes in
+    self.assertEqual(kept, sorted(team.index[team['Tm'].isin(locked_teams)]))
+    self.assertLessEqual(team['salary'].sum(), 60000)
+    self.assertEqual(buildteams.positions, team['pos'].value_counts().to_dict())
+    # The open slots are the best that fit under what the locked players leave of the cap
+    pool = self.refreshed[~self.refreshed['Tm'].isin(locked_teams) | self.refreshed.index.isin(kept)]
+    expected = solve_constrained(pool, 'salary', 'pred', 'pos', buildteams.positions, 60000, group_column='Tm',
+                                 max_per_group=buildteams.MAX_PLAYERS_PER_TEAM, locked=kept)
+    self.assertAlmostEqual(self.refreshed.loc[expected, 'pred'].sum(), team['pred'].sum())
+    self.assertGreaterEqual(team['pred'].sum(), self.refreshed.loc[self.submitted.index, 'pred'].sum() - 1e-9)
+
+  def test_locked_over_cap(self):
+    locked_teams = list(self.submitted['Tm'].unique())
+    cap = int(self.submitted['salary'].sum()) - 500
+    self.assertRaises(ValueError, buildteams.late_swap, self.teams_file, self.refreshed_file, 'salary', 'pos', 'pred',
+                      locked_teams, cap)
+
+  def test_rank_needs_opponents(self):
+    self.assertRaises(ValueError, buildteams.rank_by_simulation, self.teams_file, 'pred')
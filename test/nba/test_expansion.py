@@ -2,7 +2,8 @@ import pandas
 import pkg_resources
 from unittest import TestCase
 
-from dfs.nba.expansion import get_expansion_targets, encode_names, expand_nba_data, discretize_data
+from dfs.nba.expansion import get_expansion_targets, encode_names, expand_nba_data, discretize_data, \
+  featurizers_for_attrs, expansion_plan
 
 class ExpansionTestCase(TestCase):
   def setUp(self):
@@ -43,6 +44,20 @@ class ExpansionTestCase(TestCase):
     #live_count_dict = {'bref_id': 2, u'FT': 2, 'NF:STL': 1, 'OpponentLast2Weeks:MaxFPPMP': 2, u'3P': 2, u'TOV': 2, 'OpponentLast2Weeks:MaxFPPG': 2, u'Tm': 2, u'GmSc': 2, u'FG': 2, u'3PA': 2, u'DRB': 2, u'Rk': 2, 'NF:BLK': 1, u'Opp': 2, u'AST': 2, u'HomeAway': 0, u'FT%': 1, 'NF:Minutes': 1, u'PF': 2, 'NF:TOV': 1, u'PTS': 2, u'FGA': 2, 'Vegas:Spread': 2, 'OpponentLast2Weeks:AvgFPPG': 2, u'GS': 2, u'G': 2, 'NF:FP': 1, u'STL': 2, 'Last5:PPG': 2, u'Age': 2, u'TRB': 2, u'DFS': 1, u'FTA': 2, u'BLK': 2, 'date': 2, u'FG%': 2, 'OpponentLast2Weeks:AvgFPPMP': 2, 'Vegas:OverUnder': 1, u'+/-': 2, u'WinLoss': 2, 'NF:PTS': 1, 'NF:PF': 1, 'NF:REB': 1, 'NF:AST': 1, u'MP': 2, 'OpponentLast2Weeks:FPPMP': 2, u'ORB': 2, u'3P%': 2}
     #self.assertDictEqual(live_count_dict, ez_expand_live.count().to_dict())
 
+  def test_featurizers_for_attrs(self):
+    attrs = ['Target:FDFP', 'Last5:PPG', 'Vegas:Spread', 'Vegas:OverUnder=200', 'salary', '']
+    self.assertEqual({'Target', 'Last5', 'Vegas'}, featurizers_for_attrs(attrs))
+    self.assertEqual(['Last5', 'Vegas'], sorted(name for name, _ in get_expansion_targets(
+      expanding_live=True, featurizers=featurizers_for_attrs(attrs))))
+
+  def test_expansion_with_attrs(self):
+    attrs = ['Target:FDFP', 'Last5:PPG']
+    plan = expansion_plan(self.ezdata, attrs=attrs)
+    self.assertItemsEqual(['Target', 'Last5'], plan.index)
+    self.assertEqual([2, 2], list(plan['rows']))
+    ez_expand = expand_nba_data(self.ezdata, live=False, attrs=attrs)
+    self.assertItemsEqual(['Target:FDFP', 'Last5:PPG'], [col for col in ez_expand.columns if ':' in col])
+
   def test_discretization(self):
     stadium_series = pandas.Series(data=["Lambeau", "Levis", "Qwest"]) # Pretend this is an expanded field
     awesomeness_series = pandas.Series(data=[100, 30, 0]) # this is a continuous field
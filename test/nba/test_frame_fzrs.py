@@ -0,0 +1,123 @@
+from unittest import TestCase
+from mock import patch
+import numpy as np
+import pandas as pd
+from dfs.nba import featurizers
+from dfs.nba.featurizers import scorer, rolling_game_means, last5games_frame_fzr, OpponentAllowedTable, \
+  opp_ffpg_frame_fzr
+
+def game_rows(seed):
+  """
+  A few weeks of made-up games: three players, out of order, with a missing stat and missing minutes here and there
+  """
+  rng = np.random.RandomState(seed)
+  rows = []
+  for player, team, opp, pos in [('aaa01', 'BOS', 'NYK', 'G'), ('bbb01', 'BOS', 'NYK', 'F'),
+                                 ('ccc01', 'NYK', 'BOS', 'G')]:
+    for day in rng.choice(30, 12, replace=False):
+      row = {'bref_id': player, 'Tm': team, 'Opp': opp, 'pos': pos,
+             'date': pd.Timestamp('2015-11-01') + pd.Timedelta(days=int(day)),
+             'MP': float(rng.randint(10, 40))}
+      row.update((stat, float(rng.randint(0, 20))) for stat in scorer.index)
+      rows.append(row)
+  games = pd.DataFrame(rows)
+  games.loc[[3, 20], 'TOV'] = np.nan
+  games.loc[[7, 30], 'MP'] = np.nan
+  return games
+
+def query_rows(games):
+  """
+  Rows to featurize: on game days, between them, before anyone's first game and after the last, plus an unknown player
+  """
+  dates = [pd.Timestamp('2015-10-20'), pd.Timestamp('2015-11-01'), pd.Timestamp('2015-11-15'),
+           pd.Timestamp('2015-12-10')] + list(games['date'].iloc[::5])
+  rows = [{'bref_id': player, 'Opp': opp, 'pos': pos, 'date': date}
+          for player, opp, pos in [('aaa01', 'NYK', 'G'), ('ccc01', 'BOS', 'G'), ('zzz01', 'NYK', 'F')]
+          for date in dates]
+  return pd.DataFrame(rows, index=np.arange(len(rows)) * 10 + 7)
+
+class RollingGameMeansTest(TestCase):
+  def setUp(self):
+    self.games = game_rows(0)
+    self.data = query_rows(self.games)
+    self.patches = [patch.object(featurizers, 'load_all_game_data', lambda: self.games),
+                    patch.object(featurizers, 'scored_game_data', None)]
+    for p in self.patches:
+      p.start()
+
+  def tearDown(self):
+    for p in self.patches:
+      p.stop()
+
+  def brute_force_means(self, row, window, stats):
+    # What last5games_fzr does for one row: the player's last games strictly before the date
+    games = self.games[(self.games['bref_id'] == row['bref_id']) & (self.games['date'] < row['date'])]
+    games = games.sort('date').tail(window)
+    games = games.assign(PPG=games[scorer.index].dot(scorer))
+    return [games[stat].mean() for stat in stats]
+
+  def check_means(self, window, stats):
+    means = rolling_game_means(self.data, window, stats)
+    self.assertTrue(means.index.equals(self.data.index))
+    self.assertEqual(stats, list(means.columns))
+    expected = [self.brute_force_means(row, window, stats) for _, row in self.data.iterrows()]
+    np.testing.assert_allclose(means.values, np.array(expected, dtype=float))
+    return means
+
+  def test_last5(self):
+    means = self.check_means(5, ['PPG'])
+    self.assertTrue(means.equals(last5games_frame_fzr(self.data)))
+    # No earlier games, or no games at all, is NaN
+    self.assertTrue(means.loc[self.data['date'] == pd.Timestamp('2015-10-20')].isnull().all().all())
+    self.assertTrue(means.loc[self.data['bref_id'] == 'zzz01'].isnull().all().all())
+
+  def test_other_windows(self):
+    self.check_means(1, ['PPG', 'MP'])
+    self.check_means(3, ['MP', 'TOV'])
+    self.check_means(50, ['PPG'])
+
+class OpponentAllowedTest(TestCase):
+  def setUp(self):
+    self.games = game_rows(1)
+    self.data = query_rows(self.games)
+    self.patches = [patch.object(featurizers, 'load_all_game_data', lambda: self.games),
+                    patch.dict(featurizers.opponent_allowed_tables, clear=True)]
+    for p in self.patches:
+      p.start()
+
+  def tearDown(self):
+    for p in self.patches:
+      p.stop()
+
+  def brute_force_stats(self, row, weeks, group_columns):
+    # What opp_ffpg_fzr does for one row
+    games = self.games[(self.games['date'] < row['date']) &
+                       (self.games['date'] > row['date'] - pd.Timedelta(weeks=weeks))]
+    for column in group_columns:
+      games = games[games[column] == row[column]]
+    if not len(games):
+      return [np.nan] * 5
+    fps = games[scorer.index].dot(scorer)
+    fppmp = fps / games['MP']
+    return [fps.mean(), fps.max(), sum(fps) / sum(games['MP']), fppmp.mean(), fppmp.max()]
+
+  def check_stats(self, stats, weeks, group_columns):
+    self.assertTrue(stats.index.equals(self.data.index))
+    self.assertEqual(['AvgFPPG', 'MaxFPPG', 'FPPMP', 'AvgFPPMP', 'MaxFPPMP'], list(stats.columns))
+    expected = [self.brute_force_stats(row, weeks, group_columns) for _, row in self.data.iterrows()]
+    np.testing.assert_allclose(stats.values, np.array(expected, dtype=float))
+
+  def test_two_weeks(self):
+    stats = opp_ffpg_frame_fzr(self.data)
+    self.check_stats(stats, 2, ['Opp'])
+    # Missing minutes in the window spoil the overall rate, but not the others
+    self.assertTrue(stats['FPPMP'].isnull().any() and stats['AvgFPPMP'].notnull().any())
+
+  def test_other_windows(self):
+    table = OpponentAllowedTable(self.games, ['Opp'])
+    for weeks in [1, 3, 10]:
+      self.check_stats(table.window_stats(self.data, weeks), weeks, ['Opp'])
+
+  def test_by_position(self):
+    table = OpponentAllowedTable(self.games, ['Opp', 'pos'])
+    self.check_stats(table.window_stats(self.data, 2), 2, ['Opp', 'pos'])
@@ -7,7 +7,7 @@ import numpy as np
 import datetime
 import pkg_resources
 from unittest import TestCase
-from dfs.nba.featurizers import feature_generators
+from dfs.nba.featurizers import feature_generators, frame_feature_generators
 from dfs.nba.featurizers import fantasy_points_fzr, last5games_fzr, nf_stats_fzr, vegas_fzr, \
   opp_ffpg_fzr, salary_fzr
 
@@ -37,6 +37,18 @@ class FeaturizersTest(TestCase):
       self.assertTrue(isinstance(output, pandas.Series))
       self.assertItemsEqual(columns, output.index)
 
+  def testFrameFeaturizers(self):
+    # Columnar featurizers must agree with their row versions, row for row
+    for func_name, frame_wrapper in frame_feature_generators.items():
+      wrapper, columns, live = feature_generators[func_name]
+      for data in [self.data, self.recentdata]:
+        output = frame_wrapper(data)
+        self.assertItemsEqual(columns, output.columns)
+        self.assertTrue(output.index.equals(data.index))
+        by_row = pandas.DataFrame([wrapper(row) for _, row in data.iterrows()], index=data.index)
+        np.testing.assert_allclose(output[columns].values.astype(float), by_row[columns].values.astype(float),
+                                   rtol=1e-6)
+
   def applyFeaturizer(self, fzr_function, expected_output, use_recent=False):
     data = self.recentdata if use_recent else self.data
     for integer_index, (_, row) in enumerate(data.iterrows()):
@@ -0,0 +1,47 @@
+from unittest import TestCase
+from mock import patch
+import numpy as np
+import pandas as pd
+from dfs.extdata.bsbr import gamelogs
+from dfs.sim.history import mlb_player_games
+
+batting_stats = ['AB', 'R', 'H', '2B', '3B', 'HR', 'RBI', 'BB', 'SB', 'HBP']
+pitching_stats = ['IP', 'ER', 'SO']
+
+def gamelog(dates, teams, opponents, stats, rows):
+  index = pd.Index(pd.to_datetime(dates), name='Date')
+  gamelog = pd.DataFrame(rows, index=index, columns=stats, dtype=float)
+  gamelog.insert(0, 'Tm', teams)
+  gamelog.insert(1, 'Opp', opponents)
+  return gamelog
+
+class MLBPlayerGamesTest(TestCase):
+  def setUp(self):
+    batting = {'ruthba01': gamelog(['2015-06-01', '2015-06-02'], ['NYY', 'NYY'], ['BOS', 'BOS'], batting_stats,
+                                   [[4, 1, 2, 1, 0, 0, 1, 0, 0, 0],
+                                    # A missing stat counts for nothing
+                                    [3, 0, 1, 0, 0, 1, 2, 1, 0, np.nan]]),
+               # A trade shows up as a row with no game in it
+               'gehrilo01': gamelog(['2015-06-01', None], ['NYY', None], ['BOS', None], batting_stats,
+                                    [[5, 0, 0, 0, 0, 0, 0, 0, 0, 0], [np.nan] * 10])}
+    pitching = {'youngcy01': gamelog(['2015-06-01', '2015-06-06'], ['BOS', 'BOS'], ['NYY', 'TOR'], pitching_stats,
+                                     [[6, 2, 7], [5, 4, 3]])}
+    pitching['youngcy01']['Dec'] = ['W(3-1)', np.nan]
+    self.patch = patch.dict(gamelogs.prepared_bsbr_data, {'batting': batting, 'pitching': pitching})
+    self.patch.start()
+
+  def tearDown(self):
+    self.patch.stop()
+
+  def test_player_games(self):
+    games = mlb_player_games()
+    self.assertEqual(['player', 'date', 'Tm', 'Opp', 'FP'], list(games.columns))
+    games = games.set_index(['player', 'date'])
+    self.assertEqual(5, len(games))
+    self.assertEqual(('NYY', 'BOS'), tuple(games.loc[('ruthba01', pd.Timestamp('2015-06-01')), ['Tm', 'Opp']]))
+    self.assertEqual(('BOS', 'TOR'), tuple(games.loc[('youngcy01', pd.Timestamp('2015-06-06')), ['Tm', 'Opp']]))
+    # FanDuel points: batters lose 0.25 per at-bat and get it back on hits; pitchers get 4 for a win
+    expected = {('ruthba01', '2015-06-01'): 4.5, ('ruthba01', '2015-06-02'): 6.5, ('gehrilo01', '2015-06-01'): -1.25,
+                ('youngcy01', '2015-06-01'): 15.0, ('youngcy01', '2015-06-06'): 4.0}
+    for (player, date), points in expected.items():
+      self.assertAlmostEqual(points, games.loc[(player, pd.Timestamp(date)), 'FP'])
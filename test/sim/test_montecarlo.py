@@ -0,0 +1,68 @@
+from unittest import TestCase
+from dfs.sim.montecarlo import ResidualModel, fit_residual_model, draw_outcomes, lineup_matrix, field_cash_line, \
+                               rank_lineups
+import numpy as np
+import pandas as pd
+
+class MonteCarloTest(TestCase):
+  def setUp(self):
+    self.model = ResidualModel(pd.Series({'a': 5.0, 'b': 5.0, 'c': 5.0}), 5.0, 0.3, 0.1)
+
+  def test_fit_residual_model(self):
+    # Two teams play each other every day; every player has a team-wide and a game-wide shock, plus his own
+    rng = np.random.RandomState(0)
+    rows = []
+    for day in range(400):
+      game = rng.randn()
+      team_shocks = {'X': rng.randn(), 'Y': rng.randn()}
+      for team, opponent in [('X', 'Y'), ('Y', 'X')]:
+        for player in range(4):
+          score = 20 + 3 * (0.5 * game + 0.5 * team_shocks[team] + np.sqrt(0.5) * rng.randn())
+          rows.append([team + str(player), day, team, opponent, score])
+    games = pd.DataFrame(rows, columns=['player', 'date', 'Tm', 'Opp', 'FP'])
+    model = fit_residual_model(games, 'player', 'FP', window=20)
+    self.assertAlmostEqual(model.league_sd, 3, delta=0.3)
+    self.assertAlmostEqual(model.teammate_corr, 0.5, delta=0.1)
+    self.assertAlmostEqual(model.opponent_corr, 0.25, delta=0.1)
+
+  def test_draw_outcomes(self):
+    outcomes = draw_outcomes(self.model, ['a', 'b', 'c', 'd'], [10, 20, 30, 40], ['X', 'X', 'Y', 'Z'],
+                             ['Y', 'Y', 'X', 'W'], n_sims=50000, seed=1)
+    self.assertEqual(outcomes.shape, (4, 50000))
+    self.assertEqual(outcomes.dtype, np.float32)
+    np.testing.assert_allclose(outcomes.mean(axis=1), [10, 20, 30, 40], atol=0.2)
+    # Unknown players get the league sd
+    np.testing.assert_allclose(outcomes.std(axis=1), [5, 5, 5, 5], rtol=0.03)
+    corr = np.corrcoef(outcomes)
+    self.assertAlmostEqual(corr[0, 1], 0.3, delta=0.03)
+    self.assertAlmostEqual(corr[0, 2], 0.1, delta=0.03)
+    self.assertAlmostEqual(corr[0, 3], 0, delta=0.03)
+    np.testing.assert_array_equal(outcomes, draw_outcomes(self.model, ['a', 'b', 'c', 'd'], [10, 20, 30, 40],
+                                                          ['X', 'X', 'Y', 'Z'], ['Y', 'Y', 'X', 'W'],
+                                                          n_sims=50000, seed=1))
+
+  def test_rank_lineups(self):
+    outcomes = np.array([[10, 10, 10, 10],
+                         [0, 0, 30, 30],
+                         [5, 5, 5, 5],
+                         [8, 8, 8, 8]], dtype=np.float32)
+    lineups = lineup_matrix([['a', 'c'], ['b', 'c'], ['c', 'd']], ['a', 'b', 'c', 'd'])
+    self.assertEqual(lineups.tolist(), [[1, 0, 1, 0], [0, 1, 1, 0], [0, 0, 1, 1]])
+
+    by_mean = rank_lineups(lineups, outcomes)
+    self.assertEqual(list(by_mean.index), [1, 0, 2])
+    self.assertEqual(list(by_mean['mean']), [20, 15, 13])
+
+    by_cash = rank_lineups(lineups, outcomes, cash_line=14, chunk_size=2)
+    self.assertEqual(list(by_cash.index), [0, 1, 2])
+    self.assertEqual(list(by_cash['cash_prob']), [1.0, 0.5, 0.0])
+
+    by_upside = rank_lineups(lineups, outcomes, percentile=90)
+    self.assertEqual(by_upside.index[0], 1)
+    self.assertIn('p90', by_upside.columns)
+
+    # Per-simulation cash lines: the median of a field of the three lineups
+    lines = field_cash_line(lineups, outcomes)
+    np.testing.assert_allclose(lines, [13, 13, 15, 15])
+    by_field = rank_lineups(lineups, outcomes, cash_line=lines)
+    self.assertEqual(list(by_field['cash_prob']), [0.5, 0.5, 0.0])
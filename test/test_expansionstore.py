@@ -0,0 +1,47 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+from dfs.expansionstore import ExpansionStore
+
+class ExpansionStoreTest(TestCase):
+  def setUp(self):
+    self.tempdir = tempfile.mkdtemp()
+    self.store = ExpansionStore(os.path.join(self.tempdir, 'store', 'expanded.sqlite'), chunk_size=2)
+    self.data = pd.DataFrame({'bref_id': ['a', 'b', 'a'],
+                              'date': pd.to_datetime(['2015-01-01', '2015-01-01', '2015-01-03'])},
+                             index=[10, 20, 30])
+    self.results = pd.DataFrame({'PPG': [1.0, np.nan, 3.0], 'Home': ['H', 'A', 'H']},
+                                index=[10, 20, 30], columns=['PPG', 'Home'])
+
+  def tearDown(self):
+    self.store.close()
+    shutil.rmtree(self.tempdir)
+
+  def test_load_append(self):
+    self.assertEqual(len(self.store.load('Last5', 'v1', self.data, ['PPG', 'Home'])), 0)
+    self.store.append('Last5', 'v1', self.data.iloc[:2], self.results.iloc[:2])
+    # Rows are found by player and date, whatever their index
+    later = pd.concat([self.data, self.data.iloc[[0]]])
+    later.index = [1, 2, 3, 4]
+    stored = self.store.load('Last5', 'v1', later, ['PPG', 'Home'])
+    self.assertEqual(list(stored.index), [1, 2, 4])
+    self.assertEqual(list(stored['Home']), ['H', 'A', 'H'])
+    self.assertTrue(np.isnan(stored.loc[2, 'PPG']))
+    self.assertEqual(len(self.store.load('Vegas', 'v1', later, ['PPG', 'Home'])), 0)
+
+  def test_missing_rows_not_stored(self):
+    results = pd.DataFrame({'PPG': [1.0, np.nan, np.nan], 'Home': ['H', None, 'H']}, index=[10, 20, 30],
+                           columns=['PPG', 'Home'])
+    self.store.append('Last5', 'v1', self.data, results)
+    self.assertEqual(list(self.store.load('Last5', 'v1', self.data, ['PPG', 'Home']).index), [10, 30])
+
+  def test_new_version_replaces_old(self):
+    self.store.append('Last5', 'v1', self.data, self.results)
+    self.store.append('Last5', 'v2', self.data.iloc[[2]], self.results.iloc[[2]])
+    self.assertEqual(len(self.store.load('Last5', 'v1', self.data, ['PPG', 'Home'])), 0)
+    self.assertEqual(list(self.store.load('Last5', 'v2', self.data, ['PPG', 'Home']).index), [30])
+    self.store.clear('Last5')
+    self.assertEqual(len(self.store.load('Last5', 'v2', self.data, ['PPG', 'Home'])), 0)
@@ -0,0 +1,119 @@
+import os
+import imp
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+from dfs.featurecache import FeatureCache, code_version
+
+def featurizer_a(row):
+  return row + 1
+
+def featurizer_b(row):
+  return row + 2
+
+# A featurizer module whose helpers can be edited between loads
+helpers_source = '''
+SCALE = %d
+
+def helper(x):
+  return x * SCALE
+
+class Table(object):
+  def lookup(self, x):
+    return helper(x) + %d
+
+def unrelated(x):
+  return x - %d
+
+def featurizer(row):
+  return Table().lookup(row)
+
+def rolling_featurizer(window):
+  def featurize(row):
+    return helper(row) + window
+  return featurize
+'''
+
+class FeatureCacheTest(TestCase):
+  def setUp(self):
+    self.tempdir = tempfile.mkdtemp()
+    self.path = os.path.join(self.tempdir, 'cache', 'features.sqlite')
+
+  def tearDown(self):
+    shutil.rmtree(self.tempdir)
+
+  def test_get_put(self):
+    cache = FeatureCache(self.path, batch_size=2)
+    self.assertEqual(cache.get('NF', 'v1', "['a', 1]"), (False, None))
+    cache.put('NF', 'v1', "['a', 1]", [1.0, None])
+    self.assertEqual(cache.get('NF', 'v1', "['a', 1]"), (True, [1.0, None]))
+    # Other versions and featurizers are kept apart
+    self.assertEqual(cache.get('NF', 'v2', "['a', 1]"), (False, None))
+    self.assertEqual(cache.get('Vegas', 'v1', "['a', 1]"), (False, None))
+    self.assertEqual(cache.hit_rates(), {'NF': (1, 2, 1 / 3.), 'Vegas': (0, 1, 0.0)})
+    self.assertIn('NF: 1 hits, 2 misses', cache.report())
+    cache.close()
+    self.assertEqual(FeatureCache(self.path).get('NF', 'v1', "['a', 1]"), (True, [1.0, None]))
+
+  def test_contains(self):
+    cache = FeatureCache(self.path, batch_size=2)
+    self.assertFalse(cache.contains('NF', 'v1', 'a'))
+    cache.put('NF', 'v1', 'a', 1)
+    self.assertTrue(cache.contains('NF', 'v1', 'a'))
+    cache.flush()
+    self.assertTrue(cache.contains('NF', 'v1', 'a'))
+    self.assertFalse(cache.contains('NF', 'v2', 'a'))
+    self.assertEqual(cache.hit_rates(), {})
+    cache.close()
+
+  def test_batched_writes(self):
+    cache = FeatureCache(self.path, batch_size=2)
+    cache.put('NF', 'v1', 'a', 1)
+    self.assertEqual(FeatureCache(self.path).get('NF', 'v1', 'a'), (False, None))
+    cache.put('NF', 'v1', 'b', 2)
+    self.assertEqual(FeatureCache(self.path).get('NF', 'v1', 'a'), (True, 1))
+    cache.put('NF', 'v1', 'c', 3)
+    cache.flush()
+    self.assertEqual(FeatureCache(self.path).get('NF', 'v1', 'c'), (True, 3))
+
+  def test_eviction(self):
+    cache = FeatureCache(self.path, max_entries=2, batch_size=1)
+    for key in 'abc':
+      cache.put('NF', 'v1', key, key)
+      time.sleep(0.01)
+    self.assertEqual([cache.get('NF', 'v1', key)[0] for key in 'abc'], [False, True, True])
+    self.assertEqual(FeatureCache(self.path, max_age_days=0).get('NF', 'v1', 'c'), (False, None))
+
+  def test_clear(self):
+    cache = FeatureCache(self.path, batch_size=1)
+    cache.put('NF', 'v1', 'a', 1)
+    cache.put('Vegas', 'v1', 'a', 2)
+    cache.clear('NF')
+    self.assertEqual(cache.get('NF', 'v1', 'a'), (False, None))
+    self.assertEqual(cache.get('Vegas', 'v1', 'a'), (True, 2))
+
+  def test_code_version(self):
+    self.assertEqual(code_version(featurizer_a), code_version(featurizer_a))
+    self.assertNotEqual(code_version(featurizer_a), code_version(featurizer_b))
+    self.assertNotEqual(code_version(featurizer_a), code_version(featurizer_a, data_version=2))
+
+  def load_helpers(self, scale=2, offset=1, unrelated=1):
+    path = os.path.join(self.tempdir, 'helpers_%d_%d_%d.py' % (scale, offset, unrelated))
+    with open(path, 'w') as outf:
+      outf.write(helpers_source % (scale, offset, unrelated))
+    return imp.load_source('helpers_%d_%d_%d' % (scale, offset, unrelated), path)
+
+  def test_code_version_follows_helpers(self):
+    base = self.load_helpers()
+    version = code_version(base.featurizer)
+    # Editing a class the featurizer uses, or a function or constant that uses, changes its version
+    self.assertNotEqual(version, code_version(self.load_helpers(offset=2).featurizer))
+    self.assertNotEqual(version, code_version(self.load_helpers(scale=3).featurizer))
+    # Editing code it never calls doesn't
+    self.assertEqual(version, code_version(self.load_helpers(unrelated=2).featurizer))
+    # Settings a featurizer was built with count too
+    self.assertEqual(code_version(base.rolling_featurizer(3)), code_version(base.rolling_featurizer(3)))
+    self.assertNotEqual(code_version(base.rolling_featurizer(3)), code_version(base.rolling_featurizer(4)))
+    self.assertNotEqual(code_version(base.rolling_featurizer(3)),
+                        code_version(self.load_helpers(scale=3).rolling_featurizer(3)))
@@ -0,0 +1,137 @@
+import os
+import imp
+import shutil
+import tempfile
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+from dfs.expansionstore import ExpansionStore
+from dfs.featureengine import engine
+from dfs.featureengine.registry import FeaturizerRegistry
+
+# Source data for the Bonus featurizer, filled in as if scraped
+scraped_bonus = {}
+
+def declare(registry):
+  @registry.featurizer(name='Double', output_columns=['Points'])
+  def double_points(row):
+    if row['points'] > 6:
+      return None
+    return [2 * row['points']]
+
+  @registry.featurizer(name='Kind', output_columns=['Parity', 'Half'], live=False, requires=['Double'])
+  def kind(row):
+    return ['even' if row['points'] % 2 == 0 else 'odd', row['points'] / 2.0]
+
+  @registry.featurizer(name='Bonus', output_columns=['Bonus'], live=False)
+  def bonus(row):
+    if row['player'] not in scraped_bonus:
+      return None
+    return [scraped_bonus[row['player']]]
+
+  @registry.frame_featurizer(name='Double')
+  def double_points_frame(data):
+    return pd.DataFrame({'Points': 2 * data['points']})[data['points'] <= 6]
+
+  @registry.frame_featurizer(name='Total', output_columns=['Sum'])
+  def total(data):
+    return pd.DataFrame({'Sum': data.groupby('player')['points'].transform('sum')})
+
+series_registry = FeaturizerRegistry('test-series', player_column='player', name_separator=':')
+list_registry = FeaturizerRegistry('test-list', player_column='player', name_separator=': ', row_results='list')
+declare(series_registry)
+declare(list_registry)
+
+# Frame featurizers are usually thin wrappers round a helper doing the work
+frame_helper_source = '''
+import pandas as pd
+
+def scaled(points):
+  return points * %d
+
+def declare(registry):
+  @registry.frame_featurizer(name='Scaled', output_columns=['Points'])
+  def scaled_frame(data):
+    return pd.DataFrame({'Points': scaled(data['points'])})
+'''
+
+class FeatureEngineTest(TestCase):
+  def setUp(self):
+    self.data = pd.DataFrame({'player': ['a', 'b', 'c', 'a', 'd', 'b', 'e', 'a'],
+                              'date': pd.date_range('2015-01-01', periods=8),
+                              'points': [1, 2, 3, 4, 5, 6, 7, 8]},
+                             index=[70, 10, 20, 30, 40, 50, 60, 0])
+    self.tempdir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tempdir)
+
+  def frame_helper_version(self, scale, registry_name):
+    path = os.path.join(self.tempdir, 'frame_helpers_%d.py' % scale)
+    with open(path, 'w') as outf:
+      outf.write(frame_helper_source % scale)
+    registry = FeaturizerRegistry(registry_name, player_column='player')
+    imp.load_source('frame_helpers_%d' % scale, path).declare(registry)
+    return registry.versions['Scaled']
+
+  def test_version_follows_helpers(self):
+    # Editing the helper must retire what the expansion store holds for the featurizer
+    self.assertNotEqual(self.frame_helper_version(2, 'test-helper-2'), self.frame_helper_version(3, 'test-helper-3'))
+
+  def test_registry(self):
+    self.assertEqual(['Double:Points'], series_registry.encode_names('Double', ['Points']))
+    self.assertEqual(['Double: Points'], list_registry.encode_names('Double', ['Points']))
+    self.assertEqual(['Double', 'Total'], sorted(name for name, _ in series_registry.targets(live=True)))
+    self.assertEqual({'Double', 'Kind'}, series_registry.featurizers_for_attrs(['Kind:Parity=odd', 'points']))
+    # Row featurizers hand back Series (NaN for no data) or plain lists, as the registry says
+    func, columns, live = series_registry.generators['Double']
+    self.assertTrue(np.isnan(func(self.data.iloc[6])['Points']))
+    self.assertEqual([6], list_registry.generators['Double'][0](self.data.iloc[2]))
+    self.assertEqual(1, series_registry.generators['Total'][0](self.data.iloc[0])['Sum'])
+
+  def test_expand(self):
+    for registry in [series_registry, list_registry]:
+      expanded = engine.expand(registry, self.data)
+      self.assertEqual(list(self.data.columns) + [col for name, (func, columns) in registry.targets()
+                                                  for col in registry.encode_names(name, columns)],
+                       list(expanded.columns))
+      self.assertEqual(list(range(8)), list(expanded.index))
+      np.testing.assert_array_equal([2, 4, 6, 8, 10, 12, np.nan, np.nan],
+                                    expanded[registry.encode_names('Double', ['Points'])[0]].values)
+      np.testing.assert_array_equal([13, 8, 3, 13, 5, 8, 7, 13],
+                                    expanded[registry.encode_names('Total', ['Sum'])[0]].values)
+      discretized = engine.discretize(expanded, list(expanded.columns[3:]))
+      self.assertIn(registry.encode_names('Kind', ['Parity'])[0] + '=odd', discretized.columns)
+      self.assertIn('player', discretized.columns)
+
+  def test_parallel(self):
+    for registry in [series_registry, list_registry]:
+      serial = engine.expand(registry, self.data)
+      parallel = engine.expand(registry, self.data, workers=2)
+      self.assertTrue(serial.equals(parallel))
+
+  def test_store(self):
+    store = ExpansionStore(os.path.join(self.tempdir, 'store.sqlite'), key_columns=('player', 'date'))
+    expected = engine.expand(list_registry, self.data, featurizers={'Kind'})
+    engine.expand(list_registry, self.data.iloc[:4], featurizers={'Kind'}, store=store)
+    stored = engine.expand(list_registry, self.data, featurizers={'Kind'}, store=store)
+    self.assertTrue(expected.equals(stored))
+    plan = engine.expansion_plan(list_registry, self.data, featurizers={'Kind'}, store=store)
+    self.assertEqual(0, plan.loc['Kind', 'computed'])
+    store.close()
+
+  def test_store_matches_fresh(self):
+    for registry in [series_registry, list_registry]:
+      store = ExpansionStore(os.path.join(self.tempdir, registry.name + '.sqlite'), key_columns=('player', 'date'))
+      scraped_bonus.clear()
+      scraped_bonus['a'] = 1.0
+      for arrived in [{}, {'b': 2.0}]:
+        # Rows expanded before their source data arrived pick it up once it has
+        scraped_bonus.update(arrived)
+        fresh = engine.expand(registry, self.data)
+        stored = engine.expand(registry, self.data, store=store)
+        self.assertTrue(fresh.equals(stored))
+      bonus_column = registry.encode_names('Bonus', ['Bonus'])[0]
+      np.testing.assert_array_equal([1, 2, np.nan, 1, np.nan, 2, np.nan, 1], stored[bonus_column].values)
+      store.close()
+    scraped_bonus.clear()
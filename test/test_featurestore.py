@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+from dfs.featurestore import FeatureStore, StoredFeatures
+from dfs.featureengine import engine
+from dfs.featureengine.registry import FeaturizerRegistry
+
+# Source data for the test featurizer, filled in as if scraped
+scraped_points = {}
+stored_registry = FeaturizerRegistry('test-stored', player_column='player')
+
+@stored_registry.featurizer(name='Points', output_columns=['Points'])
+@stored_registry.cached_featurizer(name='Points', input_columns=['player', 'date'])
+def points_fzr(row):
+  return [scraped_points.get((row['player'], row['date']), np.nan)]
+
+@stored_registry.frame_featurizer(name='Points')
+def points_frame_fzr(data):
+  return pd.DataFrame({'Points': [scraped_points.get(key, np.nan) for key in zip(data['player'], data['date'])]},
+                      index=data.index)
+
+class FeatureStoreTest(TestCase):
+  def setUp(self):
+    self.tempdir = tempfile.mkdtemp()
+    self.store = FeatureStore(self.tempdir)
+    self.keys = pd.DataFrame({'bref_id': ['a', 'a', 'b'],
+                              'date': pd.to_datetime(['2015-01-01', '2015-01-05', '2015-01-03'])},
+                             columns=['bref_id', 'date'])
+    self.values = pd.DataFrame({'PPG': [10.0, 20.0, 30.0]})
+
+  def tearDown(self):
+    shutil.rmtree(self.tempdir)
+
+  def test_missing(self):
+    self.assertEqual(len(self.store.missing('Last5', 'v1', self.keys)), 3)
+    self.store.add('Last5', 'v1', self.keys.iloc[:2], self.values.iloc[:2])
+    missing = self.store.missing('Last5', 'v1', pd.concat([self.keys, self.keys]))
+    self.assertEqual(list(missing['bref_id']), ['b'])
+    # Other versions start afresh
+    self.assertEqual(len(self.store.missing('Last5', 'v2', self.keys)), 3)
+
+  def test_as_of(self):
+    self.store.add('Last5', 'v1', self.keys, self.values)
+    queries = pd.DataFrame({'bref_id': ['a', 'a', 'a', 'b', 'b', 'c'],
+                            'date': pd.to_datetime(['2015-01-05', '2014-12-31', '2015-01-03', '2015-01-03',
+                                                    '2015-01-10', '2015-01-05'])},
+                           index=[6, 5, 4, 3, 2, 1])
+    exact = self.store.as_of('Last5', 'v1', queries, ['bref_id', 'date'], ['PPG'])
+    self.assertEqual(list(exact.index), [6, 5, 4, 3, 2, 1])
+    np.testing.assert_array_equal(exact['PPG'].values, [20, np.nan, np.nan, 30, np.nan, np.nan])
+    # Never a value from after the row's date
+    stale = self.store.as_of('Last5', 'v1', queries, ['bref_id', 'date'], ['PPG'], max_staleness_days=7)
+    np.testing.assert_array_equal(stale['PPG'].values, [20, np.nan, 10, 30, 30, np.nan])
+
+  def test_add_replaces_and_persists(self):
+    self.store.add('Last5', 'v1', self.keys, self.values)
+    self.store.add('Last5', 'v1', self.keys.iloc[[0]], pd.DataFrame({'PPG': [11.0]}))
+    reloaded = FeatureStore(self.tempdir)
+    found = reloaded.as_of('Last5', 'v1', self.keys, ['bref_id', 'date'], ['PPG'])
+    self.assertEqual(list(found['PPG']), [11.0, 20.0, 30.0])
+    self.assertTrue(reloaded.as_of('Last5', 'v2', self.keys, ['bref_id', 'date'], ['PPG'])['PPG'].isnull().all())
+
+  def test_all_missing_rows_not_stored(self):
+    self.store.add('Last5', 'v1', self.keys, pd.DataFrame({'PPG': [10.0, np.nan, np.nan]}))
+    self.assertEqual(list(self.store.missing('Last5', 'v1', self.keys)['bref_id']), ['a', 'b'])
+    self.store.add('Last5', 'v1', self.keys.iloc[1:], self.values.iloc[1:])
+    self.assertEqual(len(self.store.missing('Last5', 'v1', self.keys)), 0)
+
+  def test_add_appends_chunks(self):
+    store = FeatureStore(self.tempdir, max_chunks=3)
+    for i in range(3):
+      store.add('Last5', 'v1', self.keys.iloc[[i]], self.values.iloc[[i]])
+      store.add('Last5', 'v1', self.keys.iloc[[0]], pd.DataFrame({'PPG': [float(i)]}))
+    # Only new rows are written, as chunks, until the table is compacted into one file
+    self.assertTrue(len(store._chunk_paths('Last5')) < 3)
+    reloaded = FeatureStore(self.tempdir)
+    found = reloaded.as_of('Last5', 'v1', self.keys, ['bref_id', 'date'], ['PPG'])
+    self.assertEqual(list(found['PPG']), [2.0, 20.0, 30.0])
+    # A new version compacts away the old version's rows
+    store.add('Last5', 'v2', self.keys.iloc[[2]], self.values.iloc[[2]])
+    self.assertEqual([], store._chunk_paths('Last5'))
+    self.assertEqual(len(FeatureStore(self.tempdir).table('Last5', 'v2', ['bref_id', 'date'], ['PPG'])), 1)
+
+  def test_expansion_matches_fresh(self):
+    source = StoredFeatures(self.store, stored_registry)
+    data = pd.DataFrame({'player': ['a', 'b', 'a'],
+                         'date': pd.to_datetime(['2015-01-01', '2015-01-01', '2015-01-02'])}, index=[7, 8, 9])
+    scraped_points.clear()
+    scraped_points[('a', pd.Timestamp('2015-01-01'))] = 1.0
+    for arrived in [{}, {('b', pd.Timestamp('2015-01-01')): 2.0, ('a', pd.Timestamp('2015-01-02')): 3.0}]:
+      # Rows materialized before their data arrived pick it up once it has
+      scraped_points.update(arrived)
+      fresh = engine.expand(stored_registry, data)
+      from_store = engine.expand(stored_registry, data, feature_source=source)
+      self.assertTrue(fresh.equals(from_store))
+    self.assertEqual([1.0, 2.0, 3.0], list(from_store['Points:Points']))
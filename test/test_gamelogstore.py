@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+from dfs.gamelogstore import GamelogStore
+
+def gamelog(dates, points, minutes):
+  return pd.DataFrame({'PTS': points, 'MP': minutes, 'Tm': 'CLE'},
+                      index=pd.DatetimeIndex(pd.to_datetime(dates), name='Date'), columns=['PTS', 'MP', 'Tm'])
+
+class GamelogStoreTest(TestCase):
+  def setUp(self):
+    self.tempdir = tempfile.mkdtemp()
+    self.store = GamelogStore(os.path.join(self.tempdir, 'gamelogs'), season_start_month=8)
+    self.gamelogs = {'b': gamelog(['2015-01-02', '2014-11-01', '2015-11-01'], [10, 20, 30], ['30:00', '12:30', None]),
+                     'a': gamelog(['2015-03-01'], [5], ['01:00'])}
+    self.store.write(self.gamelogs)
+
+  def tearDown(self):
+    shutil.rmtree(self.tempdir)
+
+  def test_index(self):
+    self.assertEqual([2015, 2016], sorted(self.store.index['seasons']))
+    self.assertEqual({'a': (0, 1), 'b': (1, 3)}, self.store.index['seasons'][2015]['players'])
+    self.assertEqual(['PTS', 'MP', 'Tm'], self.store.columns())
+    self.assertEqual(['a', 'b'], self.store.players())
+    # A fresh store reads the index back from disk
+    self.assertEqual(self.store.index, GamelogStore(self.store.root).index)
+
+  def test_load(self):
+    games = self.store.load(columns=['PTS', 'MP'], player_column='bref_id')
+    self.assertEqual(['date', 'PTS', 'MP', 'bref_id'], list(games.columns))
+    self.assertEqual(['a', 'b', 'b', 'b'], list(games['bref_id']))
+    self.assertEqual([5, 20, 10, 30], list(games['PTS']))
+    self.assertEqual(['01:00', '12:30', '30:00'], list(games['MP'][:3]))
+    self.assertTrue(pd.isnull(games['MP'].iloc[3]))
+    self.assertEqual([30], list(self.store.load(players=['b'], seasons=[2016], columns=['PTS'])['PTS']))
+    self.assertEqual([5], list(self.store.load(players=['a'], mmap=False)['PTS']))
+
+  def test_load_is_a_copy(self):
+    games = self.store.load()
+    expected = games.copy()
+    # Rewriting the store doesn't change a table already loaded from it
+    self.store.write({'a': gamelog(['2015-03-01'], [50], ['10:00'])})
+    self.assertTrue(expected.equals(games))
+    self.assertEqual([50], list(self.store.load()['PTS']))
+
+  def test_gamelogs(self):
+    loaded = self.store.gamelogs()
+    self.assertEqual(['a', 'b'], sorted(loaded))
+    for player, expected in self.gamelogs.items():
+      self.assertTrue(expected.sort_index().equals(loaded[player]))
+    self.assertEqual('Date', loaded['b'].index.name)
+    self.assertEqual(['b'], list(self.store.gamelogs(players=['b'])))
+
+  def test_update(self):
+    self.store.update({'a': gamelog(['2015-03-01', '2015-03-02'], [6, 7], [None, '02:00']),
+                       'c': gamelog(['2015-03-02'], [1], ['00:30'])})
+    loaded = self.store.gamelogs()
+    # New values win, and old ones fill in where the new data has none
+    self.assertEqual([6, 7], list(loaded['a']['PTS']))
+    self.assertEqual(['01:00', '02:00'], list(loaded['a']['MP']))
+    self.assertEqual(['a', 'b', 'c'], sorted(loaded))
+    self.store.update({'a': gamelog(['2015-03-02'], [8], ['03:00'])}, overwrite=True)
+    self.assertEqual([8], list(self.store.gamelogs(players=['a'])['a']['PTS']))
+
+  def test_update_rewrites_only_new_seasons(self):
+    untouched = os.path.join(self.store.root, '2015', '0.npy')
+    before = os.stat(untouched)
+    self.store.update({'b': gamelog(['2015-12-01'], [40], ['40:00'])})
+    after = os.stat(untouched)
+    self.assertEqual((before.st_ino, before.st_mtime), (after.st_ino, after.st_mtime))
+    self.assertEqual([20, 10, 30, 40], list(self.store.gamelogs(players=['b'])['b']['PTS']))
+    # A fresh store sees the same index
+    self.assertEqual(self.store.index, GamelogStore(self.store.root, season_start_month=8).index)
+
+  def test_update_overwrite_drops_old_seasons(self):
+    self.store.update({'b': gamelog(['2015-12-01'], [40], ['40:00'])}, overwrite=True)
+    self.assertEqual([40], list(self.store.gamelogs(players=['b'])['b']['PTS']))
+    self.assertEqual({'a': (0, 1)}, self.store.index['seasons'][2015]['players'])
+    self.store.update({'a': gamelog(['2016-11-01'], [1], ['01:00'])}, overwrite=True)
+    self.assertEqual([2016, 2017], sorted(self.store.index['seasons']))
+    self.assertFalse(os.path.exists(os.path.join(self.store.root, '2015')))
@@ -0,0 +1,17 @@
+from unittest import TestCase
+from dfs.lazy import memoized
+
+class MemoizedTest(TestCase):
+  def test_loads_once(self):
+    loads = []
+    @memoized
+    def load_table():
+      loads.append(1)
+      return {'rows': len(loads)}
+    self.assertEqual(loads, [])
+    table = load_table()
+    self.assertIs(load_table(), table)
+    self.assertEqual(len(loads), 1)
+    load_table.reset()
+    self.assertEqual(load_table(), {'rows': 2})
+    self.assertEqual(load_table.__name__, 'load_table')
@@ -0,0 +1,77 @@
+from unittest import TestCase
+import numpy as np
+import pandas as pd
+from dfs.mlb.cumulative import CumulativeStats, pitching_stats, pitching_rates, fip, siera
+
+def pitching_gamelog(dates, seed):
+  rng = np.random.RandomState(seed)
+  df = pd.DataFrame({stat: rng.randint(0, 10, len(dates)).astype(float) for stat in pitching_stats},
+                    index=pd.to_datetime(dates))
+  df['BF'] += 20
+  df['ERA'] = ['%.2f' % era for era in rng.uniform(1, 6, len(dates))]
+  return df
+
+def brute_force_rates(games, date, window=None, season=False):
+  """
+  What the PitcherYTD row featurizer computes, over the same choice of games
+  """
+  past_games = games[games.index < date]
+  if season:
+    past_games = past_games[past_games.index.year == date.year]
+  if window is not None:
+    past_games = past_games.iloc[-window:]
+  if len(past_games) == 0:
+    return [np.nan, np.nan, np.nan]
+  totals = past_games[pitching_stats].sum()
+  try:
+    era = float(games[games.index < date].iloc[-1]['ERA'])
+  except ValueError:
+    era = np.nan
+  return [era, fip(past_games[pitching_stats].apply(lambda col: col.values.sum())), siera(totals)]
+
+class CumulativeStatsTest(TestCase):
+  def setUp(self):
+    self.gamelogs = {
+      'pitcher01': pitching_gamelog(['2014-09-20 00:00', '2014-09-25 00:00', '2015-04-10 00:00', '2015-04-15 01:00',
+                                     '2015-04-15 02:00', '2015-04-20 00:00'], 1),
+      # The undated row (a trade, say) is skipped
+      'pitcher02': pitching_gamelog(['2015-04-11 00:00', '2015-04-16 00:00', '2015-04-21 00:00', None], 2),
+      'batter01': None,
+    }
+    # A missing stat makes FIP unknown, and a blank ERA can't be read
+    self.gamelogs['pitcher02'].loc[pd.Timestamp('2015-04-16 00:00'), 'HR'] = np.nan
+    self.gamelogs['pitcher02'].loc[pd.Timestamp('2015-04-11 00:00'), 'ERA'] = ''
+    self.table = CumulativeStats(self.gamelogs, pitching_stats, last_value_columns=['ERA'])
+    self.rows = [(pitcher, pd.Timestamp(date))
+                 for pitcher in ['pitcher01', 'pitcher02', 'batter01', 'nobody01']
+                 for date in ['2014-09-20 00:00', '2014-12-01 00:00', '2015-04-10 00:00', '2015-04-15 01:00',
+                              '2015-04-15 02:00', '2015-04-16 00:00', '2015-04-17 00:00', '2015-05-01 00:00']]
+
+  def check_rates(self, **kwargs):
+    pitchers, dates = zip(*self.rows)
+    rates = pitching_rates(self.table, np.array(pitchers, dtype=object), np.array(dates), **kwargs)
+    for (pitcher, date), (_, row) in zip(self.rows, rates.iterrows()):
+      games = self.gamelogs.get(pitcher)
+      expected = [np.nan] * 3 if games is None else brute_force_rates(games, date, **kwargs)
+      np.testing.assert_allclose(row.values, np.array(expected, dtype=float), err_msg='%s %s' % (pitcher, date))
+
+  def test_to_date(self):
+    self.check_rates()
+
+  def test_season_to_date(self):
+    self.check_rates(season=True)
+
+  def test_last_games(self):
+    self.check_rates(window=2)
+
+  def test_strictly_before(self):
+    latest = self.table.latest_games(['pitcher01', 'pitcher01', 'pitcher02'],
+                                     pd.to_datetime(['2014-09-20 00:00', '2015-04-15 02:00', '2015-04-11 00:00']))
+    self.assertEqual(latest[0], -1)
+    self.assertEqual(self.table.dates[latest[1]], np.datetime64(pd.Timestamp('2015-04-15 01:00')))
+    self.assertEqual(latest[2], -1)
+
+  def test_empty(self):
+    table = CumulativeStats({}, pitching_stats, last_value_columns=['ERA'])
+    rates = pitching_rates(table, np.array(['pitcher01'], dtype=object), pd.to_datetime(['2015-04-10 00:00']))
+    self.assertTrue(rates.isnull().all().all())
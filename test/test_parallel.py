@@ -0,0 +1,63 @@
+from unittest import TestCase
+from dfs.parallel import shard_by, map_shards, in_worker, debug_shell
+from dfs.featureengine import engine
+from dfs.featureengine.registry import FeaturizerRegistry
+import numpy as np
+import pandas as pd
+
+def shard_totals(shard):
+  return shard.groupby('player')['points'].sum().to_dict(), list(shard.index)
+
+def shard_in_worker(shard):
+  return in_worker()
+
+def shard_debug_shell(shard):
+  debug_shell('no shell in a worker')
+
+# Row featurizers with no data for most players, so that whole shards come back empty
+sparse_registry = FeaturizerRegistry('test-parallel', player_column='player', name_separator=': ', row_results='list')
+
+@sparse_registry.featurizer(name='Bonus', output_columns=['Points', 'Half'])
+def bonus(row):
+  if row['player'] != 'a':
+    return []
+  return [row['points'], row['points'] / 2.0]
+
+class ParallelTest(TestCase):
+  def setUp(self):
+    self.data = pd.DataFrame({'player': ['a', 'b', 'c', 'a', 'd', 'b', 'e', 'a'],
+                              'points': [1, 2, 3, 4, 5, 6, 7, 8]},
+                             index=[70, 10, 20, 30, 40, 50, 60, 0])
+
+  def test_shard_by(self):
+    shards = shard_by(self.data['player'], 3)
+    self.assertEqual(sorted(np.concatenate(shards)), list(range(8)))
+    for shard in shards:
+      self.assertEqual(list(shard), sorted(shard))
+    # Each player's rows all land in one shard
+    players = [set(self.data['player'].iloc[shard]) for shard in shards]
+    for i in range(len(players)):
+      for j in range(i):
+        self.assertFalse(players[i] & players[j])
+    self.assertEqual(len(shard_by(self.data['player'], 100)), 5)
+
+  def test_map_shards(self):
+    results, shards = map_shards(shard_totals, self.data, self.data['player'], workers=2, shards_per_worker=2)
+    self.assertEqual(len(results), len(shards))
+    totals = {}
+    for (shard_total, index), shard in zip(results, shards):
+      totals.update(shard_total)
+      self.assertEqual(index, list(self.data.index[shard]))
+    self.assertEqual(totals, {'a': 13, 'b': 8, 'c': 3, 'd': 5, 'e': 7})
+
+  def test_in_worker(self):
+    self.assertFalse(in_worker())
+    results, shards = map_shards(shard_in_worker, self.data, self.data['player'], workers=2)
+    self.assertTrue(all(results))
+    self.assertRaises(RuntimeError, map_shards, shard_debug_shell, self.data, self.data['player'], workers=2)
+
+  def test_parallel_matches_serial(self):
+    serial = engine.expand(sparse_registry, self.data)
+    parallel = engine.expand(sparse_registry, self.data, workers=2)
+    self.assertTrue(serial.equals(parallel))
+    np.testing.assert_array_equal([1, np.nan, np.nan, 4, np.nan, np.nan, np.nan, 8], parallel['Bonus: Points'].values)
@@ -0,0 +1,47 @@
+import os
+import re
+import subprocess
+import sys
+from unittest import TestCase
+
+# Importing a console script's module should be quick: big tables get loaded when a command first needs them
+# (see dfs.lazy), not at import time, so --help and small commands don't pay for them.
+STARTUP_BUDGET_SECONDS = 3.0
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def console_script_modules():
+  """
+  :return list[str]: module of each console script in setup.py, in order and without repeats
+  """
+  with open(os.path.join(repo_root, 'setup.py')) as setup_file:
+    entry_points = re.findall(r"'[\w-]+ = ([\w.]+):\w+'", setup_file.read())
+  modules = []
+  for module in entry_points:
+    if module not in modules:
+      modules.append(module)
+  return modules
+
+def time_import(module):
+  """
+  Import module in a fresh interpreter.
+  :return (int, str): exit status, and the import time in seconds (or the error output)
+  """
+  code = 'import time; start = time.time(); import %s; print(time.time() - start)' % module
+  process = subprocess.Popen([sys.executable, '-c', code], cwd=repo_root,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+  out, err = process.communicate()
+  return process.returncode, (out if process.returncode == 0 else err).decode('utf-8').strip()
+
+class StartupTest(TestCase):
+  def test_console_scripts_found(self):
+    modules = console_script_modules()
+    self.assertIn('dfs.nba.expansion', modules)
+    self.assertIn('dfs.mlb.expansion', modules)
+
+  def test_import_time(self):
+    for module in console_script_modules():
+      status, output = time_import(module)
+      self.assertEqual(status, 0, 'importing %s failed:\n%s' % (module, output))
+      self.assertLess(float(output.splitlines()[-1]), STARTUP_BUDGET_SECONDS,
+                      'importing %s took %ss' % (module, output.splitlines()[-1]))